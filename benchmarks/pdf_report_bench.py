@@ -0,0 +1,82 @@
+# benchmarks/pdf_report_bench.py
+"""
+Benchmark render laporan PDF besar: renderer lama vs renderer sekarang.
+
+    python -m benchmarks.pdf_report_bench --tree-lines 2000 --runs 3
+
+Renderer lama (direproduksi di sini) membuat ulang stylesheet setiap panggilan dan menaruh
+seluruh pohon direktori dalam satu Paragraph '<pre>'. Renderer sekarang memakai style
+ber-cache, Preformatted per potongan, dan menulis ke buffer memori.
+"""
+import argparse
+import io
+import random
+import time
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
+
+from core.report import build_report
+from core.utils.pdf_generator import render_pdf_report
+
+
+def _sample(tree_lines: int, paragraphs: int, seed: int = 0):
+    rng = random.Random(seed)
+    words = ["repositori", "modul", "fungsi", "konfigurasi", "dependensi", "agent", "cache", "laporan", "github"]
+    tree = "\n".join(
+        f"{'  ' * rng.randint(0, 3)}📄 src/{'/'.join(rng.choice(words) for _ in range(rng.randint(1, 3)))}_{i}.py"
+        for i in range(tree_lines)
+    )
+    text = "\n\n".join(" ".join(rng.choice(words) for _ in range(60)) for _ in range(paragraphs))
+    structure = f"{tree}\n\n🧠 Penjelasan Struktur:\n{text}"
+    return build_report("https://github.com/bench/repo", text, structure, text)
+
+
+def _render_legacy(report) -> bytes:
+    styles = getSampleStyleSheet()
+    body = ParagraphStyle(name="Body", fontName="DejaVuSans", fontSize=11, leading=14)
+    story = []
+    for section in report.sections:
+        story.append(Paragraph(section.title, styles["Heading2"]))
+        if section.preformatted:
+            story.append(Paragraph(f"<pre>{section.preformatted}</pre>", body))
+        story.append(Paragraph(section.body, body))
+        story.append(Spacer(1, 10))
+    buffer = io.BytesIO()
+    SimpleDocTemplate(buffer, pagesize=A4).build(story)
+    return buffer.getvalue()
+
+
+def _time(fn, report, runs: int):
+    times, size = [], 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        size = len(fn(report))
+        times.append(time.perf_counter() - start)
+    return min(times), sum(times) / len(times), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tree-lines", type=int, nargs="+", default=[200, 2000, 10000])
+    parser.add_argument("--paragraphs", type=int, default=40)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    for lines in args.tree_lines:
+        report = _sample(lines, args.paragraphs)
+        renderers = [("sekarang", render_pdf_report)]
+        if not args.skip_legacy:
+            renderers.insert(0, ("lama", _render_legacy))
+        for name, fn in renderers:
+            try:
+                best, mean, size = _time(fn, report, args.runs)
+                print(f"{lines:>6} baris pohon | {name:<8} | min {best:.2f}s, rata-rata {mean:.2f}s, {size / 1024:.0f} KB")
+            except Exception as e:  # renderer lama bisa gagal (flowable lebih tinggi dari halaman)
+                print(f"{lines:>6} baris pohon | {name:<8} | gagal: {type(e).__name__}: {str(e)[:80]}")
+
+
+if __name__ == "__main__":
+    main()
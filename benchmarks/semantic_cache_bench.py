@@ -0,0 +1,103 @@
+# benchmarks/semantic_cache_bench.py
+"""
+Benchmark cache semantik: hit rate dan latensi lookup pada index berisi banyak entri.
+
+    python -m benchmarks.semantic_cache_bench --entries 100000
+
+Index diisi pertanyaan sintetis "<template> <nama file/topik>". Kueri uji terdiri dari
+parafrase pertanyaan yang ada di index (seharusnya hit), pertanyaan tentang topik
+yang tidak ada di index (seharusnya miss), dan near-miss: pertanyaan yang hampir sama
+dengan entri di index tetapi berbeda versi, path, atau cakupan (seharusnya miss).
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from core.semantic_cache import SemanticCache
+
+TEMPLATES = [
+    ("jelaskan file {x}", "explain the file {x}"),
+    ("apa isi {x}?", "what is inside {x}"),
+    ("bagaimana cara menjalankan {x}", "how to run {x}"),
+    ("dependensi apa yang dipakai {x}", "what dependencies does {x} use"),
+    ("bagaimana struktur folder {x}", "explain the directory structure of {x}"),
+]
+
+# (pertanyaan di index, pertanyaan lain yang embedding-nya mirip tetapi jawabannya berbeda)
+NEAR_MISSES = [
+    ("does it support python 3.8", "does it support python 3.12"),
+    ("apakah mendukung node 18", "apakah mendukung node 20"),
+    ("bagaimana cara install versi 1.2", "bagaimana cara install versi 2.0"),
+    ("list the tests", "list the tests in src"),
+    ("jelaskan folder src", "jelaskan folder docs"),
+    ("how to run the tests", "how to run the tests in backend"),
+    ("what dependencies does it use", "what dev dependencies does it use"),
+    ("dependensi apa yang dipakai", "dependensi apa yang dipakai untuk build"),
+    ("explain src/app.py", "explain src/app_test.py"),
+    ("jelaskan file core/agent.py", "jelaskan file core/tools.py"),
+]
+
+
+def _name(rng: random.Random, i: int) -> str:
+    stem = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 9)))
+    return f"{stem}{i}.{rng.choice(['py', 'js', 'go', 'rs', 'md'])}"
+
+
+def run(entries: int, queries: int, thresholds, seed: int = 0):
+    rng = random.Random(seed)
+    cache = SemanticCache(max_per_repo=entries)
+    names = [_name(rng, i) for i in range(entries)]
+
+    start = time.perf_counter()
+    for i, name in enumerate(names):
+        template = TEMPLATES[i % len(TEMPLATES)][0]
+        cache.add("bench/repo", "sha", template.format(x=name), f"jawaban {i}")
+    fill = time.perf_counter() - start
+    for j, (stored, _) in enumerate(NEAR_MISSES):
+        cache.add("bench/repo", "sha", stored, f"near-miss {j}")
+
+    probes = []
+    for _ in range(queries):
+        i = rng.randrange(entries)
+        probes.append((TEMPLATES[i % len(TEMPLATES)][1].format(x=names[i]), f"jawaban {i}"))
+        probes.append((TEMPLATES[rng.randrange(len(TEMPLATES))][1].format(x=_name(rng, entries + i)), None))
+
+    print(f"entri: {entries}, isi index: {fill:.1f}s ({fill / entries * 1e6:.0f} µs/entri)")
+    print(f"memori vektor: {cache._indexes['bench/repo'].vectors.nbytes / 1e6:.1f} MB")
+    for threshold in thresholds:
+        cache.threshold = threshold
+        latencies, hits, correct, false_hits = [], 0, 0, 0
+        for question, expected in probes:
+            t = time.perf_counter()
+            result = cache.lookup("bench/repo", "sha", question)
+            latencies.append(time.perf_counter() - t)
+            if result is None:
+                continue
+            if expected is None:
+                false_hits += 1
+            else:
+                hits += 1
+                correct += result[0] == expected
+        lat = np.array(latencies) * 1e3
+        print(
+            f"threshold {threshold:.2f}: hit rate parafrase {hits / queries:.1%} "
+            f"(benar {correct / queries:.1%}), false hit {false_hits / queries:.1%}, "
+            f"lookup p50 {np.percentile(lat, 50):.2f} ms, p95 {np.percentile(lat, 95):.2f} ms"
+        )
+        near_hits = [probe for _, probe in NEAR_MISSES if cache.lookup("bench/repo", "sha", probe) is not None]
+        print(f"    near-miss false hit {len(near_hits)}/{len(NEAR_MISSES)}" + (f": {near_hits}" if near_hits else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.7, 0.8, 0.9])
+    args = parser.parse_args()
+    run(args.entries, args.queries, args.thresholds)
+
+
+if __name__ == "__main__":
+    main()
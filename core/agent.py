@@ -1,16 +1,18 @@
+import asyncio
 import os
 from dotenv import load_dotenv
 from langchain.agents import create_react_agent
 from langchain.tools.render import render_text_description
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain.memory import ConversationSummaryMemory, ConversationBufferMemory, CombinedMemory
-from langchain_groq import ChatGroq
-from langchain.agents import AgentExecutor
-from core.utils.pdf_generator import generate_pdf_report
+from core.utils.pdf_generator import render_pdf_report, save_pdf_report
 from core.tools import get_repository_structure, analyze_dependencies
 from langchain.schema import AIMessage, HumanMessage
 from langchain.agents.output_parsers import ReActJsonSingleInputOutputParser
-from langchain.agents.format_scratchpad import format_log_to_messages
+from core.observations import TokenUsage, compact_scratchpad
+from core.loop_guard import GuardedAgentExecutor, RunGuard, current_run_guard
+from core.parallel_agent import ParallelAgentExecutor, ReActJsonMultiActionOutputParser
+from core.progress import ProgressCallback, ProgressReporter
+from core.telemetry import VERBOSE_LOGGING, current_span, debug, metrics, span
 from langchain_core.runnables import RunnableMap
 
 
@@ -18,34 +20,32 @@ from core.tools import ALL_GITHUB_TOOLS
 
 load_dotenv()
 
-def create_agent_executor(memory):
+# Mode paralel: model boleh mengirim daftar aksi independen yang dijalankan bersamaan dalam satu langkah
+AGENT_PARALLEL = os.getenv("AGENT_PARALLEL", "1") == "1"
+# Batas iterasi ReAct per jawaban; loop yang mengulang aksi sama sudah dihentikan lebih awal (core.loop_guard)
+AGENT_MAX_ITERATIONS = int(os.getenv("AGENT_MAX_ITERATIONS", "25"))
+
+PARALLEL_ACTIONS_INSTRUCTIONS = """
+        **PARALLEL ACTIONS:** When several steps of your plan do not depend on each other's results,
+        run them together in ONE step by giving a JSON list of actions. All observations are returned
+        together, in the same order as the list:
+        ```json
+        [
+          {{"action": "get_readme_content", "action_input": {{"repo_url": "https://github.com/user/repo"}}}},
+          {{"action": "analyze_dependencies", "action_input": {{"repo_url": "https://github.com/user/repo"}}}}
+        ]
+        ```
+        Use a single action only when the next step needs the result of the previous one.
+"""
+
+def create_agent_executor(memory=None):
     """
-    Fungsi ini sekarang menerima objek 'memory' untuk membuat agent yang kontekstual.
+    Membuat agent executor. Bila 'memory' diberikan, riwayat disimpan di executor itu sendiri;
+    tanpa memory, executor bisa dipakai bersama oleh banyak channel dan riwayat dikirim
+    per panggilan lewat input 'chat_history' (lihat core.sessions).
     """
-    llm_base = ChatGroq(
-        model_name="llama-3.1-8b-instant",
-        groq_api_key=os.getenv("GROQ_API_KEY"),
-        temperature=0
-    )
-    llm = llm_base.bind(stop=["\nObservation:", "\nObservation"])
+    llm_base = get_llm("agent", streaming=STREAM_TOKENS)
     tools = ALL_GITHUB_TOOLS
-    
-    
-
-    buffer_memory = ConversationBufferMemory(
-        memory_key="chat_history",             
-        llm=llm_base,
-        return_messages=True
-    )
-
-
-    memory = buffer_memory
-
-
-    # Jika pengguna memang melewatkan parameter memory saat memanggil fungsi,
-    # gunakan combined_memory sebagai default
-    if memory is None:
-        memory = memory
 
     def debug_memory_state(memory):
         print("=== DEBUG MEMORY STATE ===")
@@ -71,7 +71,8 @@ def create_agent_executor(memory):
             print(" memory.load_memory_variables() raised:", repr(e))
         print("==========================")
 
-    debug_memory_state(memory)
+    if memory is not None and VERBOSE_LOGGING:
+        debug_memory_state(memory)
 
 
     template = """
@@ -91,14 +92,22 @@ def create_agent_executor(memory):
         **RESPONSE FORMAT (must follow exactly):**
         Thought: [your reasoning about what to do next]
         Plan: [if applicable, a sequence of actions you intend to take]
-        Action: [tool name to use next]
-        Action Input: [input to the tool]
+        Action:
+        ```json
+        {{"action": "[tool name]", "action_input": {{[tool arguments]}}}}
+        ```
 
         Example:
         Thought: To analyze this repo, I should read the README first.
         Plan: 1. Read README → 2. Analyze dependencies → 3. Summarize.
-        Action: get_readme_content
-        Action Input: https://github.com/user/repo
+        Action:
+        ```json
+        {{"action": "get_readme_content", "action_input": {{"repo_url": "https://github.com/user/repo"}}}}
+        ```
+        {parallel}
+        When you have enough information, reply with:
+        Thought: [your reasoning]
+        Final Answer: [the answer for the user]
 
         Begin!
 
@@ -112,7 +121,10 @@ def create_agent_executor(memory):
         MessagesPlaceholder(variable_name="chat_history"),
         ("user", "{input}"),
         MessagesPlaceholder(variable_name="agent_scratchpad")
-    ]).partial(tools=render_text_description(tools))
+    ]).partial(
+        tools=render_text_description(tools),
+        parallel=PARALLEL_ACTIONS_INSTRUCTIONS if AGENT_PARALLEL else "",
+    )
 
     # --- Build ReAct Agent Manually ---
     from langchain.agents import initialize_agent, AgentType
@@ -120,64 +132,363 @@ def create_agent_executor(memory):
     agent = RunnableMap({
         "input": lambda x: x["input"],
         "chat_history": lambda x: x.get("chat_history", []),
-        "agent_scratchpad": lambda x: format_log_to_messages(x.get("intermediate_steps", [])),
-    }) | prompt | llm_base | ReActJsonSingleInputOutputParser()
-
-
+        "agent_scratchpad": lambda x: compact_scratchpad(x.get("intermediate_steps", [])),
+    }) | prompt | llm_base | (
+        ReActJsonMultiActionOutputParser() if AGENT_PARALLEL else ReActJsonSingleInputOutputParser()
+    )
 
-    agent_executor = AgentExecutor(
+    # Aksi dari satu langkah dijalankan bersamaan (dibatasi AGENT_MAX_PARALLEL_TOOLS);
+    # keduanya memo hasil tool per run dan memutus loop aksi berulang
+    executor_cls = ParallelAgentExecutor if AGENT_PARALLEL else GuardedAgentExecutor
+    agent_executor = executor_cls(
         agent=agent,
         tools=ALL_GITHUB_TOOLS,
         memory=memory,
-        verbose=True,
+        verbose=VERBOSE_LOGGING,  # mencetak prompt penuh setiap langkah: hanya bila diminta
         handle_parsing_errors=True,
-        max_iterations=100
+        max_iterations=AGENT_MAX_ITERATIONS,
     )
 
     return agent_executor, llm_base
 
 from core.tools import (
-    analyze_repository_structure_with_explanation,
-    analyze_dependencies_with_explanation,
+    aanalyze_repository_structure_with_explanation,
+    aanalyze_dependencies_with_explanation,
+    _is_error_result,
+    _normalize_repo_url,
+    STRUCTURE_PROMPT_VERSION,
+    DEPENDENCIES_PROMPT_VERSION,
 )
+from core.artifact_cache import artifact_cache, artifact_key
+from core.utils.pdf_generator import REPORT_TEMPLATE_VERSION
+from core.github_client import aclose_async_github_client
+from core.llm import get_llm, model_name
+from core.pipeline import PipelineResult, arun_stage, arun_stages
+from core.prefetch import current_prefetch
+from core.report import build_report
+from core.repo_meta import aresolve_ref, repo_metadata
+from core.repo_tree import aget_repo_tree
+from core.response_cache import response_cache
+from core.semantic_cache import semantic_cache
+from core.snapshot import snapshots
+from core.synthesis import SYNTHESIS_PROMPT_VERSION, ReportSynthesis, asynthesize_report, synthesis_models
+from core.utils.aio import SingleFlight
+
+# Token LLM di-stream (callback on_llm_new_token) agar progres bisa ditampilkan selama agent berpikir
+STREAM_TOKENS = os.getenv("STREAM_TOKENS", "1") == "1"
+# Ringkasan + struktur + dependensi laporan dalam satu panggilan LLM terstruktur (core.synthesis);
+# 0 = dua analisis terpisah seperti sebelumnya
+REPORT_SYNTHESIS = os.getenv("REPORT_SYNTHESIS", "1") == "1"
+
+# Artefak bersama per (repo, SHA): permintaan konkuren untuk repo yang sama hanya
+# menghitung struktur, dependensi, dan PDF sekali.
+artifact_flights = SingleFlight()
+
+
+async def _awarm_repo_cache(repo_url):
+    """
+    Isi cache metadata + tree sekali, supaya semua stage memakai data yang sama.
+    Kembalikan (repo_path, head_sha) sebagai key artefak bersama.
+    """
+    repo_path = _normalize_repo_url(repo_url)
+    prefetch = current_prefetch.get()
+    if prefetch is not None and prefetch.covers(repo_path):
+        # metadata + tree sudah diambil sejak URL diterima: cukup tunggu hasilnya
+        await asyncio.gather(prefetch.aget("metadata"), prefetch.aget("tree"))
+    await aget_repo_tree(repo_path, await aresolve_ref(repo_path))
+    meta = await repo_metadata.aget(repo_path)
+    head_sha = meta.head_sha if meta else None
+    # mode snapshot: tarball repo diambil di background, tool beralih ke disk lokal begitu siap
+    snapshots.prefetch(repo_path, head_sha)
+    return repo_path, head_sha
+
+
+async def _acached_text(repo_key, kind, prompt_version, llm, compute):
+    """
+    Ambil artefak teks dari cache (repo, SHA, versi prompt, model); hitung dan simpan bila belum ada.
+    Tanpa SHA (metadata gagal diambil) artefak tidak di-cache.
+    """
+    repo_path, sha = repo_key
+    if not sha:
+        return await compute()
+    key = artifact_key(repo_path, sha, kind, prompt_version, model_name(llm))
+    cached = artifact_cache.get_text(key)
+    if cached is not None:
+        return cached
+    text = await compute()
+    if not _is_error_result(text):
+        artifact_cache.put_text(key, text, repo_path, sha)
+    return text
+
+
+async def _acached_synthesis(repo_key, repo_url):
+    """
+    Sintesis laporan (core.synthesis) lewat cache artefak; None bila jawaban LLM tetap tidak sesuai skema.
+    Artefak di-key dengan model yang benar-benar menjawab, jadi lookup mencoba tiap model sesuai urutan retry.
+    """
+    repo_path, sha = repo_key
+    if sha:
+        for model in synthesis_models():
+            cached = artifact_cache.get_text(artifact_key(repo_path, sha, "synthesis", SYNTHESIS_PROMPT_VERSION, model))
+            if cached is not None:
+                return ReportSynthesis.from_json(cached)
+    result = await asynthesize_report(repo_url)
+    if result is not None and sha:
+        key = artifact_key(repo_path, sha, "synthesis", SYNTHESIS_PROMPT_VERSION, result.model)
+        artifact_cache.put_text(key, result.to_json(), repo_path, sha)
+    return result
+
+
+def _cached_pdf(repo_key, report) -> bytes:
+    """
+    Isi PDF laporan: diambil dari cache artefak bila isi laporan identik sudah pernah dirender,
+    selain itu dirender di memori. Tidak ada file yang ditulis ke outputs/.
+    """
+    repo_path, sha = repo_key
+    if not sha:
+        return render_pdf_report(report)
+    key = artifact_key(repo_path, sha, "pdf", REPORT_TEMPLATE_VERSION, "-", report.content_hash())
+    cached = artifact_cache.get_bytes(key)
+    if cached is not None:
+        return cached
+    data = render_pdf_report(report)
+    artifact_cache.put_bytes(key, data, ".pdf", repo_path, sha)
+    return data
+
+
+def _has_history(agent_executor, chat_history) -> bool:
+    """True bila jawaban bisa bergantung pada percakapan sebelumnya (riwayat channel atau memory executor)."""
+    if chat_history:
+        return True
+    memory = getattr(agent_executor, "memory", None)
+    if memory is None:
+        return False
+    try:
+        return any(memory.load_memory_variables({"input": ""}).values())
+    except Exception:
+        return True
 
-def run_agent_and_generate_pdf(agent_executor, repo_url, question):
+
+async def _aagent_answer(agent_executor, full_input, repo_key, question, chat_history=None, callbacks=None, guard=None):
     """
-    Jalankan agent untuk menganalisis repo, dan hasilnya diubah menjadi PDF report lengkap.
+    Jawaban agent, lewat cache respons (repo, SHA, pertanyaan kanonik) lebih dulu, lalu
+    cache semantik untuk pertanyaan yang mirip. Pertanyaan yang sudah pernah dijawab untuk
+    commit yang sama tidak menjalankan loop ReAct. Kedua cache dilewati bila ada riwayat
+    percakapan: follow-up seperti "jelaskan lebih detail" bergantung pada konteks, bukan teksnya.
+    guard (opsional) = RunGuard untuk run ini, agar pemanggil bisa membaca statistik loop-nya.
+    """
+    repo_path, sha = repo_key
+    use_cache = not _has_history(agent_executor, chat_history)
+    cached = await asyncio.to_thread(response_cache.get, repo_path, sha, question) if use_cache else None
+    if cached is not None:
+        debug(f"💾 Response cache HIT untuk {repo_path}@{(sha or '')[:7]}: {question[:50]}")
+    elif use_cache:
+        similar = semantic_cache.lookup(repo_path, sha, question)
+        if similar is not None:
+            cached, score = similar
+            debug(f"💾 Semantic cache HIT ({score:.2f}) untuk {repo_path}@{(sha or '')[:7]}: {question[:50]}")
+    if cached is not None:
+        memory = getattr(agent_executor, "memory", None)
+        if memory is not None:
+            # jaga riwayat percakapan tetap utuh walau agent tidak dijalankan
+            memory.save_context({"input": full_input}, {"output": cached})
+        return {"output": cached}
+
+    inputs = {"input": full_input}
+    if chat_history is not None:
+        inputs["chat_history"] = chat_history
+    start = asyncio.get_running_loop().time()
+    token = current_run_guard.set(guard or RunGuard())
+    try:
+        response = await agent_executor.ainvoke(inputs, config={"callbacks": callbacks} if callbacks else None)
+    finally:
+        current_run_guard.reset(token)
+    output = response.get("output")
+    if use_cache and output and not _is_error_result(output):
+        elapsed = asyncio.get_running_loop().time() - start
+        await asyncio.to_thread(response_cache.put, repo_path, sha, question, output, elapsed)
+        semantic_cache.add(repo_path, sha, question, output)
+    return response
+
+
+def format_agent_input(repo_url, question):
+    """Input agent (juga yang dicatat di riwayat percakapan)."""
+    return f"Repository URL: {repo_url}\n\nUser Question: {question}"
+
+
+async def arun_report_pipeline(
+    agent_executor, repo_url, question, timeouts=None, chat_history=None, progress=None, prefetch=None
+) -> PipelineResult:
+    """
+    Pipeline laporan bertahap (native asyncio):
+    1. warm-up cache repo (metadata + tree) dipakai bersama oleh semua stage,
+    2. agent, analisis struktur, dan analisis dependensi berjalan konkuren,
+    3. PDF dibuat dari hasil ketiganya.
+    Latensi total ditentukan stage paling lambat, bukan jumlah semuanya.
+    chat_history (opsional) = riwayat channel untuk executor yang dipakai bersama.
+    progress (opsional) = ProgressReporter yang menerima status stage, langkah agent, token
+    LLM, dan jawaban begitu agent selesai (sebelum PDF), untuk ditampilkan secara streaming.
+    prefetch (opsional) = RepoPrefetch yang dimulai saat URL diterima; tool membaca darinya.
     """
+    token = current_prefetch.set(prefetch)
     try:
-        full_input = f"Repository URL: {repo_url}\n\nUser Question: {question}"
-        result = agent_executor.invoke({"input": full_input})
-        answer = result.get("output", "Tidak ada hasil analisis yang ditemukan.")
-
-        # Ambil LLM dari agent_executor (bisa disimpan di variabel global saat create_agent_executor)
-        llm = getattr(agent_executor, "llm", None)
-        if llm is None:
-            print("⚠️ WARNING: LLM tidak ditemukan di agent_executor. Pastikan create_agent_executor menyimpannya.")
-            llm = ChatGroq(
-                model_name="llama-3.1-8b-instant",
-                groq_api_key=os.getenv("GROQ_API_KEY"),
-                temperature=0
-            )
-
-        # Analisis tambahan
-        structure_text = analyze_repository_structure_with_explanation(repo_url, llm)
-        dependencies_text = analyze_dependencies_with_explanation(repo_url, llm)
-
-        # Debug info
-        print("DEBUG: repo_url =", repo_url)
-        print("DEBUG: summary_text =", answer)
-        print("DEBUG: structure_text =", structure_text)
-        print("DEBUG: dependencies_text =", dependencies_text)
-
-        pdf_path = generate_pdf_report(
-            repo_url=repo_url,
-            summary_text=answer,
-            structure_text=structure_text,
-            dependencies_text=dependencies_text
+        with span("pipeline", "report", repo_url=repo_url):
+            return await _arun_report_pipeline(agent_executor, repo_url, question, timeouts, chat_history, progress)
+    finally:
+        current_prefetch.reset(token)
+
+
+async def _arun_report_pipeline(agent_executor, repo_url, question, timeouts, chat_history, progress) -> PipelineResult:
+    timings = {}
+    usage = TokenUsage()
+    guard = RunGuard()
+    progress = progress or ProgressReporter()
+    full_input = format_agent_input(repo_url, question)
+    llm = get_llm("analysis")
+
+    progress.stage_started("warmup")
+    warm = await arun_stage("warmup", lambda: _awarm_repo_cache(repo_url), timeout=30)
+    timings["warmup"] = warm.elapsed
+    progress.stage_finished("warmup", warm.elapsed, warm.ok, warm.timed_out)
+    repo_key = warm.value if warm.ok else (_normalize_repo_url(repo_url), None)
+
+    def on_stage_done(res):
+        progress.stage_finished(res.name, res.elapsed, res.ok, res.timed_out)
+        if res.name == "agent" and res.ok:
+            progress.set_answer(res.value.get("output", ""))
+
+    section_stages = {
+        "structure": lambda: artifact_flights.do(
+            ("structure", *repo_key),
+            lambda: _acached_text(
+                repo_key, "structure", STRUCTURE_PROMPT_VERSION, llm,
+                lambda: aanalyze_repository_structure_with_explanation(repo_url, llm),
+            ),
+        ),
+        "dependencies": lambda: artifact_flights.do(
+            ("dependencies", *repo_key),
+            lambda: _acached_text(
+                repo_key, "dependencies", DEPENDENCIES_PROMPT_VERSION, llm,
+                lambda: aanalyze_dependencies_with_explanation(repo_url, llm),
+            ),
+        ),
+    }
+    report_stages = section_stages
+    if REPORT_SYNTHESIS:
+        report_stages = {
+            "synthesis": lambda: artifact_flights.do(
+                ("synthesis", *repo_key), lambda: _acached_synthesis(repo_key, repo_url)
+            ),
+        }
+
+    progress.stage_started("agent", *report_stages)
+    results = await arun_stages({
+        "agent": lambda: _aagent_answer(
+            agent_executor, full_input, repo_key, question, chat_history, [usage, ProgressCallback(progress)], guard
+        ),
+        **report_stages,
+    }, timeouts, on_done=on_stage_done)
+
+    synthesis = None
+    if REPORT_SYNTHESIS:
+        synthesis_res = results["synthesis"]
+        synthesis = synthesis_res.value if synthesis_res.ok else None
+        if synthesis is None and not synthesis_res.timed_out:
+            # jawaban tetap tidak sesuai skema (atau error): kembali ke analisis per bagian
+            progress.stage_started(*section_stages)
+            results.update(await arun_stages(section_stages, timeouts, on_done=on_stage_done))
+    for name, res in results.items():
+        timings[name] = res.elapsed
+
+    agent_res = results["agent"]
+    if agent_res.error is not None:
+        raise agent_res.error
+    if agent_res.timed_out:
+        answer = "Analisis agent melebihi batas waktu. Berikut hasil analisis otomatis yang tersedia."
+        if synthesis is not None:
+            answer = f"{answer}\n\n{synthesis.summary}"
+    else:
+        answer = agent_res.value.get("output", "Tidak ada hasil analisis yang ditemukan.")
+
+    def stage_text(res, label):
+        if res.timed_out:
+            return f"{label} melebihi batas waktu."
+        if res.error is not None:
+            return f"Error saat {label.lower()}: {res.error}"
+        return res.value
+
+    if synthesis is not None:
+        structure_text, dependencies_text = synthesis.structure, synthesis.dependencies
+    else:
+        # tanpa sintesis, atau sintesis melebihi batas waktu (stage per bagian tidak dijalankan)
+        structure_text = stage_text(results.get("structure", results.get("synthesis")), "Analisis struktur")
+        dependencies_text = stage_text(results.get("dependencies", results.get("synthesis")), "Analisis dependensi")
+
+    debug("DEBUG: repo_url =", repo_url)
+    debug("DEBUG: summary_text =", answer)
+    debug("DEBUG: structure_text =", structure_text)
+    debug("DEBUG: dependencies_text =", dependencies_text)
+
+    # Satu dokumen laporan untuk PDF dan teks di chat.
+    # reportlab murni CPU-bound: jalankan di thread agar event loop tetap responsif.
+    # Isi laporan yang identik (repo, SHA, isi teks) hanya dirender sekali, lalu di-cache di disk.
+    report = build_report(repo_url, answer, structure_text, dependencies_text)
+    progress.stage_started("pdf")
+    pdf = await arun_stage("pdf", lambda: artifact_flights.do(
+        ("pdf", *repo_key, report.content_hash()),
+        lambda: asyncio.to_thread(_cached_pdf, repo_key, report),
+    ), timeout=(timeouts or {}).get("pdf"))
+    timings["pdf"] = pdf.elapsed
+    progress.stage_finished("pdf", pdf.elapsed, pdf.ok, pdf.timed_out)
+    if pdf.error is not None:  # juga tercatat di span_errors_total{kind="stage",name="pdf"}
+        debug(f"⚠️ Gagal membuat PDF: {pdf.error}")
+
+    tokens = {**usage.totals(), **guard.stats(usage.steps)}
+    metrics.inc("agent_tokens_total", tokens["total_tokens"])
+    metrics.inc("agent_wasted_tokens_total", tokens["wasted_tokens"])
+    pipeline_span = current_span.get()
+    if pipeline_span is not None:
+        pipeline_span.set(timings={k: round(v, 3) for k, v in timings.items()}, tokens=tokens)
+    debug("⏱️ Stage timings:", ", ".join(f"{k}={v:.2f}s" for k, v in timings.items()))
+    debug(
+        f"🔢 Token agent: {tokens['total_tokens']} ({tokens['steps']} langkah, "
+        f"prompt terbesar {tokens['max_prompt_tokens']})"
+    )
+    if tokens["memo_hits"] or tokens["wasted_iterations"]:
+        debug(
+            f"♻️ Loop agent: {tokens['wasted_iterations']} iterasi terbuang (~{tokens['wasted_tokens']} token), "
+            f"{tokens['memo_hits']} aksi dari memo" + (", Final Answer dipaksa" if tokens["forced_answer"] else "")
         )
+    return PipelineResult(
+        answer=answer, pdf=pdf.value if pdf.ok else None, timings=timings, tokens=tokens,
+        token_steps=usage.steps, report=report,
+    )
+
 
-        return answer, pdf_path
+async def arun_agent_and_generate_pdf(agent_executor, repo_url, question, chat_history=None, progress=None):
+    """
+    Versi async dari run_agent_and_generate_pdf: (jawaban, path PDF di outputs/). Bot memakai
+    arun_report_pipeline langsung dan mengirim PDF dari memori.
+    """
+    try:
+        result = await arun_report_pipeline(
+            agent_executor, repo_url, question, chat_history=chat_history, progress=progress
+        )
+        return result.answer, save_pdf_report(result.pdf) if result.pdf else None
 
     except Exception as e:
-        return f"Terjadi error saat analisis: {e}", None
\ No newline at end of file
+        return f"Terjadi error saat analisis: {e}", None
+
+
+def run_agent_and_generate_pdf(agent_executor, repo_url, question):
+    """
+    Jalankan agent untuk menganalisis repo, dan hasilnya diubah menjadi PDF report lengkap.
+    Pembungkus sync di atas arun_agent_and_generate_pdf (membuat event loop sendiri).
+    """
+    async def run():
+        try:
+            return await arun_agent_and_generate_pdf(agent_executor, repo_url, question)
+        finally:
+            await aclose_async_github_client()
+
+    return asyncio.run(run())
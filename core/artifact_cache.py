@@ -0,0 +1,210 @@
+# core/artifact_cache.py
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from core.repo_meta import repo_metadata
+from core.telemetry import metrics
+
+ARTIFACT_CACHE_DIR = os.getenv("ARTIFACT_CACHE_DIR", os.path.join(".cache", "artifacts"))
+ARTIFACT_CACHE_MAX_BYTES = int(os.getenv("ARTIFACT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+ARTIFACT_CACHE_MAX_ENTRIES = int(os.getenv("ARTIFACT_CACHE_MAX_ENTRIES", "5000"))
+
+
+def artifact_key(repo_path: str, sha: str, kind: str, prompt_version: str, model: str, *extra: str) -> str:
+    """Key content-addressed: (owner/repo, SHA HEAD, jenis artefak, versi prompt, nama model, ...)."""
+    raw = "\x00".join([repo_path, sha, kind, prompt_version, model, *extra])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ArtifactCache:
+    """
+    Cache artefak di disk (teks penjelasan, file PDF) yang di-key oleh artifact_key().
+    Eviction LRU berdasarkan total ukuran dan jumlah entri; index disimpan di index.json
+    agar cache bertahan setelah restart.
+    """
+
+    def __init__(self, root: str = ARTIFACT_CACHE_DIR, max_bytes: int = ARTIFACT_CACHE_MAX_BYTES,
+                 max_entries: int = ARTIFACT_CACHE_MAX_ENTRIES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # key -> {"file", "size", "repo", "sha", "atime"}; urutan = LRU (paling lama di depan)
+        self._index: "OrderedDict[str, dict]" = OrderedDict()
+        self._bytes = 0
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "writes": 0}
+        self._loaded = False
+
+    # -------------------------
+    # Index
+    # -------------------------
+    @property
+    def _index_path(self) -> str:
+        return os.path.join(self.root, "index.json")
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        os.makedirs(self.root, exist_ok=True)
+        try:
+            with open(self._index_path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            entries = {}
+        for key, meta in sorted(entries.items(), key=lambda kv: kv[1].get("atime", 0)):
+            if os.path.exists(os.path.join(self.root, meta["file"])):
+                self._index[key] = meta
+                self._bytes += meta["size"]
+
+    def _save(self):
+        tmp = f"{self._index_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(tmp, self._index_path)
+
+    def _evict(self):
+        while self._index and (self._bytes > self.max_bytes or len(self._index) > self.max_entries):
+            key, meta = self._index.popitem(last=False)
+            self._bytes -= meta["size"]
+            self._stats["evictions"] += 1
+            try:
+                os.remove(os.path.join(self.root, meta["file"]))
+            except OSError:
+                pass
+
+    def _forget(self, key: str):
+        """Entri yang file-nya hilang dihitung miss dan dikeluarkan dari index (lock harus dipegang)."""
+        meta = self._index.pop(key, None)
+        if meta is not None:
+            self._bytes -= meta["size"]
+        self._stats["misses"] += 1
+
+    def _lookup(self, key: str) -> Optional[str]:
+        """Path file artefak, atau None (lock harus dipegang selama file dibaca: _evict/drop_repo menghapus file)."""
+        self._load()
+        meta = self._index.get(key)
+        if meta is None:
+            self._stats["misses"] += 1
+            return None
+        path = os.path.join(self.root, meta["file"])
+        if not os.path.exists(path):
+            self._forget(key)
+            return None
+        meta["atime"] = time.time()
+        self._index.move_to_end(key)
+        self._stats["hits"] += 1
+        return path
+
+    def _read(self, key: str, binary: bool = False):
+        with self._lock:
+            path = self._lookup(key)
+            if path is None:
+                return None
+            try:
+                if binary:
+                    with open(path, "rb") as f:
+                        return f.read()
+                with open(path, encoding="utf-8") as f:
+                    return f.read()
+            except FileNotFoundError:  # dihapus dari luar proses
+                self._stats["hits"] -= 1
+                self._forget(key)
+                return None
+
+    def _store(self, key: str, filename: str, size: int, repo_path: str, sha: str):
+        with self._lock:
+            old = self._index.pop(key, None)
+            if old:
+                self._bytes -= old["size"]
+            self._index[key] = {"file": filename, "size": size, "repo": repo_path, "sha": sha, "atime": time.time()}
+            self._bytes += size
+            self._stats["writes"] += 1
+            self._evict()
+            self._save()
+
+    # -------------------------
+    # Public API
+    # -------------------------
+    def get_text(self, key: str) -> Optional[str]:
+        return self._read(key)
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        return self._read(key, binary=True)
+
+    def put_text(self, key: str, text: str, repo_path: str = "", sha: str = ""):
+        with self._lock:
+            self._load()
+        filename = f"{key}.txt"
+        data = text.encode("utf-8")
+        tmp = os.path.join(self.root, f"{filename}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, os.path.join(self.root, filename))
+        self._store(key, filename, len(data), repo_path, sha)
+
+    def put_bytes(self, key: str, data: bytes, suffix: str, repo_path: str = "", sha: str = "") -> str:
+        """Simpan data biner (mis. PDF yang dirender di memori) dan kembalikan path-nya di cache."""
+        with self._lock:
+            self._load()
+        filename = f"{key}{suffix}"
+        dest = os.path.join(self.root, filename)
+        with open(f"{dest}.tmp", "wb") as f:
+            f.write(data)
+        os.replace(f"{dest}.tmp", dest)
+        self._store(key, filename, len(data), repo_path, sha)
+        return dest
+
+    def put_file(self, key: str, src_path: str, repo_path: str = "", sha: str = "") -> str:
+        """Salin file ke cache dan kembalikan path-nya di cache."""
+        with self._lock:
+            self._load()
+        filename = f"{key}{os.path.splitext(src_path)[1]}"
+        dest = os.path.join(self.root, filename)
+        shutil.copyfile(src_path, f"{dest}.tmp")
+        os.replace(f"{dest}.tmp", dest)
+        self._store(key, filename, os.path.getsize(dest), repo_path, sha)
+        return dest
+
+    def drop_repo(self, repo_path: str, sha: Optional[str] = None):
+        """Hapus artefak milik repo (opsional hanya untuk satu SHA)."""
+        with self._lock:
+            self._load()
+            for key in [k for k, m in self._index.items() if m["repo"] == repo_path and (sha is None or m["sha"] == sha)]:
+                meta = self._index.pop(key)
+                self._bytes -= meta["size"]
+                try:
+                    os.remove(os.path.join(self.root, meta["file"]))
+                except OSError:
+                    pass
+            self._save()
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._load()
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_ratio": self._stats["hits"] / lookups if lookups else 0.0,
+                "entries": len(self._index),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+artifact_cache = ArtifactCache()
+metrics.register_collector("artifact_cache", artifact_cache.stats)
+
+
+def _drop_stale_artifacts(repo_path: str, old_sha: Optional[str], new_sha: Optional[str]):
+    if old_sha:
+        artifact_cache.drop_repo(repo_path, old_sha)
+
+
+repo_metadata.add_sha_listener(_drop_stale_artifacts)
@@ -0,0 +1,228 @@
+# core/code_index.py
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from core.snapshot import Snapshot
+from core.telemetry import metrics
+from core.utils.aio import KeyedLocks
+
+CODE_INDEX_DIR = os.getenv("CODE_INDEX_DIR", os.path.join(".cache", "code_index"))
+CODE_INDEX_MEMORY_REPOS = 8  # index yang dipertahankan di memori
+CODE_INDEX_MAX_FILE_BYTES = 512 * 1024  # file lebih besar (biasanya generated/minified) tidak di-index
+SEARCH_MAX_FILES = 8
+SEARCH_MAX_LINES_PER_FILE = 3
+SEARCH_CONTEXT_LINES = 1
+
+_IDENT_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]+")
+_CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+# Baris definisi (fungsi, kelas, tipe) lebih berguna daripada pemakaian biasa
+_DEF_RE = re.compile(
+    r"^\s*(?:export\s+)?(?:async\s+)?(def|class|function|func|fn|struct|interface|type|enum|trait|impl)\b"
+)
+CODE_INDEX_KEEP_PER_REPO = 2  # index commit lama yang disimpan di disk sebagai basis build inkremental
+
+
+def tokenize(text: str) -> Set[str]:
+    """Token identifier (huruf kecil) plus potongan snake_case/camelCase-nya, panjang >= 2."""
+    tokens = set()
+    for ident in _IDENT_RE.findall(text):
+        tokens.add(ident.lower())
+        for part in ident.split("_"):
+            for sub in _CAMEL_RE.findall(part):
+                if len(sub) >= 2:
+                    tokens.add(sub.lower())
+    return tokens
+
+
+class CodeIndex:
+    """
+    Inverted index token -> file untuk satu repo pada satu commit.
+    Disimpan per file (hash isi + token) sehingga index commit berikutnya bisa memakai ulang
+    token file yang isinya tidak berubah.
+    """
+
+    def __init__(self, repo_path: str, sha: str, files: Dict[str, dict]):
+        self.repo_path = repo_path
+        self.sha = sha
+        self.files = files  # path -> {"hash", "tokens"}
+        self.postings: Dict[str, List[str]] = defaultdict(list)
+        for path, info in files.items():
+            for token in info["tokens"]:
+                self.postings[token].append(path)
+
+    def candidates(self, query_tokens: Set[str]) -> List[Tuple[str, float]]:
+        """File yang memuat token kueri, diurutkan dengan skor idf (token jarang = lebih bernilai)."""
+        n = max(len(self.files), 1)
+        scores: Dict[str, float] = defaultdict(float)
+        for token in query_tokens:
+            paths = self.postings.get(token, ())
+            if not paths:
+                continue
+            idf = math.log(1 + n / len(paths))
+            for path in paths:
+                scores[path] += idf
+        for path in scores:
+            name = path.rsplit("/", 1)[-1].lower()
+            if any(t in name for t in query_tokens):
+                scores[path] *= 1.5  # nama file cocok dengan kueri
+        return sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))
+
+
+class CodeIndexStore:
+    """Membangun, menyimpan (JSON di disk), dan memuat ulang CodeIndex per (repo, SHA)."""
+
+    def __init__(self, root: str = CODE_INDEX_DIR, memory_repos: int = CODE_INDEX_MEMORY_REPOS):
+        self.root = root
+        self.memory_repos = memory_repos
+        self._lock = threading.Lock()
+        self._build_locks = KeyedLocks()
+        self._loaded: "OrderedDict[tuple, CodeIndex]" = OrderedDict()
+        self._stats = {"builds": 0, "loads": 0, "reused_files": 0, "indexed_files": 0}
+
+    def _path(self, repo_path: str, sha: str) -> str:
+        return os.path.join(self.root, repo_path.replace("/", "__"), f"{sha}.json")
+
+    def _read(self, path: str) -> Optional[dict]:
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _previous_files(self, repo_path: str) -> Dict[str, dict]:
+        """Index terbaru lain milik repo ini di disk (basis build inkremental)."""
+        repo_dir = os.path.dirname(self._path(repo_path, "x"))
+        try:
+            names = [n for n in os.listdir(repo_dir) if n.endswith(".json")]
+        except OSError:
+            return {}
+        if not names:
+            return {}
+        latest = max(names, key=lambda n: os.path.getmtime(os.path.join(repo_dir, n)))
+        data = self._read(os.path.join(repo_dir, latest))
+        return data["files"] if data else {}
+
+    def _prune(self, repo_dir: str):
+        names = sorted(
+            (n for n in os.listdir(repo_dir) if n.endswith(".json")),
+            key=lambda n: os.path.getmtime(os.path.join(repo_dir, n)),
+            reverse=True,
+        )
+        for name in names[CODE_INDEX_KEEP_PER_REPO:]:
+            try:
+                os.remove(os.path.join(repo_dir, name))
+            except OSError:
+                pass
+
+    def _build(self, snap: Snapshot) -> CodeIndex:
+        previous = self._previous_files(snap.repo_path)
+        by_hash = {info["hash"]: info["tokens"] for info in previous.values()}
+        files, reused = {}, 0
+        for entry in snap.index:
+            if entry["size"] > CODE_INDEX_MAX_FILE_BYTES:
+                continue
+            with open(os.path.join(snap.files_dir, entry["path"]), "rb") as f:
+                data = f.read()
+            if b"\0" in data[:8000]:  # file biner
+                continue
+            digest = hashlib.sha1(data).hexdigest()
+            tokens = by_hash.get(digest)
+            if tokens is None:
+                tokens = sorted(tokenize(data.decode("utf-8", errors="replace")))
+            else:
+                reused += 1
+            files[entry["path"]] = {"hash": digest, "tokens": tokens}
+
+        path = self._path(snap.repo_path, snap.sha)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"repo_path": snap.repo_path, "sha": snap.sha, "files": files}, f)
+        os.replace(f"{path}.tmp", path)
+        self._prune(os.path.dirname(path))
+        with self._lock:
+            self._stats["builds"] += 1
+            self._stats["reused_files"] += reused
+            self._stats["indexed_files"] += len(files) - reused
+        return CodeIndex(snap.repo_path, snap.sha, files)
+
+    def get(self, snap: Snapshot) -> CodeIndex:
+        """Index untuk snapshot: dari memori, dari disk, atau dibangun (inkremental) sekali."""
+        key = (snap.repo_path, snap.sha)
+        with self._lock:
+            index = self._loaded.get(key)
+            if index is not None:
+                self._loaded.move_to_end(key)
+                return index
+        with self._build_locks.hold(key):
+            with self._lock:
+                index = self._loaded.get(key)
+            if index is None:
+                data = self._read(self._path(*key))
+                if data is not None:
+                    index = CodeIndex(snap.repo_path, snap.sha, data["files"])
+                    with self._lock:
+                        self._stats["loads"] += 1
+                else:
+                    index = self._build(snap)
+            with self._lock:
+                self._loaded[key] = index
+                self._loaded.move_to_end(key)
+                while len(self._loaded) > self.memory_repos:
+                    self._loaded.popitem(last=False)
+        return index
+
+    def search(self, snap: Snapshot, query: str, max_files: int = SEARCH_MAX_FILES) -> List[dict]:
+        """
+        Cari kueri di repo: kandidat file dari inverted index, lalu baris yang cocok
+        (token kueri terbanyak, frasa utuh diprioritaskan) beserta konteksnya.
+        """
+        query_tokens = tokenize(query) or {query.lower()}
+        index = self.get(snap)
+        phrase = query.strip().lower()
+        results = []
+        for path, file_score in index.candidates(query_tokens)[: max_files * 3]:
+            text = snap.read_text(path)
+            if text is None:
+                continue
+            lines = text.splitlines()
+            scored = []
+            for i, line in enumerate(lines):
+                low = line.lower()
+                hits = sum(1 for t in query_tokens if t in low)
+                if hits:
+                    bonus = (2 if phrase and phrase in low else 0) + (1 if _DEF_RE.match(line) else 0)
+                    scored.append((hits + bonus, i))
+            if not scored:
+                continue
+            scored.sort(key=lambda x: (-x[0], x[1]))
+            best = sorted(i for _, i in scored[:SEARCH_MAX_LINES_PER_FILE])
+            results.append({
+                "path": path,
+                "score": file_score + scored[0][0],
+                "hits": [
+                    {
+                        "line": i + 1,
+                        "context": [
+                            (j + 1, lines[j])
+                            for j in range(max(0, i - SEARCH_CONTEXT_LINES), min(len(lines), i + SEARCH_CONTEXT_LINES + 1))
+                        ],
+                    }
+                    for i in best
+                ],
+            })
+        results.sort(key=lambda r: (-r["score"], r["path"]))
+        return results[:max_files]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "loaded": len(self._loaded)}
+
+
+code_indexes = CodeIndexStore()
+metrics.register_collector("code_index", code_indexes.stats)
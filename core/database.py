@@ -1,10 +1,25 @@
 # core/database.py
-import os
+import atexit
+from abc import ABC, abstractmethod
 import hashlib
-import mysql.connector
-from mysql.connector import Error
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
 from dotenv import load_dotenv
 
+from core.telemetry import debug
+
+try:
+    import mysql.connector
+    from mysql.connector import Error, pooling
+except ImportError:  # backend MySQL opsional; SQLite/memory tetap bisa dipakai
+    mysql = None
+    pooling = None
+    Error = Exception
+
 load_dotenv()
 
 DB_CONFIG = {
@@ -15,24 +30,82 @@ DB_CONFIG = {
     'port': os.getenv("DB_PORT", 3306)
 }
 
-def get_db_connection():
-    """Membuat dan mengembalikan koneksi ke database MySQL."""
-    try:
-        conn = mysql.connector.connect(**DB_CONFIG)
-        return conn
-    except Error as e:
-        print(f"Error saat menghubungkan ke MySQL: {e}")
-        return None
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+QUERY_CACHE_BATCH_SIZE = int(os.getenv("QUERY_CACHE_BATCH_SIZE", "50"))
+QUERY_CACHE_FLUSH_INTERVAL = float(os.getenv("QUERY_CACHE_FLUSH_INTERVAL", "2.0"))
+QUERY_CACHE_MAX_PENDING = int(os.getenv("QUERY_CACHE_MAX_PENDING", "1000"))  # buffer saat database tidak tersedia
+SQLITE_PATH = os.getenv("QUERY_CACHE_SQLITE_PATH", os.path.join(".cache", "query_cache.sqlite3"))
 
-def setup_database():
-    """Membuat tabel cache di MySQL jika belum ada."""
-    conn = get_db_connection()
-    if not conn:
-        return
-        
-    try:
-        cursor = conn.cursor()
-        cursor.execute("""
+Row = Tuple[str, str, str]  # (QueryHash, FullQuery, Response)
+DB_ERRORS = (Error, sqlite3.Error)
+
+
+# -------------------------
+# Backend
+# -------------------------
+class QueryCacheBackend(ABC):
+    """Antarmuka penyimpanan tabel QueryCache. Implementasi: MySQL, SQLite, in-memory."""
+
+    @abstractmethod
+    def setup(self):
+        ...
+
+    @abstractmethod
+    def get(self, query_hash: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def upsert_many(self, rows: List[Row]):
+        ...
+
+    @abstractmethod
+    def delete_older_than(self, max_age: float) -> int:
+        """Hapus baris yang Timestamp-nya lebih tua dari max_age detik (dihitung oleh database)."""
+
+    def close(self):
+        pass
+
+
+class MySQLBackend(QueryCacheBackend):
+    """Backend MySQL dengan connection pool (koneksi dipakai ulang, bukan connect per query)."""
+
+    def __init__(self, config: dict = None, pool_size: int = DB_POOL_SIZE):
+        self.config = config or DB_CONFIG
+        self.pool_size = pool_size
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    if pooling is None:
+                        raise RuntimeError("mysql-connector-python tidak terpasang.")
+                    self._pool = pooling.MySQLConnectionPool(
+                        pool_name="gitcortex", pool_size=self.pool_size, **self.config
+                    )
+        return self._pool
+
+    def _execute(self, sql: str, params=None, many: bool = False, fetch: bool = False):
+        conn = self._get_pool().get_connection()
+        try:
+            cursor = conn.cursor()
+            try:
+                if many:
+                    cursor.executemany(sql, params)
+                else:
+                    cursor.execute(sql, params or ())
+                if fetch:
+                    return cursor.fetchone()
+                conn.commit()
+                return cursor.rowcount
+            finally:
+                cursor.close()
+        finally:
+            conn.close()  # kembali ke pool
+
+    def setup(self):
+        self._execute("""
             CREATE TABLE IF NOT EXISTS QueryCache (
                 ID INT AUTO_INCREMENT PRIMARY KEY,
                 QueryHash VARCHAR(64) UNIQUE NOT NULL,
@@ -41,61 +114,285 @@ def setup_database():
                 Timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
             )
         """)
-        conn.commit()
-        print("Database setup berhasil. Tabel 'QueryCache' siap digunakan di MySQL.")
-    except Error as e:
-        print(f"Error saat setup database: {e}")
-    finally:
-        if conn.is_connected():
-            cursor.close()
-            conn.close()
+
+    def get(self, query_hash: str) -> Optional[str]:
+        row = self._execute("SELECT Response FROM QueryCache WHERE QueryHash = %s", (query_hash,), fetch=True)
+        return row[0] if row else None
+
+    def upsert_many(self, rows: List[Row]):
+        self._execute(
+            "INSERT INTO QueryCache (QueryHash, FullQuery, Response) VALUES (%s, %s, %s) "
+            "ON DUPLICATE KEY UPDATE FullQuery = VALUES(FullQuery), Response = VALUES(Response), "
+            "Timestamp = CURRENT_TIMESTAMP",
+            rows,
+            many=True,
+        )
+
+    def delete_older_than(self, max_age: float) -> int:
+        return self._execute(
+            "DELETE FROM QueryCache WHERE Timestamp < NOW() - INTERVAL %s SECOND", (int(max_age),)
+        )
+
+
+class SQLiteBackend(QueryCacheBackend):
+    """Backend SQLite satu file (atau ':memory:'), cocok untuk pengembangan lokal dan test."""
+
+    def __init__(self, path: str = SQLITE_PATH):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        return self._conn
+
+    def setup(self):
+        with self._lock:
+            self._connection().execute("""
+                CREATE TABLE IF NOT EXISTS QueryCache (
+                    ID INTEGER PRIMARY KEY AUTOINCREMENT,
+                    QueryHash VARCHAR(64) UNIQUE NOT NULL,
+                    FullQuery TEXT NOT NULL,
+                    Response TEXT NOT NULL,
+                    Timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            self._conn.commit()
+
+    def get(self, query_hash: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT Response FROM QueryCache WHERE QueryHash = ?", (query_hash,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def upsert_many(self, rows: List[Row]):
+        with self._lock:
+            self._connection().executemany(
+                "INSERT INTO QueryCache (QueryHash, FullQuery, Response) VALUES (?, ?, ?) "
+                "ON CONFLICT(QueryHash) DO UPDATE SET FullQuery = excluded.FullQuery, "
+                "Response = excluded.Response, Timestamp = CURRENT_TIMESTAMP",
+                rows,
+            )
+            self._conn.commit()
+
+    def delete_older_than(self, max_age: float) -> int:
+        with self._lock:
+            cur = self._connection().execute(
+                "DELETE FROM QueryCache WHERE Timestamp < datetime('now', ?)", (f"-{int(max_age)} seconds",)
+            )
+            self._conn.commit()
+            return cur.rowcount
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class MemoryBackend(QueryCacheBackend):
+    """Backend in-process (dict), untuk test atau saat tidak ada database."""
+
+    def __init__(self):
+        self._rows: Dict[str, Tuple[str, str, float]] = {}
+        self._lock = threading.Lock()
+
+    def setup(self):
+        pass
+
+    def get(self, query_hash: str) -> Optional[str]:
+        with self._lock:
+            row = self._rows.get(query_hash)
+        return row[1] if row else None
+
+    def upsert_many(self, rows: List[Row]):
+        now = time.time()
+        with self._lock:
+            for query_hash, query, response in rows:
+                self._rows[query_hash] = (query, response, now)
+
+    def delete_older_than(self, max_age: float) -> int:
+        cutoff = time.time() - max_age
+        with self._lock:
+            stale = [h for h, (_, _, ts) in self._rows.items() if ts < cutoff]
+            for h in stale:
+                del self._rows[h]
+        return len(stale)
+
+
+def create_backend(name: Optional[str] = None) -> QueryCacheBackend:
+    """Pilih backend dari QUERY_CACHE_BACKEND (mysql|sqlite|memory); default mysql bila DB_SERVER diset."""
+    name = (name or os.getenv("QUERY_CACHE_BACKEND") or ("mysql" if DB_CONFIG["host"] else "sqlite")).lower()
+    if name == "mysql":
+        return MySQLBackend()
+    if name == "sqlite":
+        return SQLiteBackend()
+    if name == "memory":
+        return MemoryBackend()
+    raise ValueError(f"Backend QueryCache tidak dikenal: {name}")
+
+
+# -------------------------
+# QueryCache: setup lazy + write buffer
+# -------------------------
+class QueryCache:
+    """
+    Lapisan cache di atas backend:
+    - schema dibuat lazy pada pemakaian pertama (tidak lagi saat import),
+    - penulisan di-buffer dan di-flush sebagai upsert batch (per batch_size atau tiap flush_interval),
+    - pembacaan melihat buffer yang belum di-flush lebih dulu,
+    - batch yang gagal ditulis dikembalikan ke buffer (maksimal max_pending entri) dan dicoba lagi.
+    """
+
+    def __init__(self, backend: QueryCacheBackend = None, batch_size: int = QUERY_CACHE_BATCH_SIZE,
+                 flush_interval: float = QUERY_CACHE_FLUSH_INTERVAL, max_pending: int = QUERY_CACHE_MAX_PENDING):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._ready = False
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Row] = {}
+        self._flusher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _ensure_ready(self) -> bool:
+        if self._ready:
+            return True
+        with self._lock:
+            if self._ready:
+                return True
+            try:
+                if self.backend is None:
+                    self.backend = create_backend()
+                self.backend.setup()
+            except Exception as e:
+                print(f"Error saat setup database: {e}")
+                return False
+            self._ready = True
+            print("Database setup berhasil. Tabel 'QueryCache' siap digunakan.")
+        return True
+
+    def _start_flusher(self):
+        if self._flusher is None and self.flush_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_loop, name="querycache-flush", daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def get(self, query_hash: str) -> Optional[str]:
+        with self._lock:
+            pending = self._pending.get(query_hash)
+        if pending is not None:
+            return pending[2]
+        if not self._ensure_ready():
+            return None
+        try:
+            return self.backend.get(query_hash)
+        except DB_ERRORS as e:
+            print(f"Error saat mengambil cache: {e}")
+            return None
+
+    def put(self, query_hash: str, query: str, response: str):
+        with self._lock:
+            # key yang sama di-overwrite di buffer -> upsert batch tidak pernah bentrok
+            self._pending[query_hash] = (query_hash, query, response)
+            full = len(self._pending) >= self.batch_size
+            self._start_flusher()
+        if full:
+            self.flush()
+
+    def _requeue(self, rows: List[Row]):
+        """Kembalikan batch yang gagal ke buffer; entri yang di-put setelah flush dimulai tetap menang."""
+        with self._lock:
+            pending = {row[0]: row for row in rows}
+            pending.update(self._pending)
+            dropped = len(pending) - self.max_pending
+            for key in list(pending)[:max(dropped, 0)]:  # buffer penuh: buang entri terlama
+                del pending[key]
+            self._pending = pending
+        if dropped > 0:
+            print(f"⚠️ Buffer QueryCache penuh: {dropped} entri terlama dibuang")
+
+    def flush(self) -> int:
+        """Tulis semua entri yang ter-buffer sebagai satu upsert batch."""
+        with self._lock:
+            rows = list(self._pending.values())
+            self._pending.clear()
+        if not rows:
+            return 0
+        if not self._ensure_ready():
+            self._requeue(rows)
+            return 0
+        try:
+            self.backend.upsert_many(rows)
+            return len(rows)
+        except Exception as e:
+            print(f"Error saat menyimpan cache: {e}")
+            self._requeue(rows)
+            return 0
+
+    def delete_older_than(self, max_age: float) -> int:
+        if not self._ensure_ready():
+            return 0
+        self.flush()
+        try:
+            return self.backend.delete_older_than(max_age)
+        except DB_ERRORS as e:
+            print(f"Error saat membersihkan cache: {e}")
+            return 0
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+        if self.backend is not None:
+            self.backend.close()
+
+
+query_cache = QueryCache()
+atexit.register(query_cache.flush)
+
+
+# -------------------------
+# API lama (tetap dipakai)
+# -------------------------
+def get_db_connection():
+    """Membuat dan mengembalikan koneksi ke database MySQL (dari pool bila tersedia)."""
+    backend = query_cache.backend
+    try:
+        if isinstance(backend, MySQLBackend):
+            return backend._get_pool().get_connection()
+        return mysql.connector.connect(**DB_CONFIG)
+    except Exception as e:
+        print(f"Error saat menghubungkan ke MySQL: {e}")
+        return None
+
+
+def setup_database():
+    """Membuat tabel cache jika belum ada (juga dilakukan otomatis saat cache pertama kali dipakai)."""
+    query_cache._ensure_ready()
+
 
 def _hash_query(query: str) -> str:
     """Membuat SHA-256 hash dari sebuah string query."""
     return hashlib.sha256(query.encode('utf-8')).hexdigest()
 
+
 def get_cached_response(query: str) -> str | None:
-    """Mencari respons di database MySQL berdasarkan hash dari query."""
-    query_hash = _hash_query(query)
-    conn = get_db_connection()
-    if not conn:
-        return None
-        
-    response = None
-    try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT Response FROM QueryCache WHERE QueryHash = %s", (query_hash,))
-        row = cursor.fetchone()
-        if row:
-            response = row[0]
-            print(f"Cache HIT untuk query: {query[:50]}...")
-    except Error as e:
-        print(f"Error saat mengambil cache: {e}")
-    finally:
-        if conn.is_connected():
-            cursor.close()
-            conn.close()
+    """Mencari respons di cache berdasarkan hash dari query."""
+    response = query_cache.get(_hash_query(query))
+    if response is not None:
+        debug(f"Cache HIT untuk query: {query[:50]}...")
     return response
 
-def cache_response(query: str, response: str):
-    """Menyimpan query dan respons baru ke dalam database MySQL."""
-    query_hash = _hash_query(query)
-    conn = get_db_connection()
-    if not conn:
-        return
 
-    try:
-        cursor = conn.cursor()
-        sql = "INSERT INTO QueryCache (QueryHash, FullQuery, Response) VALUES (%s, %s, %s)"
-        val = (query_hash, query, response)
-        cursor.execute(sql, val)
-        conn.commit()
-        print(f"Cache SAVED untuk query: {query[:50]}...")
-    except Error as e:
-        print(f"Error saat menyimpan cache: {e}")
-    finally:
-        if conn.is_connected():
-            cursor.close()
-            conn.close()
-
-setup_database()
\ No newline at end of file
+def cache_response(query: str, response: str):
+    """Menyimpan query dan respons baru ke cache (di-buffer, ditulis sebagai upsert batch)."""
+    query_cache.put(_hash_query(query), query, response)
+    debug(f"Cache SAVED untuk query: {query[:50]}...")
@@ -0,0 +1,320 @@
+# core/digest.py
+import ast
+import json
+import math
+import os
+import posixpath
+import re
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+from core.artifact_cache import artifact_cache, artifact_key
+from core.manifests import MANIFEST_IGNORED_DIRS, is_manifest
+from core.observations import approx_tokens
+from core.repo_tree import RepoTree
+from core.snapshot import detect_language
+
+# Naikkan versi bila cara menghitung digest berubah, agar digest lama di cache tidak dipakai
+DIGEST_VERSION = "1"
+# Anggaran token digest di dalam prompt struktur
+DIGEST_TOKEN_BUDGET = int(os.getenv("DIGEST_TOKEN_BUDGET", "1200"))
+# Batas file yang diparse dari snapshot, dan yang diambil lewat API bila snapshot tidak ada
+DIGEST_MAX_PARSED_FILES = 2000
+DIGEST_FETCH_FILES = int(os.getenv("DIGEST_FETCH_FILES", "12"))
+DIGEST_MAX_FILE_BYTES = 256 * 1024
+DIGEST_MAX_SYMBOLS = 12
+
+ENTRY_POINT_NAMES = {
+    "main.py", "__main__.py", "app.py", "manage.py", "server.py", "cli.py", "bot.py", "wsgi.py", "asgi.py",
+    "index.js", "index.ts", "main.js", "main.ts", "server.js", "server.ts", "app.js", "app.ts",
+    "main.go", "main.rs", "lib.rs", "Main.java", "Program.cs", "main.c", "main.cpp", "Makefile", "Dockerfile",
+}
+LOW_VALUE_DIRS = {"test", "tests", "__tests__", "spec", "docs", "doc", "examples", "example", "benchmarks", "fixtures"}
+CODE_LANGUAGES = {
+    "Python", "JavaScript", "TypeScript", "Go", "Rust", "Java", "Kotlin", "Ruby", "PHP", "C#", "C", "C++",
+    "Swift", "Scala", "Shell", "Vue", "Dart", "Lua", "R",
+}
+
+# Parser ringan (regex per baris) untuk bahasa selain Python: (pola, jenis simbol)
+_OUTLINE_PATTERNS = {
+    "JavaScript": [
+        (re.compile(r"^\s*(?:export\s+(?:default\s+)?)?(?:abstract\s+)?class\s+(\w+)"), "class"),
+        (re.compile(r"^\s*(?:export\s+(?:default\s+)?)?(?:async\s+)?function\s*\*?\s*(\w+)"), "function"),
+        (re.compile(r"^\s*export\s+(?:const|let|var)\s+(\w+)"), "const"),
+    ],
+    "TypeScript": [
+        (re.compile(r"^\s*(?:export\s+(?:default\s+)?)?(?:abstract\s+)?class\s+(\w+)"), "class"),
+        (re.compile(r"^\s*(?:export\s+)?interface\s+(\w+)"), "interface"),
+        (re.compile(r"^\s*(?:export\s+)?type\s+(\w+)\s*="), "type"),
+        (re.compile(r"^\s*(?:export\s+(?:default\s+)?)?(?:async\s+)?function\s*\*?\s*(\w+)"), "function"),
+        (re.compile(r"^\s*export\s+(?:const|let|var)\s+(\w+)"), "const"),
+    ],
+    "Go": [
+        (re.compile(r"^type\s+(\w+)\s+(?:struct|interface)\b"), "type"),
+        (re.compile(r"^func\s+(?:\([^)]*\)\s*)?(\w+)"), "func"),
+    ],
+    "Rust": [
+        (re.compile(r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:struct|enum|trait)\s+(\w+)"), "type"),
+        (re.compile(r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:async\s+)?fn\s+(\w+)"), "fn"),
+    ],
+    "Java": [(re.compile(r"^\s*(?:public\s+|abstract\s+|final\s+)*(?:class|interface|enum|record)\s+(\w+)"), "class")],
+    "Kotlin": [
+        (re.compile(r"^\s*(?:data\s+|sealed\s+|abstract\s+|open\s+)*(?:class|interface|object)\s+(\w+)"), "class"),
+        (re.compile(r"^\s*(?:suspend\s+)?fun\s+(\w+)"), "fun"),
+    ],
+    "C#": [(re.compile(r"^\s*(?:public\s+|internal\s+|static\s+|abstract\s+|sealed\s+|partial\s+)*(?:class|interface|struct|enum|record)\s+(\w+)"), "class")],
+    "Ruby": [
+        (re.compile(r"^\s*(?:class|module)\s+([\w:]+)"), "class"),
+        (re.compile(r"^\s*def\s+([\w.?!]+)"), "def"),
+    ],
+    "PHP": [
+        (re.compile(r"^\s*(?:abstract\s+|final\s+)?(?:class|interface|trait)\s+(\w+)"), "class"),
+        (re.compile(r"^\s*(?:public\s+|private\s+|protected\s+|static\s+)*function\s+(\w+)"), "function"),
+    ],
+}
+
+_JS_IMPORT_RE = re.compile(r"""(?:from\s+|require\(\s*|import\s*\(\s*|^\s*import\s+)['"](\.{1,2}/[^'"]+)['"]""", re.M)
+_JS_RESOLVE_SUFFIXES = ["", ".js", ".ts", ".jsx", ".tsx", ".mjs", "/index.js", "/index.ts", "/index.tsx"]
+_GO_IMPORT_RE = re.compile(r'^\s*(?:import\s+)?(?:\w+\s+)?"([^"]+)"', re.M)
+_GO_MODULE_RE = re.compile(r"^module\s+(\S+)", re.M)
+_SHA_RE = re.compile(r"[0-9a-f]{40}")
+
+
+# -------------------------
+# Outline simbol
+# -------------------------
+def _parse_python(text: str) -> Optional[ast.Module]:
+    try:
+        return ast.parse(text)
+    except (SyntaxError, ValueError):
+        return None
+
+
+def _python_outline(module: ast.Module) -> List[str]:
+    """Kelas (beserta metode publik) dan fungsi top-level dari AST Python."""
+    symbols = []
+    for node in module.body:
+        if isinstance(node, ast.ClassDef):
+            methods = [
+                n.name for n in node.body
+                if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef)) and (not n.name.startswith("_") or n.name == "__init__")
+            ]
+            symbols.append(f"class {node.name}" + (f"({', '.join(methods[:6])})" if methods else ""))
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            args = [a.arg for a in node.args.args]
+            symbols.append(f"def {node.name}({', '.join(args[:4])}{', ...' if len(args) > 4 else ''})")
+    return symbols
+
+
+def outline(path: str, text: str, module: Optional[ast.Module] = None) -> List[str]:
+    """Outline simbol satu file: AST untuk Python, regex per baris untuk bahasa lain."""
+    language = detect_language(path)
+    if language == "Python":
+        module = module or _parse_python(text)
+        return _python_outline(module)[:DIGEST_MAX_SYMBOLS] if module else []
+    patterns = _OUTLINE_PATTERNS.get(language)
+    if not patterns:
+        return []
+    symbols = []
+    for line in text.splitlines():
+        for pattern, kind in patterns:
+            m = pattern.match(line)
+            if m:
+                symbols.append(f"{kind} {m.group(1)}")
+                break
+        if len(symbols) >= DIGEST_MAX_SYMBOLS:
+            break
+    return symbols
+
+
+# -------------------------
+# Graf import (fan-in)
+# -------------------------
+def _python_modules(paths: List[str]) -> Dict[str, str]:
+    """Nama modul bertitik -> path file (juga tanpa prefix 'src.' untuk layout src/)."""
+    modules = {}
+    for path in paths:
+        if not path.endswith(".py"):
+            continue
+        parts = path[:-3].split("/")
+        if parts[-1] == "__init__":
+            parts = parts[:-1]
+        if not parts:
+            continue
+        modules[".".join(parts)] = path
+        if parts[0] == "src" and len(parts) > 1:
+            modules.setdefault(".".join(parts[1:]), path)
+    return modules
+
+
+def _python_imports(path: str, tree: ast.Module, modules: Dict[str, str]) -> set:
+    package = path[:-3].split("/")[:-1]
+    targets = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module or ""
+            if node.level:
+                prefix = package[: len(package) - (node.level - 1)] if node.level > 1 else package
+                base = ".".join(p for p in [*prefix, base] if p)
+            # 'from pkg import modul' bisa menunjuk submodul, bukan hanya atribut
+            names = [base] + [f"{base}.{alias.name}" if base else alias.name for alias in node.names]
+        else:
+            continue
+        for name in names:
+            while name:
+                if name in modules:
+                    targets.add(modules[name])
+                    break
+                name = name.rpartition(".")[0]
+    targets.discard(path)
+    return targets
+
+
+def _js_imports(path: str, text: str, existing: set) -> set:
+    targets = set()
+    base_dir = posixpath.dirname(path)
+    for spec in _JS_IMPORT_RE.findall(text):
+        base = posixpath.normpath(posixpath.join(base_dir, spec))
+        for suffix in _JS_RESOLVE_SUFFIXES:
+            if base + suffix in existing:
+                targets.add(base + suffix)
+                break
+    return targets
+
+
+def _go_imports(text: str, module: str, go_dirs: Dict[str, List[str]]) -> set:
+    targets = set()
+    for spec in _GO_IMPORT_RE.findall(text):
+        if spec.startswith(module + "/"):
+            targets.update(go_dirs.get(spec[len(module) + 1:], ()))
+    return targets
+
+
+# -------------------------
+# Digest
+# -------------------------
+def _static_score(path: str, size: int) -> tuple:
+    """Skor awal dari pohon saja (nama, lokasi, ukuran) dan alasannya."""
+    parts = path.split("/")
+    name = parts[-1]
+    language = detect_language(path)
+    score, reasons = 0.0, []
+    if name in ENTRY_POINT_NAMES:
+        score += 4
+        reasons.append("entry point")
+    if is_manifest(path):
+        score += 3
+        reasons.append("manifest")
+    if len(parts) == 1 and name.lower().startswith("readme"):
+        score += 2
+        reasons.append("README")
+    if language in CODE_LANGUAGES:
+        score += 1
+    elif not reasons:
+        score -= 1
+    if any(p.lower() in LOW_VALUE_DIRS for p in parts[:-1]) or name.startswith("test_"):
+        score -= 1.5
+    score -= 0.3 * (len(parts) - 1)
+    score += min(1.5, math.log10(1 + size / 1024))
+    return score, reasons
+
+
+def build_digest(repo_path: str, sha: str, tree: RepoTree, read: Callable[[str], Optional[str]],
+                 max_read: int = DIGEST_MAX_PARSED_FILES) -> dict:
+    """
+    Peringkat kepentingan file + outline simbol untuk satu commit.
+    Skor = entry point, manifest, ukuran, lokasi, dan fan-in dari graf import (berapa file
+    lain yang mengimpor file ini). Hanya max_read file teratas (menurut skor awal) yang dibaca
+    isinya lewat 'read'; sisanya dinilai dari pohon saja.
+    """
+    paths = [
+        p for p in tree.files()
+        if not any(part in MANIFEST_IGNORED_DIRS for part in p.split("/")[:-1])
+    ]
+    static = {p: _static_score(p, tree.size(p)) for p in paths}
+    to_read = sorted(
+        (p for p in paths if detect_language(p) in CODE_LANGUAGES and tree.size(p) <= DIGEST_MAX_FILE_BYTES),
+        key=lambda p: (-static[p][0], p),
+    )[:max_read]
+
+    existing = set(paths)
+    modules = _python_modules(paths)
+    go_module, go_dirs = None, defaultdict(list)
+    if "go.mod" in existing:
+        m = _GO_MODULE_RE.search(read("go.mod") or "")
+        go_module = m.group(1) if m else None
+        for p in paths:
+            if p.endswith(".go") and not p.endswith("_test.go"):
+                go_dirs[posixpath.dirname(p)].append(p)
+
+    fan_in: Dict[str, int] = defaultdict(int)
+    symbols: Dict[str, List[str]] = {}
+    for path in to_read:
+        text = read(path)
+        if not text:
+            continue
+        language = detect_language(path)
+        module = _parse_python(text) if language == "Python" else None
+        symbols[path] = outline(path, text, module)
+        if module is not None:
+            targets = _python_imports(path, module, modules)
+        elif language in ("JavaScript", "TypeScript", "Vue"):
+            targets = _js_imports(path, text, existing)
+        elif language == "Go" and go_module:
+            targets = _go_imports(text, go_module, go_dirs) - {path}
+        else:
+            targets = set()
+        for target in targets:
+            fan_in[target] += 1
+
+    files = []
+    for path in paths:
+        score, reasons = static[path]
+        reasons = list(reasons)
+        if fan_in.get(path):
+            score += 2 * math.log2(1 + fan_in[path])
+            reasons.append(f"diimpor {fan_in[path]} file")
+        score += min(1.5, 0.1 * len(symbols.get(path, ())))
+        files.append({
+            "path": path,
+            "score": round(score, 2),
+            "reasons": reasons,
+            "size": tree.size(path),
+            "symbols": symbols.get(path, []),
+        })
+    files.sort(key=lambda f: (-f["score"], f["path"]))
+    return {"repo_path": repo_path, "sha": sha, "parsed_files": len(symbols), "files": files}
+
+
+def render_digest(digest: dict, token_budget: int = DIGEST_TOKEN_BUDGET) -> str:
+    """Digest sebagai teks ringkas untuk prompt: file terpenting dulu, berhenti saat anggaran token habis."""
+    lines, used = [], 0
+    files = digest.get("files", [])
+    for i, entry in enumerate(files):
+        label = f"- {entry['path']}"
+        if entry["reasons"]:
+            label += f" ({', '.join(entry['reasons'])})"
+        block = [label] + ([f"    {'; '.join(entry['symbols'])}"] if entry["symbols"] else [])
+        cost = sum(approx_tokens(line) for line in block)
+        if lines and used + cost > token_budget:
+            lines.append(f"[... {len(files) - i} file lain dengan skor lebih rendah ...]")
+            break
+        lines.extend(block)
+        used += cost
+    return "\n".join(lines)
+
+
+def get_digest(repo_path: str, sha: str, tree: RepoTree, read: Callable[[str], Optional[str]],
+               max_read: int = DIGEST_MAX_PARSED_FILES, source: str = "snapshot") -> dict:
+    """Digest per commit dari artifact cache, atau dibangun lalu disimpan. 'source' membedakan digest penuh/parsial."""
+    if not _SHA_RE.fullmatch(sha):  # branch/HEAD bisa berubah: jangan di-cache
+        return build_digest(repo_path, sha, tree, read, max_read)
+    key = artifact_key(repo_path, sha, "digest", DIGEST_VERSION, source)
+    cached = artifact_cache.get_text(key)
+    if cached is not None:
+        return json.loads(cached)
+    digest = build_digest(repo_path, sha, tree, read, max_read)
+    artifact_cache.put_text(key, json.dumps(digest), repo_path, sha)
+    return digest
@@ -0,0 +1,381 @@
+# core/github_client.py
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Optional
+from urllib.parse import urlparse
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from core.telemetry import metrics
+
+GITHUB_HOSTS = ("api.github.com", "raw.githubusercontent.com", "codeload.github.com")
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+# -------------------------
+# State bersama (sync + async)
+# -------------------------
+class EtagStore:
+    """Cache validator ETag/Last-Modified + body terakhir per URL (LRU), dipakai kedua client."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # key -> (validators, status, content, headers, encoding)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def lookup(self, key: str) -> Optional[tuple]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                self._entries.move_to_end(key)
+            return entry
+
+    def conditional_headers(self, entry: Optional[tuple]) -> dict:
+        if not entry:
+            return {}
+        etag, last_modified = entry[0]
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def remember(self, key: str, status: int, content: bytes, headers: dict, encoding: Optional[str]):
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if not (etag or last_modified):
+            return
+        with self._lock:
+            self._entries[key] = ((etag, last_modified), status, content, dict(headers), encoding)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class GitHubStats:
+    """Rate limit terakhir yang dilaporkan GitHub + counter request/revalidasi/retry."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rate_limit = {"limit": None, "remaining": None, "reset": None, "resource": None}
+        self.counters = {"requests": 0, "revalidated": 0, "retries": 0}
+
+    def incr(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def record_rate_limit(self, headers):
+        if "X-RateLimit-Remaining" not in headers:
+            return
+        with self._lock:
+            self.rate_limit = {
+                "limit": int(headers.get("X-RateLimit-Limit", 0)),
+                "remaining": int(headers.get("X-RateLimit-Remaining", 0)),
+                "reset": int(headers.get("X-RateLimit-Reset", 0)),
+                "resource": headers.get("X-RateLimit-Resource"),
+            }
+
+    def snapshot(self) -> dict:
+        """Counter + rate limit terakhir dalam satu dict datar (untuk core.telemetry)."""
+        with self._lock:
+            return {
+                **self.counters,
+                "rate_limit_remaining": self.rate_limit["remaining"],
+                "rate_limit_limit": self.rate_limit["limit"],
+                "rate_limit_reset": self.rate_limit["reset"],
+            }
+
+
+_etag_store = EtagStore()
+_github_stats = GitHubStats()
+metrics.register_collector("github", _github_stats.snapshot)
+
+
+def _default_headers(url: str, token: Optional[str]) -> dict:
+    headers = {}
+    if urlparse(url).hostname in GITHUB_HOSTS:
+        headers["Accept"] = "application/vnd.github.v3+json"
+        if token:
+            headers["Authorization"] = f"token {token}"
+    return headers
+
+
+def _retry_delay(status: Optional[int], headers, attempt: int, base: float, cap: float) -> Optional[float]:
+    """Berapa lama menunggu sebelum retry, atau None jika respons tidak perlu di-retry."""
+    if status is not None:
+        is_rate_limited = status == 403 and (
+            headers.get("X-RateLimit-Remaining") == "0" or "Retry-After" in headers
+        )
+        if status not in RETRY_STATUS and not is_rate_limited:
+            return None
+        retry_after = headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        if headers.get("X-RateLimit-Remaining") == "0" and headers.get("X-RateLimit-Reset"):
+            return max(0.0, int(headers["X-RateLimit-Reset"]) - time.time()) + 1
+    # full jitter: acak di antara 0 dan batas eksponensial
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+# -------------------------
+# Client sync (requests)
+# -------------------------
+class GitHubClient:
+    """
+    Satu lapisan HTTP untuk semua akses GitHub:
+    - Session ber-pool (keep-alive) dengan batas koneksi per host.
+    - Revalidasi ETag / If-None-Match: respons 304 tidak memotong kuota rate limit.
+    - Retry dengan jittered exponential backoff untuk 403 (rate limit), 429 dan 5xx.
+    - Mencatat header X-RateLimit-* terakhir.
+    """
+
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        pool_connections: int = 4,
+        pool_maxsize: int = 16,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 8.0,
+        max_rate_limit_wait: float = 60.0,
+        etag_store: Optional[EtagStore] = None,
+        stats: Optional[GitHubStats] = None,
+    ):
+        self.token = token
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.max_rate_limit_wait = max_rate_limit_wait
+        self.etags = etag_store or EtagStore()
+        self._stats = stats or GitHubStats()
+
+        self.session = requests.Session()
+        # pool_block=True: maksimal pool_maxsize koneksi paralel per host, sisanya menunggu
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=True)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    @property
+    def rate_limit(self) -> dict:
+        return self._stats.rate_limit
+
+    @property
+    def stats(self) -> dict:
+        return self._stats.counters
+
+    @staticmethod
+    def _from_cache(url: str, entry: tuple) -> requests.Response:
+        _, status, content, headers, encoding = entry
+        resp = requests.Response()
+        resp.status_code = status
+        resp._content = content
+        resp.headers = CaseInsensitiveDict(headers)
+        resp.encoding = encoding
+        resp.url = url
+        resp.revalidated = True
+        return resp
+
+    def get(self, url: str, headers: Optional[dict] = None, timeout: float = 15, **kwargs) -> requests.Response:
+        """GET dengan pooling, revalidasi ETag dan retry. Respons 304 dikembalikan sebagai 200 dari cache."""
+        req_headers = {**_default_headers(url, self.token), **(headers or {})}
+        cache_key = url if not kwargs.get("params") else f"{url}?{sorted(kwargs['params'].items())}"
+        cached = self.etags.lookup(cache_key)
+        req_headers.update(self.etags.conditional_headers(cached))
+
+        r = None
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._stats.incr("requests")
+                r = self.session.get(url, headers=req_headers, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                r = None
+            else:
+                self._stats.record_rate_limit(r.headers)
+                if r.status_code == 304 and cached:
+                    self._stats.incr("revalidated")
+                    return self._from_cache(url, cached)
+
+            delay = _retry_delay(
+                r.status_code if r is not None else None,
+                r.headers if r is not None else {},
+                attempt, self.backoff_base, self.backoff_cap,
+            )
+            if delay is None or attempt >= self.max_retries or delay > self.max_rate_limit_wait:
+                break
+            self._stats.incr("retries")
+            time.sleep(delay)
+
+        if r is not None and r.status_code == 200:
+            self.etags.remember(cache_key, r.status_code, r.content, r.headers, r.encoding)
+        return r
+
+
+# -------------------------
+# Client async (aiohttp)
+# -------------------------
+class GitHubResponse:
+    """Respons ringan untuk client async, dengan antarmuka yang sama dipakai tools (status_code/text/json)."""
+
+    def __init__(self, url: str, status_code: int, content: bytes, headers, encoding: Optional[str] = None,
+                 revalidated: bool = False):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = CaseInsensitiveDict(headers)
+        self.encoding = encoding or "utf-8"
+        self.revalidated = revalidated
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding, errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class AsyncGitHubClient:
+    """
+    Padanan async dari GitHubClient di atas aiohttp: connection pool dengan batas total dan
+    per host, revalidasi ETag (cache ETag dan statistik dibagi dengan client sync), serta retry
+    dengan jittered backoff. Satu instance per event loop.
+    """
+
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        limit: int = 64,
+        limit_per_host: int = 16,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 8.0,
+        max_rate_limit_wait: float = 60.0,
+        etag_store: Optional[EtagStore] = None,
+        stats: Optional[GitHubStats] = None,
+    ):
+        self.token = token
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.max_rate_limit_wait = max_rate_limit_wait
+        self.etags = etag_store or EtagStore()
+        self._stats = stats or GitHubStats()
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def rate_limit(self) -> dict:
+        return self._stats.rate_limit
+
+    @property
+    def stats(self) -> dict:
+        return self._stats.counters
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def get(self, url: str, headers: Optional[dict] = None, timeout: float = 15) -> Optional[GitHubResponse]:
+        """GET async dengan pooling, revalidasi ETag dan retry."""
+        req_headers = {**_default_headers(url, self.token), **(headers or {})}
+        cached = self.etags.lookup(url)
+        req_headers.update(self.etags.conditional_headers(cached))
+        session = self._get_session()
+
+        r = None
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._stats.incr("requests")
+                async with session.get(
+                    url, headers=req_headers, timeout=aiohttp.ClientTimeout(total=timeout)
+                ) as resp:
+                    r = GitHubResponse(url, resp.status, await resp.read(), resp.headers, resp.charset)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if attempt >= self.max_retries:
+                    raise
+                r = None
+            else:
+                self._stats.record_rate_limit(r.headers)
+                if r.status_code == 304 and cached:
+                    self._stats.incr("revalidated")
+                    _, status, content, cached_headers, encoding = cached
+                    return GitHubResponse(url, status, content, cached_headers, encoding, revalidated=True)
+
+            delay = _retry_delay(
+                r.status_code if r is not None else None,
+                r.headers if r is not None else {},
+                attempt, self.backoff_base, self.backoff_cap,
+            )
+            if delay is None or attempt >= self.max_retries or delay > self.max_rate_limit_wait:
+                break
+            self._stats.incr("retries")
+            await asyncio.sleep(delay)
+
+        if r is not None and r.status_code == 200:
+            self.etags.remember(url, r.status_code, r.content, r.headers, r.encoding)
+        return r
+
+    async def aclose(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+
+_client: Optional[GitHubClient] = None
+_client_lock = threading.Lock()
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncGitHubClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_github_client() -> GitHubClient:
+    """Client GitHub bersama untuk seluruh proses (dibuat sekali, lazy)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GitHubClient(
+                    token=os.getenv("GITHUB_ACCESS_TOKEN"),
+                    pool_maxsize=int(os.getenv("GITHUB_POOL_MAXSIZE", "16")),
+                    max_retries=int(os.getenv("GITHUB_MAX_RETRIES", "3")),
+                    etag_store=_etag_store,
+                    stats=_github_stats,
+                )
+    return _client
+
+
+def get_async_github_client() -> AsyncGitHubClient:
+    """Client GitHub async untuk event loop yang sedang berjalan (dibuat sekali per loop)."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = AsyncGitHubClient(
+            token=os.getenv("GITHUB_ACCESS_TOKEN"),
+            limit_per_host=int(os.getenv("GITHUB_POOL_MAXSIZE", "16")),
+            max_retries=int(os.getenv("GITHUB_MAX_RETRIES", "3")),
+            etag_store=_etag_store,
+            stats=_github_stats,
+        )
+        _async_clients[loop] = client
+    return client
+
+
+async def aclose_async_github_client():
+    """Tutup client async milik loop saat ini (dipanggil sebelum loop berhenti)."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
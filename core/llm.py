@@ -0,0 +1,71 @@
+# core/llm.py
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+from langchain_groq import ChatGroq
+
+from core.telemetry import tracing_callback
+
+load_dotenv()
+
+# Tier model: model kecil/cepat untuk agent dan penjelasan, model besar hanya bila perlu
+LLM_MODELS = {
+    "fast": os.getenv("LLM_FAST_MODEL", "llama-3.1-8b-instant"),
+    "large": os.getenv("LLM_LARGE_MODEL", "llama-3.3-70b-versatile"),
+}
+
+# Tugas -> tier; bisa diganti per tugas lewat env LLM_ROUTE_<TUGAS> (mis. LLM_ROUTE_AGENT=large)
+LLM_ROUTES = {
+    "agent": "fast",
+    "analysis": "fast",
+    "synthesis": "fast",
+    "synthesis_retry": "large",  # jawaban model kecil tidak lolos validasi skema
+}
+
+# Prompt yang (perkiraan) lebih besar dari ini langsung memakai model besar; 0 = nonaktif
+LLM_LARGE_PROMPT_TOKENS = int(os.getenv("LLM_LARGE_PROMPT_TOKENS", "0"))
+
+_lock = threading.Lock()
+_models: Dict[Tuple[str, bool], ChatGroq] = {}
+
+
+def model_for(task: str, prompt_tokens: int = 0) -> str:
+    """Nama model untuk sebuah tugas (lihat LLM_ROUTES)."""
+    tier = os.getenv(f"LLM_ROUTE_{task.upper()}") or LLM_ROUTES.get(task, "fast")
+    if tier == "fast" and LLM_LARGE_PROMPT_TOKENS and prompt_tokens > LLM_LARGE_PROMPT_TOKENS:
+        tier = "large"
+    return LLM_MODELS.get(tier, tier)  # tier yang tidak dikenal dianggap nama model
+
+
+def get_model(model: str, streaming: bool = False) -> ChatGroq:
+    """
+    Chat model per (model, streaming), dibuat sekali per proses. Semua instance memakai klien
+    SDK Groq (sync + async, beserta connection pool-nya) yang sama, dan setiap panggilannya
+    tercatat sebagai span 'llm' (core.telemetry).
+    """
+    key = (model, streaming)
+    with _lock:
+        llm = _models.get(key)
+        if llm is None:
+            shared: Optional[ChatGroq] = next(iter(_models.values()), None)
+            kwargs = {"client": shared.client, "async_client": shared.async_client} if shared else {}
+            llm = _models[key] = ChatGroq(
+                model_name=model,
+                groq_api_key=os.getenv("GROQ_API_KEY"),
+                temperature=0,
+                streaming=streaming,
+                callbacks=[tracing_callback],
+                **kwargs,
+            )
+        return llm
+
+
+def get_llm(task: str = "analysis", prompt_tokens: int = 0, streaming: bool = False) -> ChatGroq:
+    """Chat model bersama untuk sebuah tugas."""
+    return get_model(model_for(task, prompt_tokens), streaming)
+
+
+def model_name(llm) -> str:
+    return getattr(llm, "model_name", None) or type(llm).__name__
@@ -0,0 +1,352 @@
+# core/loop_guard.py
+import json
+import os
+import posixpath
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain.agents import AgentExecutor
+from langchain_core.agents import AgentAction, AgentFinish, AgentStep
+from langchain_core.exceptions import OutputParserException
+
+from core.observations import cap_observation
+from core.repo_meta import repo_metadata
+from core.telemetry import activate, debug, metrics, span, start_span
+from core.tools import _is_error_result, _normalize_repo_url
+
+# Iterasi terbuang berturut-turut (semua aksi mengulang panggilan sebelumnya, atau output
+# tidak bisa di-parse) sebelum agent dipaksa memberi Final Answer
+AGENT_LOOP_MAX_WASTED = int(os.getenv("AGENT_LOOP_MAX_WASTED", "2"))
+# Anggaran token per observasi pada jawaban cadangan (bila jawaban paksa pun gagal)
+FALLBACK_OBSERVATION_TOKENS = 600
+FALLBACK_OBSERVATIONS = 2
+
+PARSE_ERROR_TOOL = "_Exception"
+FORCE_ANSWER_TOOL = "_loop_guard"
+FORCE_ANSWER_LOG = "Thought: I keep repeating actions whose results I already have."
+FORCE_ANSWER_NOTE = (
+    "You are repeating actions whose results are already in the observations above. "
+    "Do not call any more tools. Using only the information you already have, reply now with:\n"
+    "Thought: [your reasoning]\n"
+    "Final Answer: [the answer for the user]"
+)
+
+_DONE = object()  # penanda generator langkah induk sudah habis
+
+# Guard milik run agent yang sedang berjalan; diset oleh GuardedAgentExecutor (atau pipeline)
+current_run_guard: ContextVar[Optional["RunGuard"]] = ContextVar("current_run_guard", default=None)
+
+
+def _repo_path(value: str) -> str:
+    try:
+        repo_path = _normalize_repo_url(value.strip())
+    except ValueError:
+        return value.strip()
+    return repo_path[:-4] if repo_path.endswith(".git") else repo_path
+
+
+def _canonical_path(value: str) -> str:
+    path = posixpath.normpath(value.strip()).strip("/")
+    return "" if path == "." else path
+
+
+def action_key(tool: str, tool_input: Any) -> Tuple[str, str]:
+    """
+    Key memo sebuah aksi: nama tool + argumen yang dinormalisasi (repo kanonik, branch default
+    = tanpa branch, path tanpa './' dan '/' di ujung, angka dalam string = angka), sehingga
+    'https://github.com/A/b' dan 'a/b' dengan branch default dianggap panggilan yang sama.
+    """
+    if isinstance(tool_input, str):
+        return tool, tool_input.strip()
+    if not isinstance(tool_input, dict):
+        return tool, json.dumps(tool_input, sort_keys=True, default=str)
+    args, repo_path = {}, None
+    for name, value in tool_input.items():
+        if value is None or value == "":
+            continue
+        if isinstance(value, str):
+            if name == "repo_url":
+                repo_path = _repo_path(value)
+                value = repo_path.lower()  # owner/repo di GitHub tidak peka huruf besar-kecil
+            elif name in ("path", "file_path"):
+                value = _canonical_path(value)
+            elif value.strip().isdigit():
+                value = int(value)
+        args[name] = value
+    if args.get("branch") and repo_path:
+        meta = repo_metadata.peek(repo_path)
+        if meta is not None and args["branch"] == meta.default_branch:
+            del args["branch"]
+    if args.get("path") == "":
+        del args["path"]  # '/' dan '' sama dengan nilai default (root)
+    return tool, json.dumps(args, sort_keys=True, default=str)
+
+
+class RunGuard:
+    """
+    Status per run agent: memo hasil tool pada argumen yang dinormalisasi (panggilan berulang
+    tidak memanggil GitHub lagi) dan deteksi siklus aksi/observasi yang berulang. Iterasi yang
+    seluruh aksinya mengulang panggilan sebelumnya, atau yang output-nya gagal di-parse, dicatat
+    sebagai iterasi terbuang; setelah AGENT_LOOP_MAX_WASTED berturut-turut agent dipaksa menjawab.
+    """
+
+    def __init__(self, max_wasted: int = AGENT_LOOP_MAX_WASTED):
+        self.max_wasted = max_wasted
+        self.iteration = -1
+        self.memo_hits = 0
+        self.wasted: List[int] = []  # indeks iterasi (= indeks panggilan LLM agent) yang terbuang
+        self.forced = False
+        self._memo: Dict[Tuple[str, str], Tuple[int, str]] = {}
+        self._replayed: Dict[int, str] = {}  # id(AgentAction) -> observasi asli dari memo
+        self._streak = 0
+
+    @property
+    def must_answer(self) -> bool:
+        return self.max_wasted > 0 and self._streak >= self.max_wasted
+
+    def begin_iteration(self):
+        self.iteration += 1
+
+    def lookup(self, action: AgentAction) -> Optional[str]:
+        """Observasi dari memo (plus catatan untuk model) bila aksi yang sama sudah pernah dijalankan."""
+        hit = self._memo.get(action_key(action.tool, action.tool_input))
+        if hit is None:
+            return None
+        first, observation = hit
+        self.memo_hits += 1
+        metrics.inc("agent_memo_hits_total")
+        self._replayed[id(action)] = observation
+        return (
+            f"{observation}\n\n[Catatan: aksi ini identik dengan aksi pada langkah {first + 1}; "
+            f"hasil di atas diambil dari memo. Jangan ulangi - gunakan tool lain atau berikan Final Answer.]"
+        )
+
+    def remember(self, action: AgentAction, observation: Any):
+        # pesan error (mis. gangguan jaringan) tidak di-memo: panggilan ulang boleh mencoba lagi
+        if isinstance(observation, str) and not _is_error_result(observation):
+            self._memo.setdefault(action_key(action.tool, action.tool_input), (self.iteration, observation))
+
+    def raw_observation(self, action: AgentAction, observation: Any) -> Any:
+        """Observasi tanpa catatan memo (untuk tool return_direct yang langsung menjadi jawaban)."""
+        return self._replayed.get(id(action), observation)
+
+    def end_iteration(self, steps: List[AgentStep]):
+        wasted = bool(steps) and all(
+            id(step.action) in self._replayed or step.action.tool == PARSE_ERROR_TOOL for step in steps
+        )
+        if wasted:
+            self.wasted.append(self.iteration)
+            self._streak += 1
+        else:
+            self._streak = 0
+
+    def fallback_answer(self, intermediate_steps: List[Tuple[AgentAction, Any]]) -> str:
+        """Jawaban cadangan dari observasi terakhir yang berhasil, bila jawaban paksa gagal di-parse."""
+        observations: List[str] = []
+        for action, observation in reversed(intermediate_steps):
+            observation = str(self.raw_observation(action, observation))
+            if action.tool.startswith("_") or _is_error_result(observation) or observation in observations:
+                continue
+            observations.append(observation)
+            if len(observations) == FALLBACK_OBSERVATIONS:
+                break
+        if not observations:
+            return "Agent berhenti karena terus mengulang langkah yang sama tanpa menemukan jawaban."
+        return "Agent berhenti karena mengulang langkah yang sama. Data terakhir yang berhasil dikumpulkan:\n\n" + "\n\n".join(
+            cap_observation(o, budget=FALLBACK_OBSERVATION_TOKENS) for o in reversed(observations)
+        )
+
+    def stats(self, token_steps: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """
+        Ringkasan run. token_steps = TokenUsage.steps run yang sama (satu entri per panggilan
+        LLM agent, berurutan): dipakai untuk menghitung token yang terbuang.
+        """
+        wasted_tokens = 0
+        for i in self.wasted:
+            if token_steps and i < len(token_steps):
+                wasted_tokens += token_steps[i]["prompt_tokens"] + token_steps[i]["completion_tokens"]
+        return {
+            "iterations": self.iteration + 1,
+            "memo_hits": self.memo_hits,
+            "wasted_iterations": len(self.wasted),
+            "wasted_tokens": wasted_tokens,
+            "forced_answer": self.forced,
+        }
+
+
+class GuardedAgentExecutor(AgentExecutor):
+    """
+    AgentExecutor dengan RunGuard per run: aksi yang identik dengan aksi sebelumnya dijawab dari
+    memo, dan bila agent terus berputar di aksi/observasi yang sama ia dipaksa memberi Final Answer
+    (satu panggilan LLM tambahan tanpa tool; bila itu pun gagal, jawaban cadangan dari observasi).
+    """
+
+    def _guard(self) -> RunGuard:
+        # di luar _call/_acall (langkah dipanggil langsung): guard sementara tanpa memo bersama
+        return current_run_guard.get() or RunGuard()
+
+    # -------------------------
+    # Run
+    # -------------------------
+    def _call(self, inputs, run_manager=None):
+        with span("agent", "run"):
+            if current_run_guard.get() is not None:
+                return super()._call(inputs, run_manager)
+            token = current_run_guard.set(RunGuard())
+            try:
+                return super()._call(inputs, run_manager)
+            finally:
+                current_run_guard.reset(token)
+
+    async def _acall(self, inputs, run_manager=None):
+        with span("agent", "run"):
+            if current_run_guard.get() is not None:
+                return await super()._acall(inputs, run_manager)
+            token = current_run_guard.set(RunGuard())
+            try:
+                return await super()._acall(inputs, run_manager)
+            finally:
+                current_run_guard.reset(token)
+
+    # -------------------------
+    # Langkah
+    # -------------------------
+    # Setiap iterasi (panggilan LLM + tool-nya) tercatat sebagai span 'agent'; span tool dan LLM
+    # di dalamnya menjadi anaknya. Span iterasi hanya aktif selama generator induk bekerja
+    # (activate di sekitar next()), tidak selama yield, supaya current_span pemanggil tidak berubah.
+    def _iter_next_step(self, name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager=None):
+        guard = self._guard()
+        guard.begin_iteration()
+        s = start_span("agent", "iteration", index=guard.iteration)
+        try:
+            if guard.must_answer:
+                s.set(forced_answer=True)
+                with activate(s):
+                    answer = self._force_answer(guard, inputs, intermediate_steps, run_manager)
+                s.finish()
+                yield answer
+                return
+            steps = []
+            inner = super()._iter_next_step(
+                name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager
+            )
+            try:
+                while True:
+                    with activate(s):
+                        item = next(inner, _DONE)
+                    if item is _DONE:
+                        break
+                    if isinstance(item, AgentStep):
+                        steps.append(item)
+                    yield item
+            finally:
+                inner.close()
+            self._end_iteration(guard, steps, s)
+        except BaseException as e:
+            s.finish(e)
+            raise
+        else:
+            s.finish()
+
+    async def _aiter_next_step(self, name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager=None):
+        guard = self._guard()
+        guard.begin_iteration()
+        s = start_span("agent", "iteration", index=guard.iteration)
+        try:
+            if guard.must_answer:
+                s.set(forced_answer=True)
+                with activate(s):
+                    answer = await self._aforce_answer(guard, inputs, intermediate_steps, run_manager)
+                s.finish()
+                yield answer
+                return
+            steps = []
+            inner = super()._aiter_next_step(
+                name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager
+            )
+            try:
+                while True:
+                    with activate(s):
+                        item = await anext(inner, _DONE)
+                    if item is _DONE:
+                        break
+                    if isinstance(item, AgentStep):
+                        steps.append(item)
+                    yield item
+            finally:
+                await inner.aclose()
+            self._end_iteration(guard, steps, s)
+        except BaseException as e:
+            s.finish(e)
+            raise
+        else:
+            s.finish()
+
+    @staticmethod
+    def _end_iteration(guard: RunGuard, steps: List[AgentStep], s):
+        wasted_before = len(guard.wasted)
+        guard.end_iteration(steps)
+        wasted = len(guard.wasted) > wasted_before
+        s.set(actions=[step.action.tool for step in steps], wasted=wasted)
+        if wasted:
+            metrics.inc("agent_wasted_iterations_total")
+
+    def _perform_agent_action(self, name_to_tool_map, color_mapping, agent_action, run_manager=None):
+        guard = self._guard()
+        observation = guard.lookup(agent_action)
+        if observation is not None:
+            return AgentStep(action=agent_action, observation=observation)
+        step = super()._perform_agent_action(name_to_tool_map, color_mapping, agent_action, run_manager)
+        guard.remember(agent_action, step.observation)
+        return step
+
+    async def _aperform_agent_action(self, name_to_tool_map, color_mapping, agent_action, run_manager=None):
+        guard = self._guard()
+        observation = guard.lookup(agent_action)
+        if observation is not None:
+            return AgentStep(action=agent_action, observation=observation)
+        step = await super()._aperform_agent_action(name_to_tool_map, color_mapping, agent_action, run_manager)
+        guard.remember(agent_action, step.observation)
+        return step
+
+    def _get_tool_return(self, next_step_output):
+        action, observation = next_step_output
+        return super()._get_tool_return((action, self._guard().raw_observation(action, observation)))
+
+    # -------------------------
+    # Jawaban paksa
+    # -------------------------
+    def _forced_steps(self, guard: RunGuard, intermediate_steps):
+        guard.forced = True
+        metrics.inc("agent_forced_answers_total")
+        debug(f"♻️ {guard.max_wasted} iterasi agent terbuang berturut-turut (aksi berulang/output tidak valid): Final Answer dipaksa")
+        steps = self._prepare_intermediate_steps(intermediate_steps)
+        return steps + [(AgentAction(FORCE_ANSWER_TOOL, {}, FORCE_ANSWER_LOG), FORCE_ANSWER_NOTE)]
+
+    def _finish(self, guard: RunGuard, output, intermediate_steps) -> AgentFinish:
+        if isinstance(output, AgentFinish):
+            return output
+        key = self._action_agent.return_values[0] if self._action_agent.return_values else "output"
+        return AgentFinish({key: guard.fallback_answer(intermediate_steps)}, "")
+
+    def _force_answer(self, guard, inputs, intermediate_steps, run_manager=None) -> AgentFinish:
+        try:
+            output = self._action_agent.plan(
+                self._forced_steps(guard, intermediate_steps),
+                callbacks=run_manager.get_child() if run_manager else None,
+                **inputs,
+            )
+        except OutputParserException:
+            output = None
+        return self._finish(guard, output, intermediate_steps)
+
+    async def _aforce_answer(self, guard, inputs, intermediate_steps, run_manager=None) -> AgentFinish:
+        try:
+            output = await self._action_agent.aplan(
+                self._forced_steps(guard, intermediate_steps),
+                callbacks=run_manager.get_child() if run_manager else None,
+                **inputs,
+            )
+        except OutputParserException:
+            output = None
+        return self._finish(guard, output, intermediate_steps)
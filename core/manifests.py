@@ -0,0 +1,63 @@
+# core/manifests.py
+import posixpath
+from typing import List, Optional
+
+from core.repo_tree import RepoTree
+
+# Nama file dependensi/manifest yang dikenali (termasuk manifest workspace bersarang)
+MANIFEST_FILENAMES = [
+    "requirements.txt",
+    "pyproject.toml",
+    "Pipfile",
+    "environment.yml",
+    "setup.py",
+    "package.json",
+    "go.mod",
+    "Cargo.toml",
+    "pom.xml",
+    "build.gradle",
+    "Gemfile",
+    "composer.json",
+]
+
+# Kandidat root lama — dipakai bila pohon repo tidak tersedia
+ROOT_MANIFEST_CANDIDATES = [
+    "requirements.txt",
+    "pyproject.toml",
+    "Pipfile",
+    "environment.yml",
+    "package.json",
+    "setup.py",
+]
+
+MANIFEST_MAX_DEPTH = 3   # root = 0, 'packages/web/package.json' = 2
+MANIFEST_MAX_FILES = 12
+MANIFEST_IGNORED_DIRS = {"node_modules", "vendor", "third_party", "dist", "build", ".git", "site-packages"}
+
+_PRIORITY = {name: i for i, name in enumerate(MANIFEST_FILENAMES)}
+
+
+def is_manifest(path: str) -> bool:
+    return posixpath.basename(path) in _PRIORITY
+
+
+def discover_manifests(tree: Optional[RepoTree], max_files: int = MANIFEST_MAX_FILES) -> List[str]:
+    """
+    Cari manifest yang benar-benar ada di pohon repo (root dulu, lalu yang bersarang),
+    tanpa request jaringan. Bila tree None, kembalikan kandidat root lama.
+    """
+    if tree is None:
+        return list(ROOT_MANIFEST_CANDIDATES)
+
+    found = []
+    for path in tree.files():
+        parts = path.split("/")
+        if len(parts) - 1 > MANIFEST_MAX_DEPTH:
+            continue
+        if any(p in MANIFEST_IGNORED_DIRS for p in parts[:-1]):
+            continue
+        if is_manifest(path):
+            found.append(path)
+
+    found.sort(key=lambda p: (p.count("/"), _PRIORITY[posixpath.basename(p)], p))
+    return found[:max_files]
@@ -0,0 +1,148 @@
+# core/observations.py
+import os
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain.schema import AIMessage, HumanMessage
+
+# Anggaran token per observasi tool (isi file, README, manifest, ...)
+OBSERVATION_TOKEN_BUDGET = int(os.getenv("OBSERVATION_TOKEN_BUDGET", "1500"))
+# Langkah terakhir yang observasinya dikirim utuh; langkah yang lebih lama diringkas
+SCRATCHPAD_KEEP_LAST = int(os.getenv("SCRATCHPAD_KEEP_LAST", "2"))
+SCRATCHPAD_SUMMARY_CHARS = int(os.getenv("SCRATCHPAD_SUMMARY_CHARS", "300"))
+
+
+def approx_tokens(text: str) -> int:
+    """Perkiraan jumlah token (~4 karakter per token), cukup untuk menjaga anggaran prompt."""
+    return len(text) // 4 + 1
+
+
+def cap_observation(text: str, budget: int = OBSERVATION_TOKEN_BUDGET, hint: str = "") -> str:
+    """
+    Potong observasi yang melebihi anggaran token: simpan bagian awal (2/3) dan akhir (1/3)
+    per baris, dengan catatan berapa baris yang dihilangkan dan cara membaca sisanya.
+    """
+    if approx_tokens(text) <= budget:
+        return text
+    max_chars = budget * 4
+    lines = text.splitlines()
+    head, tail, used = [], [], 0
+    for line in lines:
+        if used + len(line) + 1 > max_chars * 2 // 3:
+            break
+        head.append(line)
+        used += len(line) + 1
+    used = 0
+    for line in reversed(lines[len(head):]):
+        if used + len(line) + 1 > max_chars // 3:
+            break
+        tail.insert(0, line)
+        used += len(line) + 1
+    if not head:  # satu baris raksasa (misalnya file minified)
+        return f"{text[:max_chars]}\n[... {len(text) - max_chars} karakter dipotong{hint} ...]"
+    omitted = len(lines) - len(head) - len(tail)
+    note = f"[... {omitted} baris dipotong (baris {len(head) + 1}-{len(head) + omitted}){hint} ...]"
+    return "\n".join(head + [note] + tail)
+
+
+def compact_scratchpad(
+    intermediate_steps: List[Tuple[Any, str]],
+    keep_last: int = SCRATCHPAD_KEEP_LAST,
+    summary_chars: int = SCRATCHPAD_SUMMARY_CHARS,
+) -> list:
+    """
+    Pengganti format_log_to_messages: langkah terbaru dikirim utuh, observasi langkah yang
+    lebih lama diringkas menjadi potongan pendek, sehingga prompt tidak tumbuh kuadratik
+    terhadap jumlah iterasi.
+    """
+    messages = []
+    cutoff = len(intermediate_steps) - keep_last
+    batch: List[str] = []
+    for i, (action, observation) in enumerate(intermediate_steps):
+        observation = str(observation)
+        if i < cutoff and len(observation) > summary_chars:
+            observation = (
+                f"{observation[:summary_chars].rstrip()}\n"
+                f"[... observasi lama diringkas, {approx_tokens(observation)} token ...]"
+            )
+        # aksi paralel dari satu langkah berbagi log yang sama: satu pesan AI, observasi digabung berurutan
+        same_step = i + 1 < len(intermediate_steps) and intermediate_steps[i + 1][0].log == action.log
+        if batch or same_step:
+            batch.append(f"Observation {len(batch) + 1} ({action.tool}):\n{observation}")
+            if same_step:
+                continue
+            observation = "\n\n".join(batch)
+            batch = []
+        messages.append(AIMessage(content=action.log))
+        messages.append(HumanMessage(content=observation))
+    return messages
+
+
+def response_usage(response) -> Dict[str, Any]:
+    """
+    Token sebuah LLMResult: token_usage/usage_metadata dari provider bila ada, selain itu
+    completion diperkirakan dari teks (prompt_tokens 0 = tidak diketahui).
+    """
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    text = ""
+    for gens in response.generations:
+        for gen in gens:
+            text += gen.text
+            meta = getattr(getattr(gen, "message", None), "usage_metadata", None)
+            if meta and not usage:
+                usage = {"prompt_tokens": meta.get("input_tokens"), "completion_tokens": meta.get("output_tokens")}
+    return {
+        "prompt_tokens": usage.get("prompt_tokens") or 0,
+        "completion_tokens": usage.get("completion_tokens") or approx_tokens(text),
+        "estimated": not usage,
+    }
+
+
+class TokenUsage(BaseCallbackHandler):
+    """
+    Penghitung token per langkah (setiap panggilan LLM) dan per run.
+    Memakai token_usage/usage_metadata dari provider bila ada, selain itu perkiraan dari teks.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Dict[Any, Tuple[float, int]] = {}
+        self.steps: List[Dict[str, Any]] = []
+
+    def _start(self, run_id, prompt_text: str):
+        with self._lock:
+            self._pending[run_id] = (time.perf_counter(), approx_tokens(prompt_text))
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, "".join(prompts))
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id, "".join(str(m.content) for batch in messages for m in batch))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        with self._lock:
+            started, est_prompt = self._pending.pop(run_id, (time.perf_counter(), 0))
+        usage = response_usage(response)
+        step = {
+            "prompt_tokens": usage["prompt_tokens"] or est_prompt,
+            "completion_tokens": usage["completion_tokens"],
+            "estimated": usage["estimated"],
+            "elapsed": time.perf_counter() - started,
+        }
+        with self._lock:
+            self.steps.append(step)
+
+    def totals(self) -> Dict[str, Any]:
+        with self._lock:
+            steps = list(self.steps)
+        prompt = sum(s["prompt_tokens"] for s in steps)
+        completion = sum(s["completion_tokens"] for s in steps)
+        return {
+            "steps": len(steps),
+            "prompt_tokens": prompt,
+            "completion_tokens": completion,
+            "total_tokens": prompt + completion,
+            "max_prompt_tokens": max((s["prompt_tokens"] for s in steps), default=0),
+        }
@@ -0,0 +1,86 @@
+# core/parallel_agent.py
+import asyncio
+import json
+import os
+import weakref
+from typing import Any, List, Union
+
+from langchain.agents.output_parsers import ReActJsonSingleInputOutputParser
+from langchain_core.agents import AgentAction, AgentFinish
+from langchain_core.exceptions import OutputParserException
+
+from core.loop_guard import GuardedAgentExecutor
+from core.telemetry import debug, metrics
+
+# Batas tool yang berjalan bersamaan dalam satu langkah, dan jumlah aksi per langkah
+AGENT_MAX_PARALLEL_TOOLS = int(os.getenv("AGENT_MAX_PARALLEL_TOOLS", "4"))
+AGENT_MAX_ACTIONS_PER_STEP = int(os.getenv("AGENT_MAX_ACTIONS_PER_STEP", "6"))
+
+FINAL_ANSWER_ACTION = "Final Answer:"
+
+# Semaphore per run agent (run_id): batas paralel berlaku per jawaban, bukan global
+_run_slots: "weakref.WeakValueDictionary[Any, asyncio.Semaphore]" = weakref.WeakValueDictionary()
+
+
+class ReActJsonMultiActionOutputParser(ReActJsonSingleInputOutputParser):
+    """
+    Seperti ReActJsonSingleInputOutputParser, tetapi blok JSON boleh berupa daftar aksi
+    [{"action", "action_input"}, ...] untuk tool yang saling independen. Daftar dikembalikan
+    sebagai list AgentAction (urutan dipertahankan, aksi duplikat dibuang) sehingga
+    AgentExecutor menjalankannya bersamaan dalam satu langkah.
+    """
+
+    max_actions: int = AGENT_MAX_ACTIONS_PER_STEP
+
+    def parse(self, text: str) -> Union[AgentAction, List[AgentAction], AgentFinish]:
+        found = self.pattern.search(text)
+        if found:
+            try:
+                response = json.loads(found.group(1).strip())
+            except ValueError:
+                response = None
+            if isinstance(response, list):
+                if FINAL_ANSWER_ACTION in text:
+                    raise OutputParserException(
+                        f"Parsing LLM output produced a final answer and a parse-able action: {text}"
+                    )
+                actions, seen = [], set()
+                for item in response:
+                    if not isinstance(item, dict) or "action" not in item:
+                        raise OutputParserException(f"Could not parse LLM output: {text}")
+                    tool_input = item.get("action_input", {})
+                    key = (item["action"], json.dumps(tool_input, sort_keys=True, default=str))
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    actions.append(AgentAction(item["action"], tool_input, text))
+                if not actions:
+                    raise OutputParserException(f"Could not parse LLM output: {text}")
+                if len(actions) > self.max_actions:
+                    metrics.inc("agent_truncated_actions_total", len(actions) - self.max_actions)
+                    debug(f"⚠️ {len(actions)} aksi dalam satu langkah, hanya {self.max_actions} pertama yang dijalankan")
+                    actions = actions[:self.max_actions]
+                return actions[0] if len(actions) == 1 else actions
+        return super().parse(text)
+
+    @property
+    def _type(self) -> str:
+        return "react-json-multi-action"
+
+
+class ParallelAgentExecutor(GuardedAgentExecutor):
+    """
+    AgentExecutor yang membatasi jumlah tool yang berjalan bersamaan untuk aksi-aksi dari
+    satu langkah (AgentExecutor menjalankannya dengan asyncio.gather; observasi kembali
+    sesuai urutan aksi). Jalur sync tetap menjalankan aksi berurutan.
+    """
+
+    max_parallel_tools: int = AGENT_MAX_PARALLEL_TOOLS
+
+    async def _aperform_agent_action(self, name_to_tool_map, color_mapping, agent_action, run_manager=None):
+        key = run_manager.run_id if run_manager is not None else None
+        slots = _run_slots.get(key)
+        if slots is None:
+            slots = _run_slots[key] = asyncio.Semaphore(self.max_parallel_tools)
+        async with slots:
+            return await super()._aperform_agent_action(name_to_tool_map, color_mapping, agent_action, run_manager)
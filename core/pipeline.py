@@ -0,0 +1,81 @@
+# core/pipeline.py
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from core.telemetry import span
+
+# Timeout default per stage (detik)
+STAGE_TIMEOUTS = {
+    "agent": 180,
+    "structure": 90,
+    "dependencies": 90,
+    "synthesis": 120,
+    "pdf": 60,
+}
+
+
+@dataclass
+class StageResult:
+    name: str
+    value: Any = None
+    elapsed: float = 0.0
+    error: Optional[Exception] = None
+    timed_out: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and not self.timed_out
+
+
+@dataclass
+class PipelineResult:
+    answer: str
+    pdf: Optional[bytes]  # laporan PDF yang dirender di memori (dikirim langsung sebagai lampiran)
+    timings: Dict[str, float] = field(default_factory=dict)
+    tokens: Dict[str, Any] = field(default_factory=dict)  # total token per run (TokenUsage.totals)
+    token_steps: List[Dict[str, Any]] = field(default_factory=list)  # token per langkah LLM
+    report: Any = None  # core.report.Report: dokumen bersama untuk PDF dan teks di chat
+
+
+async def arun_stage(
+    name: str, fn: Callable[[], Awaitable[Any]], timeout: Optional[float] = None
+) -> StageResult:
+    """Jalankan satu stage (coroutine factory) dengan timeout dan catat durasinya."""
+    if timeout is None:
+        timeout = STAGE_TIMEOUTS.get(name)
+    start = time.perf_counter()
+    with span("stage", name) as s:
+        try:
+            value = await asyncio.wait_for(fn(), timeout=timeout)
+            return StageResult(name, value=value, elapsed=time.perf_counter() - start)
+        except asyncio.TimeoutError:
+            s.set(timed_out=True)
+            return StageResult(name, timed_out=True, elapsed=time.perf_counter() - start)
+        except Exception as e:
+            s.set(error=f"{type(e).__name__}: {e}")
+            return StageResult(name, error=e, elapsed=time.perf_counter() - start)
+
+
+async def arun_stages(
+    stages: Dict[str, Callable[[], Awaitable[Any]]],
+    timeouts: Optional[Dict[str, float]] = None,
+    on_done: Optional[Callable[[StageResult], None]] = None,
+) -> Dict[str, StageResult]:
+    """
+    Jalankan beberapa stage independen secara konkuren di event loop, masing-masing dengan
+    timeout sendiri. Stage yang timeout dibatalkan dan ditandai timed_out.
+    on_done (opsional) dipanggil begitu tiap stage selesai, tanpa menunggu stage lain.
+    """
+    timeouts = {**STAGE_TIMEOUTS, **(timeouts or {})}
+    names = list(stages)
+
+    async def run(name):
+        result = await arun_stage(name, stages[name], timeouts.get(name))
+        if on_done is not None:
+            on_done(result)
+        return result
+
+    results = await asyncio.gather(*(run(n) for n in names))
+    return dict(zip(names, results))
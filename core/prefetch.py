@@ -0,0 +1,133 @@
+# core/prefetch.py
+import asyncio
+import os
+import threading
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from core.telemetry import metrics
+
+PREFETCH_ENABLED = os.getenv("PREFETCH", "1") == "1"
+
+# Prefetch milik permintaan yang sedang berjalan; diset oleh pipeline, dibaca oleh tool
+current_prefetch: ContextVar[Optional["RepoPrefetch"]] = ContextVar("current_prefetch", default=None)
+
+# jenis data -> fungsi async (repo_path) yang mengambilnya; didaftarkan oleh modul pemilik data
+_fetchers: Dict[str, Callable[[str], Awaitable[Any]]] = {}
+
+_stats_lock = threading.Lock()
+_stats = {"started": 0, "cancelled": 0, "used": 0, "unused": 0, "hits": 0, "waited": 0, "failed": 0}
+
+
+def register_prefetcher(kind: str, fetch: Callable[[str], Awaitable[Any]]):
+    _fetchers[kind] = fetch
+
+
+def _count(key: str, n: int = 1):
+    with _stats_lock:
+        _stats[key] += n
+
+
+class RepoPrefetch:
+    """
+    Cache per permintaan: semua prefetcher terdaftar (metadata, tree, README, bahasa, ...)
+    dijalankan paralel begitu URL repo diketahui, sebelum agent memanggil LLM pertama.
+    Tool membaca hasilnya lewat aget()/peek(); hasil yang masih diambil ditunggu, bukan diulang.
+    """
+
+    def __init__(self, repo_path: str):
+        self.repo_path = repo_path
+        self._tasks: Dict[str, asyncio.Future] = {}
+        self._used = set()
+        self._closed = False
+
+    def start(self) -> "RepoPrefetch":
+        for kind, fetch in _fetchers.items():
+            self._tasks[kind] = asyncio.ensure_future(fetch(self.repo_path))
+        _count("started")
+        return self
+
+    def covers(self, repo_path: str, branch: Optional[str] = None) -> bool:
+        """Prefetch hanya untuk default branch repo ini."""
+        return not self._closed and not branch and repo_path == self.repo_path
+
+    def _mark_used(self, kind: str, waited: bool):
+        self._used.add(kind)
+        _count("hits")
+        if waited:
+            _count("waited")
+
+    async def aget(self, kind: str) -> Optional[Any]:
+        """Hasil prefetch (ditunggu bila masih berjalan), atau None bila tidak ada/gagal."""
+        task = self._tasks.get(kind)
+        if task is None or task.cancelled():
+            return None
+        waited = not task.done()
+        try:
+            value = await asyncio.shield(task)
+        except Exception:
+            return None
+        self._mark_used(kind, waited)
+        return value
+
+    def peek(self, kind: str) -> Optional[Any]:
+        """Hasil prefetch yang sudah selesai, tanpa menunggu (untuk jalur sync)."""
+        task = self._tasks.get(kind)
+        if task is None or not task.done() or task.cancelled() or task.exception() is not None:
+            return None
+        self._mark_used(kind, False)
+        return task.result()
+
+    def cancel(self):
+        """Batalkan prefetch (mis. permintaan ditolak antrean)."""
+        if self._closed:
+            return
+        for task in self._tasks.values():
+            task.cancel()
+        self._closed = True
+        _count("cancelled")
+
+    def close(self):
+        """Akhiri permintaan: catat berapa jenis data yang terpakai, batalkan yang masih berjalan."""
+        if self._closed:
+            return
+        self._closed = True
+        failed = 0
+        for kind, task in self._tasks.items():
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled() and task.exception() is not None:
+                failed += 1
+        _count("used", len(self._used))
+        _count("unused", len(self._tasks) - len(self._used))
+        _count("failed", failed)
+
+
+def start_prefetch(repo_path: str) -> Optional[RepoPrefetch]:
+    """Mulai prefetch untuk repo (harus dipanggil dari event loop), atau None bila dinonaktifkan."""
+    if not PREFETCH_ENABLED or not _fetchers:
+        return None
+    return RepoPrefetch(repo_path).start()
+
+
+async def aprefetched(kind: str, repo_path: str, branch: Optional[str] = None) -> Optional[Any]:
+    prefetch = current_prefetch.get()
+    if prefetch is None or not prefetch.covers(repo_path, branch):
+        return None
+    return await prefetch.aget(kind)
+
+
+def prefetched(kind: str, repo_path: str, branch: Optional[str] = None) -> Optional[Any]:
+    prefetch = current_prefetch.get()
+    if prefetch is None or not prefetch.covers(repo_path, branch):
+        return None
+    return prefetch.peek(kind)
+
+
+def prefetch_stats() -> dict:
+    with _stats_lock:
+        fetched = _stats["used"] + _stats["unused"]
+        return {**_stats, "use_ratio": _stats["used"] / fetched if fetched else 0.0}
+
+
+metrics.register_collector("prefetch", prefetch_stats)
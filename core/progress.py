@@ -0,0 +1,165 @@
+# core/progress.py
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Panjang maksimal potongan teks LLM yang ditampilkan selama streaming
+STREAM_PREVIEW_CHARS = 600
+STREAM_RECENT_STEPS = 3
+
+STAGE_LABELS = {
+    "warmup": "Menyiapkan repo",
+    "agent": "Agent",
+    "structure": "Analisis struktur",
+    "dependencies": "Analisis dependensi",
+    "synthesis": "Sintesis laporan",
+    "pdf": "PDF",
+}
+
+
+class ProgressReporter:
+    """
+    Status sebuah run yang bisa diamati selama berjalan: stage, langkah agent (tool yang
+    dipanggil), potongan teks yang sedang di-stream LLM, dan jawaban begitu agent selesai.
+    Pengamat menunggu perubahan lewat wait(); pembaruan boleh datang dari thread lain.
+    Follower (reporter milik peminta yang digabung ke job yang sama) menerima salinan status,
+    stage, langkah, dan preview; jawaban tetap diisi per peminta.
+    """
+
+    def __init__(self, title: str = ""):
+        self.title = title
+        self.status = ""
+        self.stages: Dict[str, str] = {}
+        self.steps: List[str] = []
+        self.preview = ""
+        self.answer: Optional[str] = None
+        self.done = False
+        self.started_at = time.monotonic()
+        self._buffer = ""
+        self._loop = asyncio.get_running_loop()
+        self._changed = asyncio.Event()
+        self._followers: List["ProgressReporter"] = []
+
+    def add_follower(self, other: "ProgressReporter"):
+        self._followers.append(other)
+        self._mirror(other)
+
+    def _mirror(self, other: "ProgressReporter"):
+        other.status = self.status
+        other.stages = dict(self.stages)
+        other.steps = list(self.steps)
+        other.preview = self.preview
+        other._touch()
+
+    def _touch(self):
+        for other in self._followers:
+            self._mirror(other)
+        if self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._changed.set)
+
+    async def wait(self):
+        """Tunggu sampai ada perubahan sejak pemanggilan wait() sebelumnya."""
+        await self._changed.wait()
+        self._changed.clear()
+
+    # -------------------------
+    # Pembaruan
+    # -------------------------
+    def set_status(self, text: str):
+        self.status = text
+        self._touch()
+
+    def stage_started(self, *names: str):
+        for name in names:
+            self.stages[name] = "⏳"
+        self.status = ""
+        self._touch()
+
+    def stage_finished(self, name: str, elapsed: float, ok: bool = True, timed_out: bool = False):
+        self.stages[name] = f"✅ {elapsed:.1f}s" if ok else ("⌛" if timed_out else "⚠️")
+        self._touch()
+
+    def tool_started(self, tool: str):
+        self.steps.append(f"🔧 {tool}")
+        self.preview = ""
+        self._touch()
+
+    def tool_finished(self):
+        # aksi paralel bisa selesai dalam urutan apa pun: tandai langkah tertua yang belum selesai
+        for i, step in enumerate(self.steps):
+            if not step.endswith("✓"):
+                self.steps[i] += " ✓"
+                self._touch()
+                return
+
+    def llm_started(self):
+        self._buffer = ""
+
+    def llm_token(self, token: str):
+        """Tampilkan jawaban akhir begitu mulai ditulis; sebelum itu baris 'Thought' terakhir."""
+        self._buffer += token
+        if "Final Answer:" in self._buffer:
+            preview = self._buffer.split("Final Answer:", 1)[1].strip()
+        else:
+            thoughts = [l for l in self._buffer.splitlines() if l.strip().startswith("Thought:")]
+            preview = thoughts[-1].strip()[len("Thought:"):].strip() if thoughts else ""
+        if preview != self.preview:
+            self.preview = preview[-STREAM_PREVIEW_CHARS:]
+            self._touch()
+
+    def set_answer(self, answer: str):
+        self.answer = answer
+        self._touch()
+
+    def finish(self):
+        self.done = True
+        self._touch()
+
+    # -------------------------
+    # Render
+    # -------------------------
+    def render(self) -> str:
+        """Isi pesan progres: jawaban (bila sudah ada) atau langkah terakhir, plus status stage."""
+        stages = " · ".join(f"{STAGE_LABELS.get(n, n)} {s}" for n, s in self.stages.items())
+        if self.answer is not None:
+            if self.done:
+                return self.answer
+            return f"{self.answer}\n\n-# {stages}" if stages else self.answer
+
+        elapsed = time.monotonic() - self.started_at
+        lines = [f"🔎 {self.title} ({elapsed:.0f}s)" if self.title else f"🔎 Menganalisis... ({elapsed:.0f}s)"]
+        if self.status:
+            lines.append(self.status)
+        if stages:
+            lines.append(stages)
+        lines.extend(self.steps[-STREAM_RECENT_STEPS:])
+        if self.preview:
+            lines.append(f"💭 {self.preview}")
+        return "\n".join(lines)
+
+
+class ProgressCallback(BaseCallbackHandler):
+    """Meneruskan event agent (token LLM, aksi tool) ke ProgressReporter."""
+
+    run_inline = True  # pembaruan ringan: jalankan langsung, urutan event terjaga
+
+    def __init__(self, reporter: ProgressReporter):
+        self.reporter = reporter
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.reporter.llm_started()
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.reporter.llm_started()
+
+    def on_llm_new_token(self, token: str, **kwargs):
+        self.reporter.llm_token(token)
+
+    def on_agent_action(self, action, **kwargs):
+        self.reporter.tool_started(action.tool)
+
+    def on_tool_end(self, output, **kwargs):
+        self.reporter.tool_finished()
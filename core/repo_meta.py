@@ -0,0 +1,227 @@
+# core/repo_meta.py
+import asyncio
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import aiohttp
+import requests
+
+from core.github_client import get_async_github_client, get_github_client
+from core.utils.aio import AsyncKeyedLocks, KeyedLocks
+
+META_CACHE_TTL = 120  # detik sebelum metadata direvalidasi (revalidasi ETag gratis bila 304)
+
+
+@dataclass
+class RepoMetadata:
+    repo_path: str
+    default_branch: str
+    head_sha: Optional[str]
+    pushed_at: Optional[str]
+    languages: Optional[Dict[str, int]] = None
+    fetched_at: float = field(default_factory=time.time)
+
+
+def _repo_url(repo_path: str) -> str:
+    return f"https://api.github.com/repos/{repo_path}"
+
+
+def _head_sha_request(repo_path: str, branch: str):
+    return (
+        f"https://api.github.com/repos/{repo_path}/commits/{branch}",
+        {"Accept": "application/vnd.github.sha"},
+    )
+
+
+class RepoMetadataCache:
+    """
+    Cache metadata per repo (default branch, SHA commit HEAD, bahasa).
+    Diisi dari satu panggilan repos/{owner}/{repo}; SHA HEAD hanya diambil ulang
+    bila `pushed_at` berubah. Listener dipanggil saat SHA HEAD berganti agar cache
+    turunan (tree, artefak) bisa dibuang.
+    """
+
+    def __init__(self, ttl: float = META_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[str, RepoMetadata] = {}
+        self._fill_locks = KeyedLocks()
+        self._async_fill_locks = AsyncKeyedLocks()
+        self._listeners: List[Callable[[str, Optional[str], Optional[str]], None]] = []
+
+    def add_sha_listener(self, fn: Callable[[str, Optional[str], Optional[str]], None]):
+        """fn(repo_path, old_sha, new_sha) dipanggil saat HEAD repo berubah."""
+        self._listeners.append(fn)
+
+    def invalidate(self, repo_path: str):
+        with self._lock:
+            self._entries.pop(repo_path, None)
+
+    def _fresh(self, repo_path: str) -> Optional[RepoMetadata]:
+        with self._lock:
+            cached = self._entries.get(repo_path)
+        if cached and time.time() - cached.fetched_at < self.ttl:
+            return cached
+        return None
+
+    def peek(self, repo_path: str) -> Optional[RepoMetadata]:
+        """Metadata yang sudah ada di cache (boleh kedaluwarsa), tanpa request jaringan."""
+        with self._lock:
+            return self._entries.get(repo_path)
+
+    def _unchanged(self, cached: Optional[RepoMetadata], data: dict) -> bool:
+        if cached and cached.pushed_at == data.get("pushed_at") and cached.default_branch == data.get("default_branch"):
+            cached.fetched_at = time.time()
+            return True
+        return False
+
+    def _store(self, repo_path: str, cached: Optional[RepoMetadata], data: dict, head_sha: Optional[str]):
+        meta = RepoMetadata(
+            repo_path=repo_path,
+            default_branch=data.get("default_branch") or "main",
+            head_sha=head_sha,
+            pushed_at=data.get("pushed_at"),
+        )
+        with self._lock:
+            self._entries[repo_path] = meta
+
+        old_sha = cached.head_sha if cached else None
+        if cached and old_sha != meta.head_sha:
+            for fn in self._listeners:
+                fn(repo_path, old_sha, meta.head_sha)
+        return meta
+
+    # -------------------------
+    # Sync
+    # -------------------------
+    def get(self, repo_path: str) -> Optional[RepoMetadata]:
+        """Kembalikan metadata repo, atau None bila repo tidak bisa diakses."""
+        fresh = self._fresh(repo_path)
+        if fresh:
+            return fresh
+        # Satu refresh per repo; pemanggil paralel menunggu hasilnya
+        with self._fill_locks.hold(repo_path):
+            fresh = self._fresh(repo_path)
+            if fresh:
+                return fresh
+            with self._lock:
+                cached = self._entries.get(repo_path)
+            return self._refresh(repo_path, cached)
+
+    def _refresh(self, repo_path: str, cached: Optional[RepoMetadata]) -> Optional[RepoMetadata]:
+        client = get_github_client()
+        try:
+            r = client.get(_repo_url(repo_path), timeout=10)
+            if r is None or r.status_code != 200:
+                return cached
+            data = r.json()
+            if not isinstance(data, dict):
+                return cached
+            if self._unchanged(cached, data):
+                return cached
+            url, headers = _head_sha_request(repo_path, data.get("default_branch") or "main")
+            sha_resp = client.get(url, headers=headers, timeout=10)
+        except (requests.RequestException, ValueError) as e:
+            # ValueError: respons 200 yang bukan JSON (halaman error proxy, body terpotong)
+            print(f"Gagal mengambil metadata repo {repo_path}: {e}")
+            return cached
+        head_sha = sha_resp.text.strip() if sha_resp is not None and sha_resp.status_code == 200 else None
+        return self._store(repo_path, cached, data, head_sha)
+
+    def get_languages(self, repo_path: str) -> Optional[Dict[str, int]]:
+        """Bahasa repo (byte counts), diambil sekali per SHA HEAD."""
+        meta = self.get(repo_path)
+        if meta is not None and meta.languages is not None:
+            return meta.languages
+        r = get_github_client().get(f"{_repo_url(repo_path)}/languages", timeout=10)
+        if r is None or r.status_code != 200:
+            return None
+        try:
+            langs = r.json()
+        except ValueError:
+            return None
+        if meta is not None:
+            meta.languages = langs
+        return langs
+
+    @staticmethod
+    def _pick_ref(meta: Optional[RepoMetadata], branch: Optional[str]) -> str:
+        if branch and (meta is None or branch != meta.default_branch):
+            return branch
+        if meta is None:
+            return "HEAD"
+        return meta.head_sha or meta.default_branch
+
+    def resolve_ref(self, repo_path: str, branch: Optional[str] = None) -> str:
+        """
+        Ref yang dipakai tool: branch eksplisit bila diberikan dan berbeda dari default,
+        selain itu SHA HEAD default branch (immutable, aman di-cache).
+        Bila metadata tidak tersedia, 'HEAD' dipakai agar GitHub yang memilih default branch.
+        """
+        return self._pick_ref(self.get(repo_path), branch)
+
+    # -------------------------
+    # Async
+    # -------------------------
+    async def aget(self, repo_path: str) -> Optional[RepoMetadata]:
+        """Versi async dari get()."""
+        fresh = self._fresh(repo_path)
+        if fresh:
+            return fresh
+        async with self._async_fill_locks.get(repo_path):
+            fresh = self._fresh(repo_path)
+            if fresh:
+                return fresh
+            with self._lock:
+                cached = self._entries.get(repo_path)
+            return await self._arefresh(repo_path, cached)
+
+    async def _arefresh(self, repo_path: str, cached: Optional[RepoMetadata]) -> Optional[RepoMetadata]:
+        client = get_async_github_client()
+        try:
+            r = await client.get(_repo_url(repo_path), timeout=10)
+            if r is None or r.status_code != 200:
+                return cached
+            data = r.json()
+            if not isinstance(data, dict):
+                return cached
+            if self._unchanged(cached, data):
+                return cached
+            url, headers = _head_sha_request(repo_path, data.get("default_branch") or "main")
+            sha_resp = await client.get(url, headers=headers, timeout=10)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            print(f"Gagal mengambil metadata repo {repo_path}: {e}")
+            return cached
+        head_sha = sha_resp.text.strip() if sha_resp is not None and sha_resp.status_code == 200 else None
+        return self._store(repo_path, cached, data, head_sha)
+
+    async def aget_languages(self, repo_path: str) -> Optional[Dict[str, int]]:
+        meta = await self.aget(repo_path)
+        if meta is not None and meta.languages is not None:
+            return meta.languages
+        r = await get_async_github_client().get(f"{_repo_url(repo_path)}/languages", timeout=10)
+        if r is None or r.status_code != 200:
+            return None
+        try:
+            langs = r.json()
+        except ValueError:
+            return None
+        if meta is not None:
+            meta.languages = langs
+        return langs
+
+    async def aresolve_ref(self, repo_path: str, branch: Optional[str] = None) -> str:
+        return self._pick_ref(await self.aget(repo_path), branch)
+
+
+repo_metadata = RepoMetadataCache()
+
+
+def resolve_ref(repo_path: str, branch: Optional[str] = None) -> str:
+    return repo_metadata.resolve_ref(repo_path, branch)
+
+
+async def aresolve_ref(repo_path: str, branch: Optional[str] = None) -> str:
+    return await repo_metadata.aresolve_ref(repo_path, branch)
@@ -0,0 +1,286 @@
+# core/repo_tree.py
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from core.github_client import get_async_github_client, get_github_client
+from core.repo_meta import repo_metadata
+from core.utils.aio import AsyncKeyedLocks, KeyedLocks
+
+TREE_CACHE_TTL = 300  # detik
+TREE_CACHE_MAX_ENTRIES = int(os.getenv("TREE_CACHE_MAX_ENTRIES", "128"))  # (repo, ref) yang disimpan, LRU
+
+
+# -------------------------
+# Model pohon repo (in-memory)
+# -------------------------
+class RepoTree:
+    """
+    Model ringkas seluruh pohon file sebuah repo.
+    Dibangun sekali dari Git Trees API, lalu bisa dirender ke kedalaman atau subtree mana pun
+    tanpa request jaringan tambahan.
+    """
+
+    def __init__(self, repo_path: str, ref: str, entries: List[dict], truncated: bool = False):
+        self.repo_path = repo_path
+        self.ref = ref
+        self.truncated = truncated
+        # path -> (type, size); type: 'tree' (folder), 'blob' (file), 'commit' (submodule)
+        self._entries: Dict[str, Tuple[str, int]] = {}
+        # path folder -> daftar path anak langsung
+        self._children: Dict[str, List[str]] = {"": []}
+
+        for it in entries:
+            path = it["path"].strip("/")
+            if not path:
+                continue
+            self._entries[path] = (it["type"], it.get("size") or 0)
+
+        for path, (kind, _) in self._entries.items():
+            if kind == "tree":
+                self._children.setdefault(path, [])
+            parent = path.rsplit("/", 1)[0] if "/" in path else ""
+            self._children.setdefault(parent, []).append(path)
+
+        for kids in self._children.values():
+            kids.sort()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _clean(path: str) -> str:
+        return (path or "").strip().strip("/")
+
+    def exists(self, path: str) -> bool:
+        path = self._clean(path)
+        return path == "" or path in self._entries
+
+    def is_dir(self, path: str) -> bool:
+        path = self._clean(path)
+        return path == "" or self._entries.get(path, ("", 0))[0] == "tree"
+
+    def size(self, path: str) -> int:
+        return self._entries.get(self._clean(path), ("", 0))[1]
+
+    def files(self) -> List[str]:
+        """Semua path file (blob) di repo, terurut."""
+        return sorted(p for p, (kind, _) in self._entries.items() if kind == "blob")
+
+    def children(self, path: str = "") -> Tuple[List[str], List[str]]:
+        """Kembalikan (dirs, files) anak langsung dari sebuah folder."""
+        kids = self._children.get(self._clean(path), [])
+        dirs = [k for k in kids if self._entries[k][0] == "tree"]
+        files = [k for k in kids if self._entries[k][0] != "tree"]
+        return dirs, files
+
+    def render(
+        self,
+        path: str = "",
+        max_depth: Optional[int] = None,
+        max_lines: Optional[int] = None,
+        max_entries_per_dir: Optional[int] = None,
+    ) -> List[str]:
+        """
+        Render subtree menjadi baris-baris '📁 dir/' dan '📄 file' dengan indentasi.
+        max_depth=0 hanya merender anak langsung dari `path`.
+        max_entries_per_dir membatasi jumlah entri per folder agar folder besar tidak
+        menghabiskan seluruh anggaran baris.
+        """
+        lines: List[str] = []
+        root = self._clean(path)
+
+        def walk(current: str, depth: int):
+            dirs, files = self.children(current)
+            items = dirs + files
+            hidden = 0
+            if max_entries_per_dir is not None and len(items) > max_entries_per_dir:
+                hidden = len(items) - max_entries_per_dir
+                items = items[:max_entries_per_dir]
+            for item in items:
+                if max_lines is not None and len(lines) >= max_lines:
+                    return
+                if self._entries[item][0] == "tree":
+                    lines.append(f"{'  ' * depth}📁 {item}/")
+                    if max_depth is None or depth < max_depth:
+                        walk(item, depth + 1)
+                else:
+                    lines.append(f"{'  ' * depth}📄 {item}")
+            if hidden and (max_lines is None or len(lines) < max_lines):
+                lines.append(f"{'  ' * depth}… ({hidden} entri lainnya)")
+
+        walk(root, 0)
+        if max_lines is not None and len(lines) >= max_lines:
+            lines.append(f"… (dipotong pada {max_lines} baris dari {len(self)} entri)")
+        return lines
+
+
+# -------------------------
+# Fetch dari Git Trees API
+# -------------------------
+def _trees_url(repo_path: str, sha: str, recursive: bool) -> str:
+    url = f"https://api.github.com/repos/{repo_path}/git/trees/{sha}"
+    return f"{url}?recursive=1" if recursive else url
+
+
+def _prefixed(entries: List[dict], prefix: str) -> List[dict]:
+    return [{**it, "path": f"{prefix}{it['path']}"} for it in entries]
+
+
+def _get_tree_json(repo_path: str, sha: str, recursive: bool) -> Optional[dict]:
+    r = get_github_client().get(_trees_url(repo_path, sha, recursive), timeout=15)
+    if r.status_code != 200:
+        return None
+    return r.json()
+
+
+async def _aget_tree_json(repo_path: str, sha: str, recursive: bool) -> Optional[dict]:
+    r = await get_async_github_client().get(_trees_url(repo_path, sha, recursive), timeout=15)
+    if r is None or r.status_code != 200:
+        return None
+    return r.json()
+
+
+def _walk_truncated(
+    repo_path: str, sha: str, prefix: str, out: List[dict], try_recursive: bool = True
+):
+    """
+    Fallback saat GitHub memotong respons recursive: ambil subtree per folder.
+    Subtree yang masih terpotong diturunkan lagi satu level.
+    """
+    if try_recursive:
+        data = _get_tree_json(repo_path, sha, recursive=True)
+        if data is not None and not data.get("truncated"):
+            out.extend(_prefixed(data.get("tree", []), prefix))
+            return
+
+    data = _get_tree_json(repo_path, sha, recursive=False)
+    if data is None:
+        return
+    for it in _prefixed(data.get("tree", []), prefix):
+        out.append(it)
+        if it["type"] == "tree":
+            _walk_truncated(repo_path, it["sha"], f"{it['path']}/", out)
+
+
+async def _awalk_truncated(
+    repo_path: str, sha: str, prefix: str, out: List[dict], try_recursive: bool = True
+):
+    """Versi async dari _walk_truncated; subtree saudara diambil paralel."""
+    if try_recursive:
+        data = await _aget_tree_json(repo_path, sha, recursive=True)
+        if data is not None and not data.get("truncated"):
+            out.extend(_prefixed(data.get("tree", []), prefix))
+            return
+
+    data = await _aget_tree_json(repo_path, sha, recursive=False)
+    if data is None:
+        return
+    subtrees = []
+    for it in _prefixed(data.get("tree", []), prefix):
+        out.append(it)
+        if it["type"] == "tree":
+            subtrees.append(_awalk_truncated(repo_path, it["sha"], f"{it['path']}/", out))
+    await asyncio.gather(*subtrees)
+
+
+def fetch_repo_tree(repo_path: str, ref: str) -> Optional[RepoTree]:
+    """Ambil seluruh pohon repo dengan satu panggilan git/trees/<ref>?recursive=1."""
+    data = _get_tree_json(repo_path, ref, recursive=True)
+    if data is None:
+        return None
+    if not data.get("truncated"):
+        return RepoTree(repo_path, ref, data.get("tree", []))
+
+    entries: List[dict] = []
+    _walk_truncated(repo_path, data["sha"], "", entries, try_recursive=False)
+    return RepoTree(repo_path, ref, entries, truncated=True)
+
+
+async def afetch_repo_tree(repo_path: str, ref: str) -> Optional[RepoTree]:
+    """Versi async dari fetch_repo_tree."""
+    data = await _aget_tree_json(repo_path, ref, recursive=True)
+    if data is None:
+        return None
+    if not data.get("truncated"):
+        return RepoTree(repo_path, ref, data.get("tree", []))
+
+    entries: List[dict] = []
+    await _awalk_truncated(repo_path, data["sha"], "", entries, try_recursive=False)
+    return RepoTree(repo_path, ref, entries, truncated=True)
+
+
+_TREE_CACHE: "OrderedDict[Tuple[str, str], Tuple[float, RepoTree]]" = OrderedDict()
+_TREE_CACHE_LOCK = threading.Lock()
+_FILL_LOCKS = KeyedLocks()
+_ASYNC_FILL_LOCKS = AsyncKeyedLocks()
+
+
+def _cached_tree(key: Tuple[str, str]) -> Optional[RepoTree]:
+    with _TREE_CACHE_LOCK:
+        cached = _TREE_CACHE.get(key)
+        if cached is None:
+            return None
+        if time.time() - cached[0] >= TREE_CACHE_TTL:
+            del _TREE_CACHE[key]
+            return None
+        _TREE_CACHE.move_to_end(key)
+        return cached[1]
+
+
+def _store_tree(key: Tuple[str, str], tree: RepoTree):
+    with _TREE_CACHE_LOCK:
+        _TREE_CACHE[key] = (time.time(), tree)
+        _TREE_CACHE.move_to_end(key)
+        while len(_TREE_CACHE) > TREE_CACHE_MAX_ENTRIES:
+            _TREE_CACHE.popitem(last=False)
+
+
+def get_repo_tree(repo_path: str, ref: str) -> Optional[RepoTree]:
+    """
+    Versi ber-cache dari fetch_repo_tree (per repo + ref, dengan TTL dan batas TREE_CACHE_MAX_ENTRIES).
+    Pemanggil paralel untuk key yang sama menunggu satu fetch yang sama.
+    """
+    key = (repo_path, ref)
+    tree = _cached_tree(key)
+    if tree is not None:
+        return tree
+
+    with _FILL_LOCKS.hold(key):
+        tree = _cached_tree(key)
+        if tree is not None:
+            return tree
+        tree = fetch_repo_tree(repo_path, ref)
+        if tree is not None:
+            _store_tree(key, tree)
+    return tree
+
+
+async def aget_repo_tree(repo_path: str, ref: str) -> Optional[RepoTree]:
+    """Versi async dari get_repo_tree (berbagi cache yang sama)."""
+    key = (repo_path, ref)
+    tree = _cached_tree(key)
+    if tree is not None:
+        return tree
+
+    async with _ASYNC_FILL_LOCKS.get(key):
+        tree = _cached_tree(key)
+        if tree is not None:
+            return tree
+        tree = await afetch_repo_tree(repo_path, ref)
+        if tree is not None:
+            _store_tree(key, tree)
+    return tree
+
+
+def invalidate_repo_trees(repo_path: str, *_):
+    """Buang semua tree ber-cache milik repo (dipanggil saat SHA HEAD berubah)."""
+    with _TREE_CACHE_LOCK:
+        for key in [k for k in _TREE_CACHE if k[0] == repo_path]:
+            del _TREE_CACHE[key]
+
+
+repo_metadata.add_sha_listener(invalidate_repo_trees)
@@ -0,0 +1,68 @@
+# core/report.py
+import hashlib
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+# Pemisah listing struktur dan penjelasan LLM di keluaran analyze_repository_structure_with_explanation
+STRUCTURE_EXPLANATION_MARKER = "🧠 Penjelasan Struktur:"
+
+REPORT_TITLE = "Git-Cortex Repository Analysis Report"
+
+
+@dataclass
+class ReportSection:
+    title: str
+    body: str = ""
+    preformatted: str = ""  # blok teks apa adanya (mis. pohon direktori), dirender monospace
+
+
+@dataclass
+class Report:
+    """
+    Dokumen laporan yang dirender sekali dan dipakai bersama: PDF (core.utils.pdf_generator)
+    dan teks/markdown yang dikirim ke chat dibuat dari objek yang sama.
+    """
+    repo_url: str
+    answer: str
+    sections: List[ReportSection] = field(default_factory=list)
+
+    def to_markdown(self) -> str:
+        parts = [f"# {REPORT_TITLE}", f"Repository URL: {self.repo_url}"]
+        for section in self.sections:
+            parts.append(f"## {section.title}")
+            if section.preformatted:
+                parts.append(f"```\n{section.preformatted}\n```")
+            if section.body:
+                parts.append(section.body)
+        return "\n\n".join(parts) + "\n"
+
+    def content_hash(self) -> str:
+        """Hash isi laporan (key cache PDF): laporan identik hanya dirender sekali."""
+        raw = "\x00".join(
+            [self.repo_url] + [f"{s.title}\x01{s.preformatted}\x01{s.body}" for s in self.sections]
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _split_structure(structure_text: str) -> tuple:
+    """(listing, penjelasan) dari keluaran analisis struktur; teks lain dianggap penjelasan saja."""
+    listing, marker, explanation = structure_text.partition(STRUCTURE_EXPLANATION_MARKER)
+    if not marker:
+        return "", structure_text
+    return listing.strip("\n"), explanation.strip()
+
+
+def build_report(
+    repo_url: str,
+    summary_text: str,
+    structure_text: Optional[str] = None,
+    dependencies_text: Optional[str] = None,
+) -> Report:
+    report = Report(repo_url=repo_url, answer=summary_text)
+    report.sections.append(ReportSection("1. Repository Summary", summary_text))
+    if structure_text:
+        listing, explanation = _split_structure(structure_text)
+        report.sections.append(ReportSection("2. Repository Structure", explanation, preformatted=listing))
+    if dependencies_text:
+        report.sections.append(ReportSection("3. Dependencies Analysis", dependencies_text))
+    return report
@@ -0,0 +1,133 @@
+# core/response_cache.py
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from core.database import _hash_query, query_cache
+from core.telemetry import metrics
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", str(24 * 3600)))  # detik
+RESPONSE_CACHE_SWEEP_INTERVAL = int(os.getenv("RESPONSE_CACHE_SWEEP_INTERVAL", "3600"))
+
+
+def canonical_question(question: str) -> str:
+    """Bentuk kanonik pertanyaan: huruf kecil, spasi dirapikan, tanda baca di ujung dibuang."""
+    return re.sub(r"\s+", " ", question.lower()).strip().rstrip("?!.").strip()
+
+
+def response_query(repo_path: str, sha: str, question: str) -> str:
+    """Teks query yang disimpan di QueryCache (FullQuery); hash-nya menjadi key kedua tier."""
+    return f"{repo_path}@{sha}\n{canonical_question(question)}"
+
+
+class ResponseCache:
+    """
+    Cache jawaban agent dua tingkat:
+    - tier 1: LRU in-process dengan TTL,
+    - tier 2: tabel QueryCache (core.database), bertahan setelah restart.
+    Key = repo + SHA HEAD + pertanyaan kanonik, jadi push baru otomatis membuat key baru.
+    Baris yang lebih tua dari TTL dibersihkan berdasarkan kolom Timestamp; di antara dua sweep,
+    `get` menolak baris DB yang `created_at`-nya (dalam payload) sudah melewati TTL.
+    """
+
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL,
+                 sweep_interval: float = RESPONSE_CACHE_SWEEP_INTERVAL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._lock = threading.Lock()
+        # hash -> (disimpan_pada, payload); urutan = LRU
+        self._lru: "OrderedDict[str, tuple]" = OrderedDict()
+        self._last_sweep = time.monotonic()
+        self._stats = {"memory_hits": 0, "db_hits": 0, "misses": 0, "writes": 0, "latency_saved_s": 0.0}
+
+    def _remember(self, key: str, payload: dict, stored_at: float):
+        with self._lock:
+            self._lru[key] = (stored_at, payload)
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.maxsize:
+                self._lru.popitem(last=False)
+
+    def _hit(self, kind: str, payload: dict) -> str:
+        with self._lock:
+            self._stats[kind] += 1
+            self._stats["latency_saved_s"] += payload.get("elapsed", 0.0)
+        return payload["answer"]
+
+    def get(self, repo_path: str, sha: Optional[str], question: str) -> Optional[str]:
+        """Jawaban ber-cache untuk (repo, SHA, pertanyaan), atau None."""
+        if not sha:
+            return None
+        self._maybe_sweep()
+        key = _hash_query(response_query(repo_path, sha, question))
+        now = time.time()
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None and now - entry[0] >= self.ttl:
+                self._lru.pop(key)
+                entry = None
+            if entry is not None:
+                self._lru.move_to_end(key)
+        if entry is not None:
+            return self._hit("memory_hits", entry[1])
+
+        raw = query_cache.get(key)
+        if raw is not None:
+            try:
+                payload = json.loads(raw)
+            except ValueError:
+                payload = None
+            created_at = payload.get("created_at") if isinstance(payload, dict) else None
+            if isinstance(created_at, (int, float)) and now - created_at < self.ttl and "answer" in payload:
+                # umur di memori tetap dihitung dari saat jawaban dibuat
+                self._remember(key, payload, created_at)
+                return self._hit("db_hits", payload)
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def put(self, repo_path: str, sha: Optional[str], question: str, answer: str, elapsed: float = 0.0):
+        """Simpan jawaban; elapsed = durasi agent asli, dipakai untuk menghitung latensi yang dihemat."""
+        if not sha:
+            return
+        query = response_query(repo_path, sha, question)
+        key = _hash_query(query)
+        now = time.time()
+        payload = {"answer": answer, "elapsed": round(elapsed, 3), "created_at": now}
+        self._remember(key, payload, now)
+        query_cache.put(key, query, json.dumps(payload, ensure_ascii=False))
+        with self._lock:
+            self._stats["writes"] += 1
+
+    def _maybe_sweep(self):
+        if time.monotonic() - self._last_sweep >= self.sweep_interval:
+            self.sweep()
+
+    def sweep(self) -> int:
+        """Buang entri kedaluwarsa dari memori dan dari tabel QueryCache (berdasarkan Timestamp)."""
+        self._last_sweep = time.monotonic()
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            for key in [k for k, (stored_at, _) in self._lru.items() if stored_at < cutoff]:
+                self._lru.pop(key)
+        return query_cache.delete_older_than(self.ttl)
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self._stats["memory_hits"] + self._stats["db_hits"]
+            lookups = hits + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_ratio": hits / lookups if lookups else 0.0,
+                "entries": len(self._lru),
+            }
+
+
+response_cache = ResponseCache()
+metrics.register_collector("response_cache", response_cache.stats)
@@ -0,0 +1,263 @@
+# core/semantic_cache.py
+import os
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.repo_meta import repo_metadata
+from core.telemetry import metrics
+
+SEMANTIC_CACHE_DIM = int(os.getenv("SEMANTIC_CACHE_DIM", "512"))
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.8"))
+SEMANTIC_CACHE_MAX_PER_REPO = int(os.getenv("SEMANTIC_CACHE_MAX_PER_REPO", "2000"))
+SEMANTIC_CACHE_MAX_REPOS = int(os.getenv("SEMANTIC_CACHE_MAX_REPOS", "500"))
+
+# Kata bermakna sama (Indonesia/Inggris) dipetakan ke satu token, supaya
+# "apa yang dilakukan proyek ini" dan "what does this repo do" berbagi fitur.
+_SYNONYMS = {
+    "repo": "repo", "repositori": "repo", "repository": "repo", "repositories": "repo",
+    "proyek": "repo", "project": "repo", "projek": "repo", "aplikasi": "repo", "app": "repo",
+    "bagaimana": "how", "how": "how", "gimana": "how", "cara": "how",
+    "dependensi": "dependency", "dependency": "dependency", "dependencies": "dependency",
+    "library": "dependency", "libraries": "dependency", "pustaka": "dependency", "paket": "dependency",
+    "package": "dependency", "packages": "dependency", "requirements": "dependency",
+    "dipakai": "use", "pakai": "use", "digunakan": "use", "menggunakan": "use", "use": "use",
+    "uses": "use", "used": "use",
+    "struktur": "structure", "structure": "structure", "susunan": "structure", "layout": "structure",
+    "folder": "directory", "direktori": "directory", "directory": "directory", "directories": "directory",
+    "isi": "content", "inside": "content", "content": "content", "contents": "content", "kode": "code",
+    "code": "code", "source": "code", "sumber": "code",
+    "bahasa": "language", "language": "language", "languages": "language",
+    "instal": "install", "install": "install", "pasang": "install", "setup": "install",
+    "menjalankan": "run", "jalankan": "run", "run": "run", "running": "run",
+}
+# Kata fungsi dan kata tanya umum yang tidak membedakan maksud pertanyaan
+# ("jelaskan repo ini" dan "apa fungsi proyek ini" sama-sama meminta gambaran umum)
+_STOPWORDS = {
+    "apa", "what", "jelaskan", "explain", "describe", "deskripsikan", "ringkas", "ringkasan",
+    "summarize", "summary", "dilakukan", "lakukan", "fungsi", "kegunaan", "tujuan", "purpose",
+    "yang", "ini", "itu", "dari", "di", "ke", "dan", "atau", "untuk", "dengan", "saya", "tolong",
+    "saja", "tentang", "mengenai", "sih", "dong", "ya", "apakah", "adalah",
+    "this", "that", "the", "a", "an", "of", "to", "is", "are", "in", "on", "for", "and", "or", "me",
+    "please", "can", "you", "it", "its", "about", "do", "does", "i", "we",
+}
+_WORD_RE = re.compile(r"[a-z0-9_]+")
+
+# Token yang mengubah maksud walau embedding-nya hampir sama ("python 3.8" vs "python 3.12",
+# "list the tests" vs "... in src", "dependencies" vs "dev dependencies"): harus sama persis.
+_VERSION_OR_PATH_RE = re.compile(r"[\w\-]*\d[\w.\-]*|[\w\-]+(?:[./][\w\-]+)+")
+_SCOPE_RE = re.compile(
+    r"\b(?:in|di|dalam|pada|under|within|folder|direktori|directory)\s+(?=(?:(?:the|a|an)\s+)?([\w./\-]+))"
+)
+_QUALIFIERS = {
+    "dev", "development", "prod", "production", "test", "tests", "testing", "tes", "build",
+    "optional", "peer", "docs", "dokumentasi", "frontend", "backend", "client", "server",
+}
+# Kata yang membalik maksud: "install" vs "uninstall", "thread safe" vs "not thread safe".
+# Trigram karakter membuat pasangan seperti ini tetap mirip (skor ~0.85), jadi kata yang hanya
+# muncul di salah satu pertanyaan dan berupa negasi/awalan kebalikan selalu memblokir hit.
+_NEGATIONS = {"not", "no", "without", "never", "tidak", "tak", "bukan", "tanpa", "jangan", "belum"}
+_NEGATION_PREFIXES = ("un", "de", "dis", "non", "anti", "re")
+
+
+def specific_tokens(text: str) -> frozenset:
+    """Angka/versi, path/nama file, folder cakupan ("in src") dan kualifikasi (dev, test, ...) dalam pertanyaan."""
+    text = text.lower()
+    tokens = {t.rstrip(".-") for t in _VERSION_OR_PATH_RE.findall(text)}
+    tokens.update(
+        t.rstrip(".-") for t in _SCOPE_RE.findall(text) if t not in _STOPWORDS and t not in _SYNONYMS
+    )
+    tokens.update(w for w in _WORD_RE.findall(text) if w in _QUALIFIERS)
+    return frozenset(t for t in tokens if t)
+
+
+def content_words(text: str) -> frozenset:
+    """Kata bermakna dalam pertanyaan setelah normalisasi sinonim (tanpa stopword)."""
+    return frozenset(_SYNONYMS.get(w, w) for w in _WORD_RE.findall(text.lower()) if w not in _STOPWORDS)
+
+
+def _is_negated_variant(word: str, others: frozenset) -> bool:
+    if word in _NEGATIONS:
+        return True
+    for prefix in _NEGATION_PREFIXES:
+        if word.startswith(prefix) and _SYNONYMS.get(word[len(prefix):], word[len(prefix):]) in others:
+            return True
+    return False
+
+
+def contradicts(a: frozenset, b: frozenset) -> bool:
+    """True bila kata yang hanya ada di salah satu pertanyaan adalah negasi atau varian berawalan kebalikan."""
+    return any(_is_negated_variant(w, b) for w in a - b) or any(_is_negated_variant(w, a) for w in b - a)
+
+
+class HashingEmbedder:
+    """
+    Embedding pertanyaan tanpa model: kata (setelah normalisasi sinonim) dan trigram karakter
+    di-hash ke `dim` bucket bertanda, lalu dinormalisasi L2 sehingga dot product = cosine.
+    """
+
+    def __init__(self, dim: int = SEMANTIC_CACHE_DIM, word_weight: float = 2.0):
+        self.dim = dim
+        self.word_weight = word_weight
+
+    def _features(self, text: str) -> List[Tuple[str, float]]:
+        words = [_SYNONYMS.get(w, w) for w in _WORD_RE.findall(text.lower()) if w not in _STOPWORDS]
+        feats = [(f"w:{w}", self.word_weight) for w in words]
+        for w in words:
+            padded = f"#{w}#"
+            feats.extend((f"c:{padded[i:i + 3]}", 1.0) for i in range(len(padded) - 2))
+        return feats
+
+    def embed(self, text: str) -> np.ndarray:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for feat, weight in self._features(text):
+            h = zlib.crc32(feat.encode("utf-8"))
+            vec[h % self.dim] += weight if (h >> 31) & 1 else -weight
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+
+class RepoVectorIndex:
+    """Index vektor satu repo: matriks float32 yang tumbuh dua kali lipat, plus jawaban dan waktu pakai."""
+
+    def __init__(self, sha: str, dim: int, max_entries: int):
+        self.sha = sha
+        self.max_entries = max_entries
+        self.vectors = np.zeros((min(64, max_entries), dim), dtype=np.float32)
+        self.last_used = np.zeros(len(self.vectors), dtype=np.float64)
+        self.answers: List[str] = []
+        self.questions: List[str] = []
+        self.keys: List[frozenset] = []
+        self.words: List[frozenset] = []
+
+    def __len__(self) -> int:
+        return len(self.answers)
+
+    def search(self, vec: np.ndarray, key: frozenset, words: frozenset, threshold: float) -> Tuple[int, float]:
+        """
+        Indeks dan skor cosine entri termirip dengan skor >= threshold, specific_tokens yang
+        sama persis, dan tanpa kata yang membalik maksud (-1 bila tidak ada).
+        """
+        n = len(self)
+        if n == 0:
+            return -1, 0.0
+        scores = self.vectors[:n] @ vec
+        candidates = np.flatnonzero(scores >= threshold)
+        for i in candidates[np.argsort(-scores[candidates], kind="stable")]:
+            if self.keys[i] == key and not contradicts(self.words[i], words):
+                return int(i), float(scores[i])
+        return -1, 0.0
+
+    def add(self, vec: np.ndarray, key: frozenset, words: frozenset, question: str, answer: str) -> int:
+        """Tambah entri; bila penuh, entri yang paling lama tidak dipakai ditimpa. Kembalikan jumlah eviction."""
+        n = len(self)
+        now = time.monotonic()
+        if n >= self.max_entries:
+            victim = int(np.argmin(self.last_used[:n]))
+            self.vectors[victim] = vec
+            self.last_used[victim] = now
+            self.answers[victim] = answer
+            self.questions[victim] = question
+            self.keys[victim] = key
+            self.words[victim] = words
+            return 1
+        if n == len(self.vectors):
+            cap = min(self.max_entries, n * 2)
+            vectors = np.zeros((cap, self.vectors.shape[1]), dtype=np.float32)
+            vectors[:n] = self.vectors
+            last_used = np.zeros(cap, dtype=np.float64)
+            last_used[:n] = self.last_used
+            self.vectors, self.last_used = vectors, last_used
+        self.vectors[n] = vec
+        self.last_used[n] = now
+        self.answers.append(answer)
+        self.questions.append(question)
+        self.keys.append(key)
+        self.words.append(words)
+        return 0
+
+
+class SemanticCache:
+    """
+    Cache jawaban untuk pertanyaan yang mirip (bukan identik) terhadap repo dan commit yang sama.
+    Satu RepoVectorIndex per repo; index dibuang saat SHA HEAD berubah. Jumlah repo dan entri
+    per repo dibatasi (LRU). `threshold` = skor cosine minimum agar dianggap pertanyaan yang sama;
+    selain itu angka, path, dan kualifikasi dalam pertanyaan (specific_tokens) harus identik dan
+    tidak boleh ada negasi/awalan kebalikan yang hanya ada di salah satu pertanyaan (contradicts).
+    """
+
+    def __init__(self, threshold: float = SEMANTIC_CACHE_THRESHOLD, embedder: HashingEmbedder = None,
+                 max_per_repo: int = SEMANTIC_CACHE_MAX_PER_REPO, max_repos: int = SEMANTIC_CACHE_MAX_REPOS):
+        self.threshold = threshold
+        self.embedder = embedder or HashingEmbedder()
+        self.max_per_repo = max_per_repo
+        self.max_repos = max_repos
+        self._lock = threading.Lock()
+        self._indexes: "OrderedDict[str, RepoVectorIndex]" = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+    def lookup(self, repo_path: str, sha: Optional[str], question: str) -> Optional[Tuple[str, float]]:
+        """(jawaban, skor) untuk pertanyaan termirip di atas threshold, atau None."""
+        if not sha:
+            return None
+        vec, key = self.embedder.embed(question), specific_tokens(question)
+        with self._lock:
+            index = self._indexes.get(repo_path)
+            if index is None or index.sha != sha:
+                self._stats["misses"] += 1
+                return None
+            self._indexes.move_to_end(repo_path)
+            best, score = index.search(vec, key, content_words(question), self.threshold)
+            if best < 0:
+                self._stats["misses"] += 1
+                return None
+            index.last_used[best] = time.monotonic()
+            self._stats["hits"] += 1
+            return index.answers[best], score
+
+    def add(self, repo_path: str, sha: Optional[str], question: str, answer: str):
+        if not sha:
+            return
+        vec, key = self.embedder.embed(question), specific_tokens(question)
+        with self._lock:
+            index = self._indexes.get(repo_path)
+            if index is None or index.sha != sha:
+                index = RepoVectorIndex(sha, self.embedder.dim, self.max_per_repo)
+                self._indexes[repo_path] = index
+            self._indexes.move_to_end(repo_path)
+            self._stats["evictions"] += index.add(vec, key, content_words(question), question, answer)
+            self._stats["writes"] += 1
+            while len(self._indexes) > self.max_repos:
+                _, dropped = self._indexes.popitem(last=False)
+                self._stats["evictions"] += len(dropped)
+
+    def drop_repo(self, repo_path: str):
+        with self._lock:
+            self._indexes.pop(repo_path, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_ratio": self._stats["hits"] / lookups if lookups else 0.0,
+                "repos": len(self._indexes),
+                "entries": sum(len(i) for i in self._indexes.values()),
+                "threshold": self.threshold,
+            }
+
+
+semantic_cache = SemanticCache()
+metrics.register_collector("semantic_cache", semantic_cache.stats)
+
+
+def _drop_stale_index(repo_path: str, old_sha: Optional[str], new_sha: Optional[str]):
+    semantic_cache.drop_repo(repo_path)
+
+
+repo_metadata.add_sha_listener(_drop_stale_index)
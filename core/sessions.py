@@ -0,0 +1,210 @@
+# core/sessions.py
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Hashable, List, Optional
+
+from langchain.schema import AIMessage, HumanMessage, SystemMessage
+
+from core.observations import approx_tokens
+
+SESSION_MAX = int(os.getenv("SESSION_MAX", "500"))
+SESSION_IDLE_TTL = int(os.getenv("SESSION_IDLE_TTL", str(6 * 3600)))  # detik
+SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "6"))
+SESSION_TOKEN_BUDGET = int(os.getenv("SESSION_TOKEN_BUDGET", "1500"))
+SESSION_SUMMARIZE = os.getenv("SESSION_SUMMARIZE", "1") == "1"
+SESSION_SPILL_DIR = os.getenv("SESSION_SPILL_DIR", "")  # kosong = tidak disimpan ke disk
+
+SUMMARY_PROMPT = """Ringkas percakapan antara pengguna dan asisten analisis repositori GitHub berikut.
+Pertahankan repositori yang dibahas, pertanyaan penting, dan kesimpulan utama. Maksimal 120 kata.
+
+Ringkasan sebelumnya:
+{summary}
+
+Percakapan baru:
+{turns}
+
+Ringkasan terbaru:"""
+
+
+@dataclass
+class ChannelSession:
+    """Riwayat percakapan satu channel: giliran terakhir + ringkasan giliran yang lebih lama."""
+    key: Hashable
+    turns: List[tuple] = field(default_factory=list)  # [(input, output)]
+    summary: str = ""
+    pending: List[tuple] = field(default_factory=list)  # giliran yang keluar dari window, belum diringkas
+    last_active: float = field(default_factory=time.time)
+    summarizing: bool = False
+
+    def history(self, token_budget: int = SESSION_TOKEN_BUDGET) -> list:
+        """Pesan untuk chat_history: ringkasan (bila ada) + giliran terbaru yang muat dalam anggaran token."""
+        messages, used = [], 0
+        for question, answer in reversed(self.turns):
+            cost = approx_tokens(question) + approx_tokens(answer)
+            if messages and used + cost > token_budget:
+                break
+            messages[:0] = [HumanMessage(content=question), AIMessage(content=answer)]
+            used += cost
+        if self.summary:
+            messages.insert(0, SystemMessage(content=f"Ringkasan percakapan sebelumnya: {self.summary}"))
+        return messages
+
+    def to_dict(self) -> dict:
+        return {"turns": self.turns, "summary": self.summary, "pending": self.pending, "last_active": self.last_active}
+
+    @classmethod
+    def from_dict(cls, key: Hashable, data: dict) -> "ChannelSession":
+        return cls(
+            key=key,
+            turns=[tuple(t) for t in data.get("turns", [])],
+            summary=data.get("summary", ""),
+            pending=[tuple(t) for t in data.get("pending", [])],
+            last_active=data.get("last_active", time.time()),
+        )
+
+
+class SessionStore:
+    """
+    Penyimpanan sesi per channel dengan batas jumlah (LRU) dan idle TTL.
+    Executor dan LLM dipakai bersama oleh semua channel; yang disimpan per channel hanya
+    riwayatnya: window max_turns giliran, dibatasi token_budget saat dipakai sebagai prompt.
+    Giliran yang keluar dari window diringkas di background (bila summarize aktif), dan sesi
+    bisa disimpan ke spill_dir agar bertahan setelah restart.
+    """
+
+    def __init__(self, max_sessions: int = SESSION_MAX, idle_ttl: float = SESSION_IDLE_TTL,
+                 max_turns: int = SESSION_MAX_TURNS, token_budget: int = SESSION_TOKEN_BUDGET,
+                 summarize: bool = SESSION_SUMMARIZE, llm=None, spill_dir: str = SESSION_SPILL_DIR):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.summarize = summarize
+        self.llm = llm
+        self.spill_dir = spill_dir or None
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[Hashable, ChannelSession]" = OrderedDict()
+        self._stats = {"created": 0, "restored": 0, "evicted": 0, "expired": 0, "summaries": 0}
+
+    # -------------------------
+    # Disk
+    # -------------------------
+    def _path(self, key: Hashable) -> str:
+        return os.path.join(self.spill_dir, f"{key}.json")
+
+    def _spill(self, session: ChannelSession):
+        if not self.spill_dir:
+            return
+        os.makedirs(self.spill_dir, exist_ok=True)
+        tmp = f"{self._path(session.key)}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(session.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp, self._path(session.key))
+
+    def _restore(self, key: Hashable) -> Optional[ChannelSession]:
+        if not self.spill_dir:
+            return None
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                session = ChannelSession.from_dict(key, json.load(f))
+        except (OSError, ValueError):
+            return None
+        if time.time() - session.last_active > self.idle_ttl:
+            self._discard(key)
+            return None
+        return session
+
+    def _discard(self, key: Hashable):
+        if self.spill_dir:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    # -------------------------
+    # Sesi
+    # -------------------------
+    def _evict(self):
+        now = time.time()
+        for key in [k for k, s in self._sessions.items() if now - s.last_active > self.idle_ttl]:
+            self._sessions.pop(key)
+            self._discard(key)
+            self._stats["expired"] += 1
+        while len(self._sessions) > self.max_sessions:
+            # sesi LRU sudah ada di disk (bila spill aktif), cukup dilepas dari memori
+            self._sessions.popitem(last=False)
+            self._stats["evicted"] += 1
+
+    def get(self, key: Hashable) -> ChannelSession:
+        """Sesi channel; dibuat baru (atau dipulihkan dari disk) bila belum ada."""
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is not None and time.time() - session.last_active > self.idle_ttl:
+                self._sessions.pop(key)
+                self._discard(key)
+                self._stats["expired"] += 1
+                session = None
+            if session is None:
+                session = self._restore(key)
+                if session is not None:
+                    self._stats["restored"] += 1
+                else:
+                    session = ChannelSession(key)
+                    self._stats["created"] += 1
+                self._sessions[key] = session
+            self._sessions.move_to_end(key)
+            session.last_active = time.time()
+            self._evict()
+            return session
+
+    def history(self, key: Hashable) -> list:
+        return self.get(key).history(self.token_budget)
+
+    def add_turn(self, key: Hashable, question: str, answer: str):
+        """Catat satu giliran; giliran lama yang keluar dari window diringkas di background."""
+        session = self.get(key)
+        with self._lock:
+            session.turns.append((question, answer))
+            overflow = session.turns[:-self.max_turns] if self.max_turns else session.turns[:]
+            session.turns = session.turns[len(overflow):]
+            if self.summarize and self.llm is not None:
+                session.pending.extend(overflow)
+        if session.pending and not session.summarizing:
+            try:
+                asyncio.get_running_loop().create_task(self._asummarize(session))
+                session.summarizing = True
+            except RuntimeError:  # tidak ada event loop: ringkas saat giliran berikutnya
+                pass
+        self._spill(session)
+
+    async def _asummarize(self, session: ChannelSession):
+        try:
+            while session.pending:
+                batch = list(session.pending)
+                turns = "\n".join(f"Pengguna: {q}\nAsisten: {a}" for q, a in batch)
+                response = await self.llm.ainvoke(
+                    SUMMARY_PROMPT.format(summary=session.summary or "-", turns=turns)
+                )
+                with self._lock:
+                    session.summary = getattr(response, "content", str(response)).strip()
+                    del session.pending[:len(batch)]
+                    self._stats["summaries"] += 1
+                self._spill(session)
+        except Exception as e:
+            print(f"Gagal meringkas percakapan {session.key}: {e}")
+        finally:
+            session.summarizing = False
+
+    def reset(self, key: Hashable):
+        with self._lock:
+            self._sessions.pop(key, None)
+            self._discard(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "sessions": len(self._sessions), "max_sessions": self.max_sessions}
@@ -0,0 +1,314 @@
+# core/snapshot.py
+import asyncio
+import json
+import mmap
+import os
+import shutil
+import tarfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from core.github_client import _default_headers, get_github_client
+from core.manifests import is_manifest
+from core.repo_meta import repo_metadata
+from core.repo_tree import RepoTree
+from core.telemetry import metrics
+
+SNAPSHOT_MODE = os.getenv("SNAPSHOT_MODE", "0") == "1"
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", os.path.join(".cache", "snapshots"))
+SNAPSHOT_MAX_BYTES = int(os.getenv("SNAPSHOT_MAX_BYTES", str(1024 * 1024 * 1024)))
+# Repo yang tarball-nya lebih besar dari ini tidak di-snapshot (tetap lewat API)
+SNAPSHOT_MAX_REPO_BYTES = int(os.getenv("SNAPSHOT_MAX_REPO_BYTES", str(200 * 1024 * 1024)))
+# File di atas ukuran ini dibaca lewat mmap
+SNAPSHOT_MMAP_THRESHOLD = 1024 * 1024
+
+LANGUAGE_BY_EXT = {
+    ".py": "Python", ".js": "JavaScript", ".jsx": "JavaScript", ".mjs": "JavaScript", ".ts": "TypeScript",
+    ".tsx": "TypeScript", ".go": "Go", ".rs": "Rust", ".java": "Java", ".kt": "Kotlin", ".rb": "Ruby",
+    ".php": "PHP", ".cs": "C#", ".c": "C", ".h": "C", ".cpp": "C++", ".cc": "C++", ".hpp": "C++",
+    ".swift": "Swift", ".scala": "Scala", ".sh": "Shell", ".html": "HTML", ".css": "CSS", ".scss": "SCSS",
+    ".vue": "Vue", ".dart": "Dart", ".lua": "Lua", ".r": "R", ".sql": "SQL", ".md": "Markdown",
+    ".rst": "reStructuredText", ".json": "JSON", ".yml": "YAML", ".yaml": "YAML", ".toml": "TOML",
+    ".xml": "XML", ".ipynb": "Jupyter Notebook",
+}
+
+
+def detect_language(path: str) -> Optional[str]:
+    return LANGUAGE_BY_EXT.get(os.path.splitext(path)[1].lower())
+
+
+class Snapshot:
+    """Salinan lokal isi repo pada satu commit, plus index file (path, ukuran, bahasa, manifest)."""
+
+    def __init__(self, repo_path: str, sha: str, root: str, index: List[dict]):
+        self.repo_path = repo_path
+        self.sha = sha
+        self.root = root
+        self.index = index
+        self._by_path: Dict[str, dict] = {e["path"]: e for e in index}
+        self._tree: Optional[RepoTree] = None
+
+    @property
+    def files_dir(self) -> str:
+        return os.path.join(self.root, "files")
+
+    def exists(self, path: str) -> bool:
+        return path.strip("/") in self._by_path
+
+    def tree(self) -> RepoTree:
+        """RepoTree yang dibangun dari index (folder diturunkan dari path file)."""
+        if self._tree is None:
+            dirs = set()
+            for e in self.index:
+                parts = e["path"].split("/")[:-1]
+                dirs.update("/".join(parts[:i]) for i in range(1, len(parts) + 1))
+            entries = [{"path": d, "type": "tree"} for d in dirs]
+            entries += [{"path": e["path"], "type": "blob", "size": e["size"]} for e in self.index]
+            self._tree = RepoTree(self.repo_path, self.sha, entries)
+        return self._tree
+
+    def read_text(self, path: str) -> Optional[str]:
+        """
+        Isi file sebagai teks, atau None bila tidak ada di snapshot. File besar dibaca via mmap.
+        Juga None bila folder snapshot sudah dihapus (eviction/drop) selagi Snapshot ini masih
+        dipegang pembaca; pemanggil lalu jatuh ke GitHub API seperti saat snapshot belum ada.
+        """
+        entry = self._by_path.get(path.strip("/"))
+        if entry is None:
+            return None
+        full = os.path.join(self.files_dir, entry["path"])
+        try:
+            with open(full, "rb") as f:
+                if entry["size"] >= SNAPSHOT_MMAP_THRESHOLD:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        return mm[:].decode("utf-8", errors="replace")
+                return f.read().decode("utf-8", errors="replace")
+        except (OSError, ValueError):
+            # ValueError: mmap atas file yang sudah terpotong menjadi 0 byte
+            return None
+
+
+def _safe_members(tar: tarfile.TarFile, dest: str):
+    """Anggota tarball tanpa folder teratas GitHub ('owner-repo-sha/'); link dan path keluar dilewati."""
+    dest = os.path.realpath(dest)
+    for member in tar:
+        if not (member.isfile() or member.isdir()):
+            continue
+        parts = member.name.split("/", 1)
+        if len(parts) < 2 or not parts[1]:
+            continue
+        member.name = parts[1]
+        target = os.path.realpath(os.path.join(dest, member.name))
+        if not target.startswith(dest + os.sep):
+            continue
+        yield member
+
+
+class SnapshotStore:
+    """
+    Snapshot repo di disk, di-key (repo, SHA commit). Diambil sekali sebagai tarball,
+    di-ekstrak ke SNAPSHOT_DIR, dan di-index. Total ukuran dibatasi max_bytes (LRU).
+    Tool memakai peek() (tidak pernah menunggu download); prefetch() mengisi di background.
+    """
+
+    def __init__(self, root: str = SNAPSHOT_DIR, max_bytes: int = SNAPSHOT_MAX_BYTES,
+                 max_repo_bytes: int = SNAPSHOT_MAX_REPO_BYTES, enabled: bool = SNAPSHOT_MODE):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_repo_bytes = max_repo_bytes
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._loaded: Dict[tuple, Snapshot] = {}
+        # (repo, sha) -> {"dir", "bytes", "atime"}; urutan = LRU
+        self._meta: "OrderedDict[tuple, dict]" = OrderedDict()
+        self._building: Dict[tuple, threading.Event] = {}
+        self._failed: Dict[tuple, float] = {}
+        self._stats = {"builds": 0, "hits": 0, "misses": 0, "evictions": 0, "failures": 0}
+        self._scanned = False
+
+    def _dir(self, repo_path: str, sha: str) -> str:
+        return os.path.join(self.root, repo_path.replace("/", "__"), sha)
+
+    def _scan(self):
+        """Muat snapshot yang sudah ada di disk (mis. setelah restart)."""
+        if self._scanned:
+            return
+        self._scanned = True
+        if not os.path.isdir(self.root):
+            return
+        found = []
+        for repo_dir in os.listdir(self.root):
+            if not os.path.isdir(os.path.join(self.root, repo_dir)):
+                continue
+            for sha in os.listdir(os.path.join(self.root, repo_dir)):
+                if ".tmp-" in sha:  # sisa build yang terputus
+                    shutil.rmtree(os.path.join(self.root, repo_dir, sha), ignore_errors=True)
+                    continue
+                path = os.path.join(self.root, repo_dir, sha, "index.json")
+                try:
+                    with open(path, encoding="utf-8") as f:
+                        info = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                found.append(((info["repo_path"], sha), {
+                    "dir": os.path.dirname(path), "bytes": info["bytes"], "atime": os.path.getmtime(path),
+                }))
+        for key, meta in sorted(found, key=lambda kv: kv[1]["atime"]):
+            self._meta[key] = meta
+
+    def peek(self, repo_path: str, ref: str, force: bool = False) -> Optional[Snapshot]:
+        """
+        Snapshot yang sudah siap untuk (repo, ref), atau None. Tidak pernah memicu download.
+        force=True: abaikan SNAPSHOT_MODE (dipakai fitur yang memang butuh salinan lokal, mis. search_code).
+        """
+        if not (self.enabled or force):
+            return None
+        key = (repo_path, ref)
+        with self._lock:
+            self._scan()
+            meta = self._meta.get(key)
+            if meta is None:
+                self._stats["misses"] += 1
+                return None
+            self._meta.move_to_end(key)
+            meta["atime"] = time.time()
+            self._stats["hits"] += 1
+            snap = self._loaded.get(key)
+        if snap is None:
+            try:
+                with open(os.path.join(meta["dir"], "index.json"), encoding="utf-8") as f:
+                    snap = Snapshot(repo_path, ref, meta["dir"], json.load(f)["files"])
+            except (OSError, ValueError):
+                return None
+            with self._lock:
+                self._loaded[key] = snap
+        return snap
+
+    def get(self, repo_path: str, sha: str, force: bool = False) -> Optional[Snapshot]:
+        """Snapshot untuk (repo, SHA); dibangun bila belum ada. Pemanggil paralel menunggu satu build."""
+        if not (self.enabled or force) or not sha:
+            return None
+        snap = self.peek(repo_path, sha, force)
+        if snap is not None:
+            return snap
+        key = (repo_path, sha)
+        with self._lock:
+            if time.time() - self._failed.get(key, 0) < 600:
+                return None
+            event = self._building.get(key)
+            leader = event is None
+            if leader:
+                event = self._building[key] = threading.Event()
+        if not leader:
+            event.wait()
+            return self.peek(repo_path, sha, force)
+        try:
+            self._build(repo_path, sha)
+        except Exception as e:
+            print(f"Gagal membuat snapshot {repo_path}@{sha[:7]}: {e}")
+            with self._lock:
+                self._failed[key] = time.time()
+                self._stats["failures"] += 1
+        finally:
+            with self._lock:
+                self._building.pop(key, None)
+            event.set()
+        return self.peek(repo_path, sha, force)
+
+    async def aget(self, repo_path: str, sha: str, force: bool = False) -> Optional[Snapshot]:
+        return await asyncio.to_thread(self.get, repo_path, sha, force)
+
+    def prefetch(self, repo_path: str, sha: Optional[str]):
+        """Bangun snapshot di background (tidak memblokir pemanggil)."""
+        if self.enabled and sha and self.peek(repo_path, sha) is None:
+            threading.Thread(target=self.get, args=(repo_path, sha), name="snapshot-build", daemon=True).start()
+
+    def _build(self, repo_path: str, sha: str):
+        dest = self._dir(repo_path, sha)
+        tmp = f"{dest}.tmp-{os.getpid()}-{threading.get_ident()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        files_dir = os.path.join(tmp, "files")
+        os.makedirs(files_dir)
+
+        client = get_github_client()
+        url = f"https://api.github.com/repos/{repo_path}/tarball/{sha}"
+        with client.session.get(url, headers=_default_headers(url, client.token), stream=True, timeout=60) as r:
+            if r.status_code != 200:
+                raise RuntimeError(f"HTTP {r.status_code}")
+            length = int(r.headers.get("Content-Length") or 0)
+            if length > self.max_repo_bytes:
+                raise RuntimeError(f"tarball {length} byte melebihi batas {self.max_repo_bytes}")
+            r.raw.decode_content = True
+            with tarfile.open(fileobj=r.raw, mode="r|gz") as tar:
+                total = 0
+                for member in _safe_members(tar, files_dir):
+                    total += member.size
+                    if total > self.max_repo_bytes:
+                        raise RuntimeError(f"isi repo melebihi batas {self.max_repo_bytes} byte")
+                    tar.extract(member, files_dir, set_attrs=False)
+
+        index = []
+        for dirpath, _, filenames in os.walk(files_dir):
+            for name in filenames:
+                full = os.path.join(dirpath, name)
+                path = os.path.relpath(full, files_dir).replace(os.sep, "/")
+                index.append({
+                    "path": path,
+                    "size": os.path.getsize(full),
+                    "language": detect_language(path),
+                    "manifest": is_manifest(path),
+                })
+        index.sort(key=lambda e: e["path"])
+        total = sum(e["size"] for e in index)
+        with open(os.path.join(tmp, "index.json"), "w", encoding="utf-8") as f:
+            json.dump({"repo_path": repo_path, "sha": sha, "bytes": total, "files": index}, f)
+
+        shutil.rmtree(dest, ignore_errors=True)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        os.replace(tmp, dest)
+        with self._lock:
+            self._scan()
+            self._meta[(repo_path, sha)] = {"dir": dest, "bytes": total, "atime": time.time()}
+            self._stats["builds"] += 1
+            self._evict()
+        print(f"📦 Snapshot {repo_path}@{sha[:7]} siap ({len(index)} file, {total / 1e6:.1f} MB)")
+
+    def _evict(self):
+        total = sum(m["bytes"] for m in self._meta.values())
+        while len(self._meta) > 1 and total > self.max_bytes:
+            key, meta = self._meta.popitem(last=False)
+            self._loaded.pop(key, None)
+            total -= meta["bytes"]
+            self._stats["evictions"] += 1
+            shutil.rmtree(meta["dir"], ignore_errors=True)
+
+    def drop(self, repo_path: str, sha: str):
+        with self._lock:
+            self._scan()
+            meta = self._meta.pop((repo_path, sha), None)
+            self._loaded.pop((repo_path, sha), None)
+        if meta:
+            shutil.rmtree(meta["dir"], ignore_errors=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "snapshots": len(self._meta),
+                "bytes": sum(m["bytes"] for m in self._meta.values()),
+                "max_bytes": self.max_bytes,
+            }
+
+
+snapshots = SnapshotStore()
+metrics.register_collector("snapshots", snapshots.stats)
+
+
+def _drop_stale_snapshot(repo_path: str, old_sha: Optional[str], new_sha: Optional[str]):
+    if old_sha:
+        snapshots.drop(repo_path, old_sha)
+
+
+repo_metadata.add_sha_listener(_drop_stale_snapshot)
@@ -0,0 +1,170 @@
+# core/synthesis.py
+import asyncio
+import json
+import re
+from dataclasses import asdict, dataclass
+from typing import Any, List, Optional
+
+from core.llm import get_model, model_for
+from core.observations import approx_tokens
+from core.repo_meta import aresolve_ref
+from core.tools import (
+    NO_MANIFEST_MESSAGE,
+    _acollect_manifests,
+    _alist_all_files,
+    _digest_section,
+    _format_dependencies_analysis,
+    _format_structure_analysis,
+    _manifest_sections,
+    _normalize_repo_url,
+    _repo_digest,
+)
+
+# Naikkan versi bila prompt atau skema berubah (dipakai sebagai bagian key cache artefak)
+SYNTHESIS_PROMPT_VERSION = "1"
+
+# Skema jawaban sintesis, divalidasi lokal (subset JSON Schema: type, required, properties, minLength)
+REPORT_SCHEMA = {
+    "type": "object",
+    "required": ["summary", "structure", "dependencies"],
+    "properties": {
+        "summary": {"type": "string", "minLength": 20},
+        "structure": {"type": "string", "minLength": 20},
+        "dependencies": {"type": "string"},  # boleh kosong bila repo tidak punya file dependensi
+    },
+}
+
+_JSON_TYPES = {"object": dict, "array": list, "string": str, "number": (int, float), "boolean": bool}
+_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+class ReportSchemaError(ValueError):
+    """Jawaban LLM bukan JSON yang sesuai REPORT_SCHEMA."""
+
+
+def validate_schema(value: Any, schema: dict, path: str = "$"):
+    """Validasi value terhadap subset JSON Schema yang dipakai REPORT_SCHEMA; ReportSchemaError bila tidak sesuai."""
+    expected = schema.get("type")
+    if expected and not isinstance(value, _JSON_TYPES[expected]):
+        raise ReportSchemaError(f"{path}: harus bertipe {expected}, bukan {type(value).__name__}")
+    if expected == "string" and len(value.strip()) < schema.get("minLength", 0):
+        raise ReportSchemaError(f"{path}: minimal {schema['minLength']} karakter")
+    if expected == "object":
+        missing = [key for key in schema.get("required", []) if key not in value]
+        if missing:
+            raise ReportSchemaError(f"{path}: kunci wajib tidak ada: {', '.join(missing)}")
+        for key, sub in schema.get("properties", {}).items():
+            if key in value:
+                validate_schema(value[key], sub, f"{path}.{key}")
+    if expected == "array" and "items" in schema:
+        for i, item in enumerate(value):
+            validate_schema(item, schema["items"], f"{path}[{i}]")
+
+
+def parse_report_json(text: str) -> dict:
+    """Ambil objek JSON dari jawaban LLM (boleh dibungkus ```json```) dan validasi terhadap REPORT_SCHEMA."""
+    text = _FENCE_RE.sub("", text.strip())
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end < start:
+        raise ReportSchemaError("jawaban tidak berisi objek JSON")
+    try:
+        data = json.loads(text[start:end + 1])
+    except ValueError as e:
+        raise ReportSchemaError(f"JSON tidak valid: {e}") from e
+    validate_schema(data, REPORT_SCHEMA)
+    return {key: data[key].strip() for key in REPORT_SCHEMA["properties"]}
+
+
+@dataclass
+class ReportSynthesis:
+    """Hasil sintesis laporan, dalam format teks yang sama dengan analisis struktur/dependensi terpisah."""
+    summary: str
+    structure: str
+    dependencies: str
+    model: str = ""
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, text: str) -> "ReportSynthesis":
+        return cls(**json.loads(text))
+
+
+@dataclass
+class ReportInputs:
+    repo_path: str
+    structure_text: str
+    digest_text: str
+    manifests: List[tuple]
+
+
+async def agather_report_inputs(repo_url: str) -> ReportInputs:
+    """Bahan laporan tanpa LLM: listing struktur, digest repo, dan file dependensi (diambil konkuren)."""
+    repo_path = _normalize_repo_url(repo_url)
+    ref = await aresolve_ref(repo_path)
+    listing, manifests, digest_text = await asyncio.gather(
+        _alist_all_files(repo_path),
+        _acollect_manifests(repo_path),
+        asyncio.to_thread(_repo_digest, repo_path, ref),
+    )
+    return ReportInputs(repo_path, "\n".join(listing), digest_text, manifests)
+
+
+def synthesis_prompt(inputs: ReportInputs) -> str:
+    dependencies = (
+        f"Isi file dependensi:\n\n        {_manifest_sections(inputs.manifests)}"
+        if inputs.manifests else "Tidak ditemukan file dependensi."
+    )
+    return f"""
+        Berikut adalah struktur file dari repositori GitHub {inputs.repo_path}:
+
+        {inputs.structure_text}
+        {_digest_section(inputs.digest_text)}
+        {dependencies}
+
+        Balas HANYA dengan satu objek JSON (tanpa teks lain) dengan kunci berikut, semua berisi teks:
+        - "summary": 2-4 kalimat tentang tujuan utama proyek dan cara kerjanya.
+        - "structure": penjelasan singkat (1) tujuan utama proyek berdasarkan struktur, (2) fungsi umum
+          tiap file/folder utama, (3) komponen penting (sebutkan file dan kelas/fungsi kuncinya).
+        - "dependencies": penjelasan (1) fungsi setiap dependensi, (2) teknologi utama yang digunakan,
+          (3) hubungan antar-dependensi bila relevan; string kosong bila tidak ada file dependensi.
+        """
+
+
+def synthesis_models(prompt_tokens: int = 0) -> List[str]:
+    """Model yang dicoba untuk sintesis, berurutan dan tanpa duplikat (lihat LLM_ROUTES)."""
+    models = []
+    for task in ("synthesis", "synthesis_retry"):
+        model = model_for(task, prompt_tokens)
+        if model not in models:
+            models.append(model)
+    return models
+
+
+async def asynthesize_report(repo_url: str) -> Optional[ReportSynthesis]:
+    """
+    Ringkasan, penjelasan struktur, dan penjelasan dependensi dalam SATU panggilan LLM (mode JSON).
+    Jawaban yang tidak lolos validasi skema diulang sekali dengan model besar (LLM_ROUTES);
+    None bila tetap gagal, sehingga pemanggil bisa kembali ke analisis per bagian.
+    ReportSynthesis.model = model yang benar-benar menghasilkan jawaban.
+    """
+    inputs = await agather_report_inputs(repo_url)
+    prompt = synthesis_prompt(inputs)
+    for model in synthesis_models(approx_tokens(prompt)):
+        try:
+            message = await get_model(model).bind(response_format={"type": "json_object"}).ainvoke(prompt)
+            data = parse_report_json(message.content)
+        except Exception as e:  # skema tidak cocok, atau JSON ditolak oleh API
+            print(f"⚠️ Sintesis laporan {inputs.repo_path} dengan {model} gagal: {e}")
+            continue
+        return ReportSynthesis(
+            summary=data["summary"],
+            structure=_format_structure_analysis(inputs.structure_text, data["structure"]),
+            dependencies=(
+                _format_dependencies_analysis(inputs.manifests, data["dependencies"])
+                if inputs.manifests else NO_MANIFEST_MESSAGE
+            ),
+            model=model,
+        )
+    return None
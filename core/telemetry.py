@@ -0,0 +1,399 @@
+# core/telemetry.py
+import functools
+import inspect
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from core.observations import response_usage
+
+# Fraksi trace (per permintaan) yang span-nya diekspor ke JSONL dan boleh mencetak log verbose;
+# metrik agregat selalu dicatat
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+# File JSONL tujuan span (satu baris per span); kosong = span tidak diekspor
+TRACE_JSONL_PATH = os.getenv("TRACE_JSONL_PATH", "")
+# Port endpoint Prometheus (/metrics); 0 = nonaktif
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+# Log verbose (prompt penuh AgentExecutor, isi laporan, state memory) hanya bila diminta
+VERBOSE_LOGGING = os.getenv("VERBOSE_LOGGING", "0") == "1"
+
+METRICS_PREFIX = "gitcortex"
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+SPAN_ERROR_MAX_CHARS = 300
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+# -------------------------
+# Metrik
+# -------------------------
+class _Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)  # non-kumulatif; dijumlahkan saat render
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+def _labels(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def _format_labels(key: LabelKey, extra: str = "") -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class MetricsRegistry:
+    """
+    Counter dan histogram latensi dalam memori, plus collector: fungsi stats() milik modul lain
+    (cache, klien GitHub, antrean) yang dibaca saat scrape dan diekspor sebagai gauge.
+    """
+
+    def __init__(self, prefix: str = METRICS_PREFIX):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, LabelKey], float] = {}
+        self._histograms: Dict[Tuple[str, LabelKey], _Histogram] = {}
+        self._collectors: Dict[str, Callable[[], dict]] = {}
+
+    def inc(self, metric: str, value: float = 1, **labels):
+        key = (metric, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, metric: str, value: float, **labels):
+        key = (metric, _labels(labels))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = _Histogram()
+            hist.observe(value)
+
+    def register_collector(self, name: str, stats: Callable[[], dict]):
+        """stats() -> dict; setiap nilai numerik diekspor sebagai gauge <prefix>_<name>_<key>."""
+        self._collectors[name] = stats
+
+    def counter(self, metric: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get((metric, _labels(labels)), 0)
+
+    def render_prometheus(self) -> str:
+        """Semua metrik dalam format teks Prometheus."""
+        lines: List[str] = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda kv: kv[0])
+            snapshots = [(name, _copy_hist(h)) for name, h in histograms]
+
+        typed = set()
+        for (name, labels), value in counters:
+            metric = f"{self.prefix}_{name}"
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{_format_labels(labels)} {value:g}")
+
+        for (name, labels), hist in snapshots:
+            metric = f"{self.prefix}_{name}"
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, count in zip(hist.buckets, hist.counts):
+                cumulative += count
+                le = 'le="%g"' % bound
+                lines.append(f"{metric}_bucket{_format_labels(labels, le)} {cumulative}")
+            inf = 'le="+Inf"'
+            lines.append(f"{metric}_bucket{_format_labels(labels, inf)} {hist.count}")
+            lines.append(f"{metric}_sum{_format_labels(labels)} {hist.sum:.6f}")
+            lines.append(f"{metric}_count{_format_labels(labels)} {hist.count}")
+
+        for source, stats in list(self._collectors.items()):
+            try:
+                values = stats()
+            except Exception as e:  # collector yang gagal tidak boleh menggagalkan scrape
+                print(f"Gagal membaca metrik {source}: {e}")
+                continue
+            for key, value in sorted(values.items()):
+                if isinstance(value, bool):
+                    value = int(value)
+                if not isinstance(value, (int, float)):
+                    continue
+                metric = f"{self.prefix}_{source}_{key}"
+                lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+def _copy_hist(hist: _Histogram) -> _Histogram:
+    copy = _Histogram(hist.buckets)
+    copy.counts, copy.sum, copy.count = list(hist.counts), hist.sum, hist.count
+    return copy
+
+
+metrics = MetricsRegistry()
+
+
+# -------------------------
+# Span
+# -------------------------
+class JsonlSink:
+    """Tulis span (dict) sebagai satu baris JSON per span; aman dipanggil dari banyak thread."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+
+    def write(self, record: dict):
+        if not self.path:
+            return
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            try:
+                if self._file is None:
+                    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                    self._file = open(self.path, "a", encoding="utf-8")
+                self._file.write(line + "\n")
+                self._file.flush()
+            except OSError as e:
+                print(f"Gagal menulis trace ke {self.path}: {e}")
+
+
+span_sink = JsonlSink(TRACE_JSONL_PATH)
+
+# Span yang sedang aktif; span baru menjadi anaknya (task asyncio mewarisi context saat dibuat)
+current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """
+    Satu operasi ber-timing dalam sebuah trace (permintaan, stage, iterasi agent, tool, LLM, PDF).
+    Durasi masuk histogram <prefix>_span_duration_seconds{kind,name}; span dari trace yang
+    tersampel juga ditulis ke sink JSONL.
+    """
+
+    def __init__(self, kind: str, name: str, parent: Optional["Span"] = None, **attrs):
+        self.kind = kind
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.parent_id = parent.span_id if parent else None
+        self.span_id = uuid.uuid4().hex[:16]
+        self.sampled = parent.sampled if parent else random.random() < TRACE_SAMPLE_RATE
+        self.attrs = attrs
+        self.start = time.time()
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+        self._t0 = time.perf_counter()
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def finish(self, error: Optional[BaseException] = None):
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self._t0
+        metrics.observe("span_duration_seconds", self.duration, kind=self.kind, name=self.name)
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"[:SPAN_ERROR_MAX_CHARS]
+            metrics.inc("span_errors_total", kind=self.kind, name=self.name)
+        if self.sampled:
+            span_sink.write(self.to_dict())
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "kind": self.kind,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round((self.duration or 0) * 1000, 3),
+            "status": "error" if self.error else "ok",
+            "error": self.error,
+            "attrs": self.attrs,
+        }
+
+
+def start_span(kind: str, name: str, parent: Optional[Span] = None, **attrs) -> Span:
+    """Span yang tidak menjadi span aktif (untuk callback start/end); akhiri dengan finish()."""
+    return Span(kind, name, parent or current_span.get(), **attrs)
+
+
+@contextmanager
+def activate(s: Span):
+    """
+    Jadikan span yang sudah ada span aktif selama blok, tanpa mengakhirinya. Untuk generator:
+    aktifkan hanya di sekitar kerja di antara yield, jangan di sekitar yield itu sendiri.
+    """
+    token = current_span.set(s)
+    try:
+        yield s
+    finally:
+        current_span.reset(token)
+
+
+@contextmanager
+def span(kind: str, name: str, parent: Optional[Span] = None, **attrs):
+    """Span aktif selama blok berjalan; span dan task yang dibuat di dalamnya menjadi anaknya."""
+    s = start_span(kind, name, parent, **attrs)
+    token = current_span.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.finish(e)
+        raise
+    else:
+        s.finish()
+    finally:
+        try:
+            current_span.reset(token)
+        except ValueError:  # generator ditutup dari context lain
+            pass
+
+
+def traced(kind: str, name: Optional[str] = None):
+    """Decorator: setiap panggilan fungsi (sync atau async) dicatat sebagai span."""
+    def decorator(fn):
+        span_name = name or fn.__name__
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(kind, span_name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(kind, span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def debug(*args):
+    """print() untuk log verbose: hanya bila VERBOSE_LOGGING=1 dan trace yang aktif tersampel."""
+    if not VERBOSE_LOGGING:
+        return
+    active = current_span.get()
+    if active is None or active.sampled:
+        print(*args)
+
+
+# -------------------------
+# Callback LangChain: span untuk setiap panggilan LLM dan tool
+# -------------------------
+def _model_of(serialized: Optional[dict], kwargs: dict) -> str:
+    params = kwargs.get("invocation_params") or {}
+    metadata = kwargs.get("metadata") or {}
+    return (
+        params.get("model") or params.get("model_name") or metadata.get("ls_model_name")
+        or (serialized or {}).get("name") or "llm"
+    )
+
+
+class TracingCallback(BaseCallbackHandler):
+    """Span + metrik (latensi, token per model) untuk panggilan LLM dan tool, di mana pun dipanggil."""
+
+    run_inline = True  # span dibuat di context pemanggil, sehingga induknya span yang sedang aktif
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans: Dict[Any, Span] = {}
+
+    def _start(self, run_id, kind: str, name: str):
+        with self._lock:
+            self._spans[run_id] = start_span(kind, name)
+
+    def _end(self, run_id, error: Optional[BaseException] = None, **attrs) -> Optional[Span]:
+        with self._lock:
+            s = self._spans.pop(run_id, None)
+        if s is not None:
+            s.set(**attrs)
+            s.finish(error)
+        return s
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id, "llm", _model_of(serialized, kwargs))
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, "llm", _model_of(serialized, kwargs))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        usage = response_usage(response)
+        s = self._end(run_id, **usage)
+        model = s.name if s is not None else "llm"
+        metrics.inc("llm_tokens_total", usage["prompt_tokens"], model=model, type="prompt")
+        metrics.inc("llm_tokens_total", usage["completion_tokens"], model=model, type="completion")
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._start(run_id, "tool", (serialized or {}).get("name") or kwargs.get("name") or "tool")
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id, output_chars=len(str(output)))
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+
+tracing_callback = TracingCallback()
+
+
+# -------------------------
+# Endpoint Prometheus
+# -------------------------
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = metrics.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # jangan cetak setiap scrape
+        pass
+
+
+_server: Optional[ThreadingHTTPServer] = None
+
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = "127.0.0.1") -> Optional[ThreadingHTTPServer]:
+    """Jalankan endpoint /metrics di thread daemon (sekali per proses); None bila port = 0."""
+    global _server
+    if not port or _server is not None:
+        return _server
+    _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+    print(f"📈 Metrik tersedia di http://{host}:{port}/metrics")
+    return _server
@@ -1,14 +1,26 @@
 # core/tools.py
+import asyncio
 import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse
-import requests
 from typing import List, Optional
 from pydantic import BaseModel, Field
 from langchain_core.tools import BaseTool
-import requests
-from urllib.parse import urlparse
-from langchain.tools import tool
-# from core.tools import _normalize_repo_url, _api_contents_url, _github_api_headers
+from core.github_client import get_async_github_client, get_github_client
+from core.manifests import discover_manifests
+from core.observations import cap_observation
+from core.prefetch import aprefetched, prefetched, register_prefetcher
+from core.repo_meta import aresolve_ref, repo_metadata, resolve_ref
+from core.repo_tree import aget_repo_tree, get_repo_tree
+from core.code_index import code_indexes
+from core.digest import DIGEST_FETCH_FILES, get_digest, render_digest
+from core.report import STRUCTURE_EXPLANATION_MARKER
+from core.snapshot import snapshots
+from core.telemetry import tracing_callback
+from core.utils.aio import SingleFlight
 
 from inspect import signature
 
@@ -45,7 +57,35 @@ except Exception:
             return fn
         return decorator
 
-GITHUB_TOKEN = os.getenv("GITHUB_ACCESS_TOKEN")
+# Batas listing struktur yang dikirim ke LLM (dirender dari pohon yang sudah di-cache)
+STRUCTURE_MAX_LINES = 150
+STRUCTURE_MAX_ENTRIES_PER_DIR = 25
+
+# Naikkan versi bila prompt berubah, agar artefak lama di cache tidak dipakai lagi
+STRUCTURE_PROMPT_VERSION = "3"
+DEPENDENCIES_PROMPT_VERSION = "2"
+
+# Fetch manifest dependensi secara paralel dengan pool terbatas
+MANIFEST_WORKERS = 6
+# Batas karakter per manifest yang dimasukkan ke prompt LLM
+MANIFEST_PROMPT_MAX_CHARS = 4000
+
+# Fetch manifest konkuren untuk repo + ref yang sama digabung jadi satu
+_manifest_flights = SingleFlight()
+
+NO_MANIFEST_MESSAGE = "Tidak ditemukan file dependensi umum (requirements.txt, package.json, pyproject.toml, dll.)"
+
+# Isi file per (repo, ref, path) di-cache agar pembacaan bertahap (jendela baris, grep)
+# atas file yang sama tidak mengambil ulang dari jaringan. Ref berupa SHA -> immutable.
+FILE_CACHE_MAX_FILES = 64
+FILE_CACHE_MAX_BYTES = 8 * 1024 * 1024
+_file_cache: "OrderedDict[tuple, str]" = OrderedDict()
+_file_cache_lock = threading.Lock()
+
+# Batas keluaran tool pembacaan bertahap
+FILE_WINDOW_MAX_LINES = 200
+GREP_MAX_MATCHES = 30
+READ_MORE_HINT = "; gunakan read_file_lines, read_file_head_tail, atau grep_in_file untuk bagian lain"
 
 
 # -------------------------
@@ -65,271 +105,756 @@ def _normalize_repo_url(repo_url: str) -> str:
     return repo_url.strip("/")
 
 
-def _github_api_headers():
-    headers = {"Accept": "application/vnd.github.v3+json"}
-    if GITHUB_TOKEN:
-        headers["Authorization"] = f"token {GITHUB_TOKEN}"
-    return headers
+def _http_get(url: str, timeout: float = 15):
+    """Semua request GitHub lewat client bersama (pooling, ETag, retry)."""
+    return get_github_client().get(url, timeout=timeout)
+
+
+async def _ahttp_get(url: str, timeout: float = 15):
+    """Padanan async dari _http_get (client aiohttp milik event loop saat ini)."""
+    return await get_async_github_client().get(url, timeout=timeout)
 
 
 def _raw_base_url(repo_path: str, branch: str = "main") -> str:
     return f"https://raw.githubusercontent.com/{repo_path}/{branch}"
 
 
+def _readme_request(repo_path: str, ref: str):
+    return (
+        f"https://api.github.com/repos/{repo_path}/readme?ref={ref}",
+        {"Accept": "application/vnd.github.raw"},
+    )
+
+
+def _fetch_readme(repo_path: str, ref: str) -> tuple:
+    """(status HTTP, isi) README lewat endpoint README GitHub."""
+    url, headers = _readme_request(repo_path, ref)
+    r = get_github_client().get(url, headers=headers, timeout=15)
+    return r.status_code, r.text
+
+
+async def _afetch_readme(repo_path: str, ref: str) -> tuple:
+    url, headers = _readme_request(repo_path, ref)
+    r = await get_async_github_client().get(url, headers=headers, timeout=15)
+    return (r.status_code, r.text) if r is not None else (0, "")
+
+
+def _tree(repo_path: str, ref: str):
+    """
+    Pohon repo dari snapshot lokal bila sudah siap, lalu dari prefetch permintaan ini,
+    selain itu dari Git Trees API (di-cache).
+    """
+    snap = snapshots.peek(repo_path, ref)
+    if snap is not None:
+        return snap.tree()
+    pre = prefetched("tree", repo_path)
+    if pre is not None and pre[0] == ref:
+        return pre[1]
+    return get_repo_tree(repo_path, ref)
+
+
+async def _atree(repo_path: str, ref: str):
+    snap = snapshots.peek(repo_path, ref)
+    if snap is not None:
+        return snap.tree()
+    pre = await aprefetched("tree", repo_path)
+    if pre is not None and pre[0] == ref:
+        return pre[1]
+    return await aget_repo_tree(repo_path, ref)
+
+
+def _snapshot_file(repo_path: str, file_path: str, ref: str) -> Optional[tuple]:
+    """(status, isi) dari snapshot lokal, atau None bila snapshot untuk ref ini belum ada."""
+    snap = snapshots.peek(repo_path, ref)
+    if snap is None:
+        return None
+    text = snap.read_text(file_path)
+    if text is not None:
+        return 200, text
+    # file ada di index tapi folder snapshot sudah dihapus: ambil dari GitHub
+    return None if snap.exists(file_path) else (404, "")
+
+
+def _collect_manifests(repo_path: str, branch: Optional[str] = None) -> List[tuple]:
+    """
+    Temukan manifest dari pohon repo yang di-cache, lalu ambil hanya yang ada secara paralel.
+    Kembalikan [(path, content)] dengan urutan prioritas dari discover_manifests.
+    """
+    ref = resolve_ref(repo_path, branch)
+    paths = discover_manifests(_tree(repo_path, ref))
+    if not paths:
+        return []
+
+    def fetch(path):
+        status, text = _fetch_file(repo_path, path, ref)
+        return text if status == 200 else None
+
+    with ThreadPoolExecutor(max_workers=min(MANIFEST_WORKERS, len(paths))) as pool:
+        contents = list(pool.map(fetch, paths))
+    return [(p, c) for p, c in zip(paths, contents) if c is not None]
+
+
+async def _acollect_manifests(repo_path: str, branch: Optional[str] = None) -> List[tuple]:
+    """
+    Versi async dari _collect_manifests, dibatasi semaphore MANIFEST_WORKERS.
+    Pemanggil konkuren untuk repo + ref yang sama berbagi satu fetch (single-flight).
+    """
+    ref = await aresolve_ref(repo_path, branch)
+
+    async def collect():
+        paths = discover_manifests(await _atree(repo_path, ref))
+        if not paths:
+            return []
+
+        semaphore = asyncio.Semaphore(MANIFEST_WORKERS)
+
+        async def fetch(path):
+            async with semaphore:
+                status, text = await _afetch_file(repo_path, path, ref)
+            return text if status == 200 else None
+
+        contents = await asyncio.gather(*(fetch(p) for p in paths))
+        return [(p, c) for p, c in zip(paths, contents) if c is not None]
+
+    return await _manifest_flights.do((repo_path, ref), collect)
+
+
+def _file_cache_get(key: tuple) -> Optional[str]:
+    with _file_cache_lock:
+        text = _file_cache.get(key)
+        if text is not None:
+            _file_cache.move_to_end(key)
+        return text
+
+
+def _file_cache_put(key: tuple, text: str):
+    with _file_cache_lock:
+        _file_cache[key] = text
+        _file_cache.move_to_end(key)
+        total = sum(len(t) for t in _file_cache.values())
+        while len(_file_cache) > FILE_CACHE_MAX_FILES or (total > FILE_CACHE_MAX_BYTES and len(_file_cache) > 1):
+            _, dropped = _file_cache.popitem(last=False)
+            total -= len(dropped)
+
+
+def _fetch_file(repo_path: str, file_path: str, ref: str) -> tuple:
+    """(status HTTP, isi) sebuah file; isi file yang berhasil diambil di-cache per (repo, ref, path)."""
+    local = _snapshot_file(repo_path, file_path, ref)
+    if local is not None:
+        return local
+    key = (repo_path, ref, file_path.lstrip("/"))
+    cached = _file_cache_get(key)
+    if cached is not None:
+        return 200, cached
+    r = _http_get(f"{_raw_base_url(repo_path, ref)}/{key[2]}", timeout=15)
+    if r.status_code == 200:
+        _file_cache_put(key, r.text)
+    return r.status_code, r.text
+
+
+async def _afetch_file(repo_path: str, file_path: str, ref: str) -> tuple:
+    local = _snapshot_file(repo_path, file_path, ref)
+    if local is not None:
+        return local
+    key = (repo_path, ref, file_path.lstrip("/"))
+    cached = _file_cache_get(key)
+    if cached is not None:
+        return 200, cached
+    r = await _ahttp_get(f"{_raw_base_url(repo_path, ref)}/{key[2]}", timeout=15)
+    if r is None:
+        return 0, ""
+    if r.status_code == 200:
+        _file_cache_put(key, r.text)
+    return r.status_code, r.text
+
+
+def _is_error_result(text: str) -> bool:
+    """Hasil tool/analisis berupa pesan error (jangan di-cache)."""
+    return text.startswith("Error saat")
+
+
 def _api_contents_url(repo_path: str, path: str = "") -> str:
     if path:
         return f"https://api.github.com/repos/{repo_path}/contents/{path}"
     return f"https://api.github.com/repos/{repo_path}/contents"
 
 
+# -------------------------
+# Formatter (dipakai bersama jalur sync & async)
+# -------------------------
+def _format_structure(repo_path: str, tree, branch: Optional[str], depth: int) -> str:
+    if tree is None:
+        return f"Gagal mengambil struktur repo '{repo_path}' (branch {branch or 'default'})."
+    lines = tree.render(max_depth=int(depth))
+    if not lines:
+        return f"Repositori '{repo_path}' kosong pada root."
+    return f"Struktur root untuk '{repo_path}':\n" + "\n".join(lines)
+
+
+def _format_directory(repo_path: str, tree, path: str, branch: Optional[str]) -> str:
+    if tree is None:
+        return f"Gagal mengambil isi direktori untuk repo {repo_path} (branch {branch or 'default'})."
+    if not tree.exists(path):
+        return f"Path '{path}' tidak ditemukan di repo {repo_path}."
+    if not tree.is_dir(path):
+        return f"Path '{path}' adalah file, bukan direktori. Gunakan read_file_content untuk membacanya."
+    lines = tree.render(path, max_depth=0)
+    if not lines:
+        return f"Direktori '{path}' kosong atau tidak ada."
+    return f"Struktur untuk '{repo_path}' di path '{path}':\n" + "\n".join(lines)
+
+
+def _file_error(status: int, text: str, repo_path: str, file_path: str, branch: Optional[str]) -> Optional[str]:
+    if status == 404:
+        return f"File '{file_path}' tidak ditemukan di repo {repo_path} (branch {branch or 'default'})."
+    if status != 200:
+        return f"Gagal mengambil file: HTTP {status} - {text[:200]}"
+    return None
+
+
+def _format_file(status: int, text: str, repo_path: str, file_path: str, branch: Optional[str]) -> str:
+    return _file_error(status, text, repo_path, file_path, branch) or cap_observation(text, hint=READ_MORE_HINT)
+
+
+def _numbered(lines: List[str], start: int) -> str:
+    width = len(str(start + len(lines) - 1))
+    return "\n".join(f"{i:>{width}}| {line}" for i, line in enumerate(lines, start=start))
+
+
+def _format_lines(text: str, file_path: str, start_line: int, end_line: Optional[int]) -> str:
+    lines = text.splitlines()
+    start = max(1, int(start_line))
+    end = min(len(lines), int(end_line) if end_line else start + FILE_WINDOW_MAX_LINES - 1)
+    end = min(end, start + FILE_WINDOW_MAX_LINES - 1)
+    if start > len(lines):
+        return f"File '{file_path}' hanya memiliki {len(lines)} baris."
+    header = f"{file_path} baris {start}-{end} dari {len(lines)}:"
+    return cap_observation(f"{header}\n{_numbered(lines[start - 1:end], start)}")
+
+
+def _format_head_tail(text: str, file_path: str, head: int, tail: int) -> str:
+    lines = text.splitlines()
+    head = max(0, min(int(head), FILE_WINDOW_MAX_LINES))
+    tail = max(0, min(int(tail), FILE_WINDOW_MAX_LINES))
+    if head + tail >= len(lines):
+        return cap_observation(f"{file_path} ({len(lines)} baris):\n{_numbered(lines, 1)}")
+    parts = [f"{file_path} ({len(lines)} baris):"]
+    if head:
+        parts.append(_numbered(lines[:head], 1))
+    parts.append(f"[... baris {head + 1}-{len(lines) - tail} tidak ditampilkan ...]")
+    if tail:
+        parts.append(_numbered(lines[-tail:], len(lines) - tail + 1))
+    return cap_observation("\n".join(parts))
+
+
+def _format_grep(text: str, file_path: str, pattern: str, context: int) -> str:
+    try:
+        regex = re.compile(pattern, re.IGNORECASE)
+    except re.error:
+        regex = re.compile(re.escape(pattern), re.IGNORECASE)
+    lines = text.splitlines()
+    hits = [i for i, line in enumerate(lines) if regex.search(line)]
+    if not hits:
+        return f"Tidak ada baris yang cocok dengan '{pattern}' di {file_path}."
+    context = max(0, min(int(context), 10))
+    # jendela konteks yang bertumpuk digabung menjadi satu blok
+    ranges = []
+    for i in hits[:GREP_MAX_MATCHES]:
+        start, end = max(0, i - context), min(len(lines), i + context + 1)
+        if ranges and start <= ranges[-1][1]:
+            ranges[-1][1] = end
+        else:
+            ranges.append([start, end])
+    blocks = [_numbered(lines[start:end], start + 1) for start, end in ranges]
+    more = f" (menampilkan {GREP_MAX_MATCHES} pertama)" if len(hits) > GREP_MAX_MATCHES else ""
+    header = f"{len(hits)} baris cocok dengan '{pattern}' di {file_path}{more}:"
+    return cap_observation(header + "\n" + "\n--\n".join(blocks))
+
+
+def _format_search(repo_path: str, query: str, results: List[dict]) -> str:
+    if not results:
+        return f"Tidak ada kode yang cocok dengan '{query}' di {repo_path}."
+    out = [f"Hasil pencarian '{query}' di {repo_path} ({len(results)} file teratas):"]
+    for res in results:
+        for hit in res["hits"]:
+            out.append(f"{res['path']}:{hit['line']}")
+            out.extend(f"  {n:>5}| {line}" for n, line in hit["context"])
+    return cap_observation("\n".join(out))
+
+
+def _format_languages(repo_path: str, langs) -> str:
+    if langs is None:
+        return f"Gagal mengambil bahasa repo {repo_path}."
+    if not langs:
+        return "Tidak dapat mendeteksi bahasa pemrograman di repositori ini."
+    out = "Bahasa pemrograman yang digunakan:\n"
+    for k, v in langs.items():
+        out += f"- {k}: {v} bytes\n"
+    return out
+
+
+def _format_manifests(manifests: List[tuple]) -> str:
+    if not manifests:
+        return NO_MANIFEST_MESSAGE
+    return cap_observation(
+        "\n".join(f"--- {path} ---\n{content}\n" for path, content in manifests), hint=READ_MORE_HINT
+    )
+
+
+def _async_impl(sync_tool):
+    """Pasang implementasi async native ke tool LangChain (dipakai oleh ainvoke/_arun)."""
+    def decorator(coro):
+        sync_tool.coroutine = coro
+        return coro
+    return decorator
+
+
 # -------------------------
 # Tools (decorated)
 # -------------------------
 
 class RepoInput(BaseModel):
     repo_url: str = Field(..., description="URL repo (https://github.com/owner/repo) atau 'owner/repo'")
-    branch: Optional[str] = Field("main", description="Nama branch (default: main)")
+    branch: Optional[str] = Field(None, description="Nama branch (default: default branch repo)")
 
 class RepoPathInput(RepoInput):
     path: str = Field("/", description="Path file atau direktori relatif di repo. Gunakan '/' untuk root.")
 
 
-@tool("get_readme_content", return_direct=True)
-def get_readme_content(repo_url: str, branch: str = "main") -> str:
+@tool("get_readme_content")
+def get_readme_content(repo_url: str, branch: Optional[str] = None) -> str:
     """
-    Ambil README.md dari repo — bila branch tidak ada, coba default 'main' atau 'master'.
-    Input: repo_url (URL atau owner/repo), optional branch.
+    Ambil README dari repo via endpoint README GitHub (README.md, README.rst, dll.).
+    Input: repo_url (URL atau owner/repo), optional branch (default: default branch repo).
     """
     try:
         repo_path = _normalize_repo_url(repo_url)
-        # try main then master if 404
-        for br in [branch, "main", "master"]:
-            raw_url = f"{_raw_base_url(repo_path, br)}/README.md"
-            r = requests.get(raw_url, headers=_github_api_headers(), timeout=15)
-            if r.status_code == 200:
-                return r.text
-        return f"README.md tidak ditemukan di branch '{branch}', 'main', atau 'master' untuk repo {repo_path}."
+        status, text = prefetched("readme", repo_path, branch) or _fetch_readme(repo_path, resolve_ref(repo_path, branch))
+        if status == 200:
+            return cap_observation(text, hint=READ_MORE_HINT)
+        return f"README tidak ditemukan di branch '{branch or 'default'}' untuk repo {repo_path}."
+    except Exception as e:
+        return f"Error saat mengambil README: {e}"
+
+
+@_async_impl(get_readme_content)
+async def _aget_readme_content(repo_url: str, branch: Optional[str] = None) -> str:
+    try:
+        repo_path = _normalize_repo_url(repo_url)
+        pre = await aprefetched("readme", repo_path, branch)
+        status, text = pre or await _afetch_readme(repo_path, await aresolve_ref(repo_path, branch))
+        if status == 200:
+            return cap_observation(text, hint=READ_MORE_HINT)
+        return f"README tidak ditemukan di branch '{branch or 'default'}' untuk repo {repo_path}."
     except Exception as e:
         return f"Error saat mengambil README: {e}"
 
 
 @tool("get_repository_structure", return_direct=True)
-def get_repository_structure(repo_url: str, branch: str = "main") -> str:
+def get_repository_structure(repo_url: str, branch: Optional[str] = None, depth: int = 0) -> str:
     """
-    Ambil daftar isi direktori root (file & folder) menggunakan GitHub Contents API.
-    Untuk struktur recursive, agent bisa memanggil list_files_in_directory pada subpath.
+    Ambil struktur repo (file & folder) dari pohon Git Trees API yang di-cache.
+    depth=0 hanya menampilkan root; naikkan depth untuk melihat isi subfolder sekaligus.
     """
     try:
         repo_path = _normalize_repo_url(repo_url)
-        api_url = _api_contents_url(repo_path, "")
-        r = requests.get(api_url, headers=_github_api_headers(), timeout=15)
-        if r.status_code != 200:
-            return f"Gagal mengambil struktur repo: HTTP {r.status_code} - {r.text}"
-        items = r.json()
-        dirs = [it["path"] for it in items if it["type"] == "dir"]
-        files = [it["path"] for it in items if it["type"] == "file"]
-        out = f"Struktur root untuk '{repo_path}':\n"
-        for d in dirs:
-            out += f"📁 {d}/\n"
-        for f in files:
-            out += f"📄 {f}\n"
-        return out.strip() if (dirs or files) else f"Repositori '{repo_path}' kosong pada root."
+        tree = _tree(repo_path, resolve_ref(repo_path, branch))
+        return _format_structure(repo_path, tree, branch, depth)
     except Exception as e:
         return f"Error saat mengambil struktur repositori: {e}"
 
 
-@tool("analyze_dependencies", return_direct=True)
-def analyze_dependencies(repo_url: str, branch: str = "main") -> str:
+@_async_impl(get_repository_structure)
+async def _aget_repository_structure(repo_url: str, branch: Optional[str] = None, depth: int = 0) -> str:
+    try:
+        repo_path = _normalize_repo_url(repo_url)
+        tree = await _atree(repo_path, await aresolve_ref(repo_path, branch))
+        return _format_structure(repo_path, tree, branch, depth)
+    except Exception as e:
+        return f"Error saat mengambil struktur repositori: {e}"
+
+
+@tool("analyze_dependencies")
+def analyze_dependencies(repo_url: str, branch: Optional[str] = None) -> str:
     """
-    Carilah file dependensi umum (requirements.txt, environment.yml, package.json, pyproject.toml).
-    Kembalikan konten bila ditemukan.
+    Carilah file dependensi (requirements.txt, pyproject.toml, package.json, go.mod, Cargo.toml,
+    pom.xml, dll.), termasuk manifest workspace bersarang. Kembalikan konten bila ditemukan.
     """
     try:
         repo_path = _normalize_repo_url(repo_url)
-        candidates = [
-            "requirements.txt",
-            "pyproject.toml",
-            "Pipfile",
-            "environment.yml",
-            "package.json",
-            "setup.py",
-        ]
-        found = []
-        for fname in candidates:
-            raw_url = f"{_raw_base_url(repo_path, branch)}/{fname}"
-            r = requests.get(raw_url, headers=_github_api_headers(), timeout=10)
-            if r.status_code == 200:
-                found.append(f"--- {fname} ---\n{r.text}\n")
-        if not found:
-            return "Tidak ditemukan file dependensi umum (requirements.txt, package.json, pyproject.toml, dll.)"
-        return "\n".join(found)
+        return _format_manifests(_collect_manifests(repo_path, branch))
+    except Exception as e:
+        return f"Error saat menganalisis dependensi: {e}"
+
+
+@_async_impl(analyze_dependencies)
+async def _aanalyze_dependencies(repo_url: str, branch: Optional[str] = None) -> str:
+    try:
+        repo_path = _normalize_repo_url(repo_url)
+        return _format_manifests(await _acollect_manifests(repo_path, branch))
     except Exception as e:
         return f"Error saat menganalisis dependensi: {e}"
 
 
 @tool("list_files_in_directory", return_direct=True)
-def list_files_in_directory(repo_url: str, path: str = "/", branch: str = "main") -> str:
+def list_files_in_directory(repo_url: str, path: str = "/", branch: Optional[str] = None) -> str:
     """
     List file & folder pada path tertentu (relatif).
     path contoh: '/', 'src', 'src/app', 'docs'
     """
     try:
         repo_path = _normalize_repo_url(repo_url)
-        # strip leading slash if present
-        path_rel = path.lstrip("/")
-        api_url = _api_contents_url(repo_path, path_rel)
-        r = requests.get(api_url, headers=_github_api_headers(), timeout=15)
-        if r.status_code == 404:
-            return f"Path '{path}' tidak ditemukan di repo {repo_path}."
-        if r.status_code != 200:
-            return f"Gagal mengambil isi direktori: HTTP {r.status_code} - {r.text}"
-        items = r.json()
-        dirs = [it["path"] for it in items if it["type"] == "dir"]
-        files = [it["path"] for it in items if it["type"] == "file"]
-        out = f"Struktur untuk '{repo_path}' di path '{path}':\n"
-        for d in dirs:
-            out += f"📁 {d}/\n"
-        for f in files:
-            out += f"📄 {f}\n"
-        return out.strip() if (dirs or files) else f"Direktori '{path}' kosong atau tidak ada."
+        tree = _tree(repo_path, resolve_ref(repo_path, branch))
+        return _format_directory(repo_path, tree, path, branch)
+    except Exception as e:
+        return f"Error saat mengambil isi direktori: {e}"
+
+
+@_async_impl(list_files_in_directory)
+async def _alist_files_in_directory(repo_url: str, path: str = "/", branch: Optional[str] = None) -> str:
+    try:
+        repo_path = _normalize_repo_url(repo_url)
+        tree = await _atree(repo_path, await aresolve_ref(repo_path, branch))
+        return _format_directory(repo_path, tree, path, branch)
     except Exception as e:
         return f"Error saat mengambil isi direktori: {e}"
 
 
-@tool("read_file_content", return_direct=True)
-def read_file_content(repo_url: str, file_path: str, branch: str = "main") -> str:
+@tool("read_file_content")
+def read_file_content(repo_url: str, file_path: str, branch: Optional[str] = None) -> str:
     """
-    Baca konten file spesifik via raw.githubusercontent.
+    Baca konten file spesifik via raw.githubusercontent. File besar dipotong sesuai anggaran
+    token; gunakan read_file_lines / grep_in_file untuk bagian lainnya.
     file_path contoh: 'src/app.py' atau 'Dockerfile'
     """
     try:
         repo_path = _normalize_repo_url(repo_url)
-        raw_url = f"{_raw_base_url(repo_path, branch)}/{file_path.lstrip('/')}"
-        r = requests.get(raw_url, headers=_github_api_headers(), timeout=15)
-        if r.status_code == 404:
-            return f"File '{file_path}' tidak ditemukan di repo {repo_path} (branch {branch})."
-        if r.status_code != 200:
-            return f"Gagal mengambil file: HTTP {r.status_code} - {r.text}"
-        return r.text
+        status, text = _fetch_file(repo_path, file_path, resolve_ref(repo_path, branch))
+        return _format_file(status, text, repo_path, file_path, branch)
+    except Exception as e:
+        return f"Error saat membaca file: {e}"
+
+
+@_async_impl(read_file_content)
+async def _aread_file_content(repo_url: str, file_path: str, branch: Optional[str] = None) -> str:
+    try:
+        repo_path = _normalize_repo_url(repo_url)
+        status, text = await _afetch_file(repo_path, file_path, await aresolve_ref(repo_path, branch))
+        return _format_file(status, text, repo_path, file_path, branch)
     except Exception as e:
         return f"Error saat membaca file: {e}"
 
 
+@tool("read_file_lines")
+def read_file_lines(
+    repo_url: str, file_path: str, start_line: int = 1, end_line: Optional[int] = None, branch: Optional[str] = None
+) -> str:
+    """
+    Baca jendela baris tertentu dari sebuah file (bernomor baris), maksimal 200 baris per panggilan.
+    Contoh: file_path='src/app.py', start_line=120, end_line=180
+    """
+    try:
+        repo_path = _normalize_repo_url(repo_url)
+        status, text = _fetch_file(repo_path, file_path, resolve_ref(repo_path, branch))
+        return _file_error(status, text, repo_path, file_path, branch) or _format_lines(text, file_path, start_line, end_line)
+    except Exception as e:
+        return f"Error saat membaca file: {e}"
+
+
+@_async_impl(read_file_lines)
+async def _aread_file_lines(
+    repo_url: str, file_path: str, start_line: int = 1, end_line: Optional[int] = None, branch: Optional[str] = None
+) -> str:
+    try:
+        repo_path = _normalize_repo_url(repo_url)
+        status, text = await _afetch_file(repo_path, file_path, await aresolve_ref(repo_path, branch))
+        return _file_error(status, text, repo_path, file_path, branch) or _format_lines(text, file_path, start_line, end_line)
+    except Exception as e:
+        return f"Error saat membaca file: {e}"
+
+
+@tool("read_file_head_tail")
+def read_file_head_tail(
+    repo_url: str, file_path: str, head: int = 40, tail: int = 20, branch: Optional[str] = None
+) -> str:
+    """
+    Baca beberapa baris awal (head) dan akhir (tail) sebuah file, berguna untuk file besar
+    seperti lockfile atau log. Contoh: file_path='package-lock.json', head=30, tail=10
+    """
+    try:
+        repo_path = _normalize_repo_url(repo_url)
+        status, text = _fetch_file(repo_path, file_path, resolve_ref(repo_path, branch))
+        return _file_error(status, text, repo_path, file_path, branch) or _format_head_tail(text, file_path, head, tail)
+    except Exception as e:
+        return f"Error saat membaca file: {e}"
+
+
+@_async_impl(read_file_head_tail)
+async def _aread_file_head_tail(
+    repo_url: str, file_path: str, head: int = 40, tail: int = 20, branch: Optional[str] = None
+) -> str:
+    try:
+        repo_path = _normalize_repo_url(repo_url)
+        status, text = await _afetch_file(repo_path, file_path, await aresolve_ref(repo_path, branch))
+        return _file_error(status, text, repo_path, file_path, branch) or _format_head_tail(text, file_path, head, tail)
+    except Exception as e:
+        return f"Error saat membaca file: {e}"
+
+
+@tool("grep_in_file")
+def grep_in_file(
+    repo_url: str, file_path: str, pattern: str, context: int = 2, branch: Optional[str] = None
+) -> str:
+    """
+    Cari baris yang cocok dengan pattern (regex, tidak case-sensitive) di sebuah file,
+    lengkap dengan nomor baris dan beberapa baris konteks.
+    Contoh: file_path='src/app.py', pattern='def main'
+    """
+    try:
+        repo_path = _normalize_repo_url(repo_url)
+        status, text = _fetch_file(repo_path, file_path, resolve_ref(repo_path, branch))
+        return _file_error(status, text, repo_path, file_path, branch) or _format_grep(text, file_path, pattern, context)
+    except Exception as e:
+        return f"Error saat mencari di file: {e}"
+
+
+@_async_impl(grep_in_file)
+async def _agrep_in_file(
+    repo_url: str, file_path: str, pattern: str, context: int = 2, branch: Optional[str] = None
+) -> str:
+    try:
+        repo_path = _normalize_repo_url(repo_url)
+        status, text = await _afetch_file(repo_path, file_path, await aresolve_ref(repo_path, branch))
+        return _file_error(status, text, repo_path, file_path, branch) or _format_grep(text, file_path, pattern, context)
+    except Exception as e:
+        return f"Error saat mencari di file: {e}"
+
+
+@tool("search_code")
+def search_code(repo_url: str, query: str, branch: Optional[str] = None) -> str:
+    """
+    Cari kode di seluruh repo (nama fungsi, kelas, variabel, atau kata kunci) dan kembalikan
+    hasil berperingkat file:baris beserta konteks. Gunakan ini sebelum menebak path file.
+    Contoh: query='def main' atau query='DatabaseConnection'
+    """
+    try:
+        repo_path = _normalize_repo_url(repo_url)
+        snap = snapshots.get(repo_path, resolve_ref(repo_path, branch), force=True)
+        if snap is None:
+            return f"Pencarian kode tidak tersedia untuk {repo_path} (snapshot repo gagal dibuat)."
+        return _format_search(repo_path, query, code_indexes.search(snap, query))
+    except Exception as e:
+        return f"Error saat mencari kode: {e}"
+
+
+@_async_impl(search_code)
+async def _asearch_code(repo_url: str, query: str, branch: Optional[str] = None) -> str:
+    try:
+        repo_path = _normalize_repo_url(repo_url)
+        snap = await snapshots.aget(repo_path, await aresolve_ref(repo_path, branch), force=True)
+        if snap is None:
+            return f"Pencarian kode tidak tersedia untuk {repo_path} (snapshot repo gagal dibuat)."
+        return _format_search(repo_path, query, await asyncio.to_thread(code_indexes.search, snap, query))
+    except Exception as e:
+        return f"Error saat mencari kode: {e}"
+
+
 @tool("get_repo_languages", return_direct=True)
 def get_repo_languages(repo_url: str) -> str:
     """
-    Ambil bahasa pemrograman dan byte counts dari GitHub API.
+    Ambil bahasa pemrograman dan byte counts dari GitHub API (di-cache per commit HEAD).
     """
     try:
         repo_path = _normalize_repo_url(repo_url)
-        api_url = f"https://api.github.com/repos/{repo_path}/languages"
-        r = requests.get(api_url, headers=_github_api_headers(), timeout=10)
-        if r.status_code != 200:
-            return f"Gagal mengambil bahasa repo: HTTP {r.status_code} - {r.text}"
-        langs = r.json()
-        if not langs:
-            return "Tidak dapat mendeteksi bahasa pemrograman di repositori ini."
-        out = "Bahasa pemrograman yang digunakan:\n"
-        for k, v in langs.items():
-            out += f"- {k}: {v} bytes\n"
-        return out
+        langs = prefetched("languages", repo_path)
+        return _format_languages(repo_path, langs if langs is not None else repo_metadata.get_languages(repo_path))
     except Exception as e:
         return f"Error saat mengambil bahasa repositori: {e}"
 
 
-import requests
-from urllib.parse import urlparse
-from langchain.tools import tool
-
-def _fetch_github_file(repo_path: str, file_path: str, branch="main"):
-    raw_url = f"https://raw.githubusercontent.com/{repo_path}/{branch}/{file_path}"
-    r = requests.get(raw_url, timeout=10)
-    return r.text if r.status_code == 200 else None
+@_async_impl(get_repo_languages)
+async def _aget_repo_languages(repo_url: str) -> str:
+    try:
+        repo_path = _normalize_repo_url(repo_url)
+        langs = await aprefetched("languages", repo_path)
+        return _format_languages(repo_path, langs if langs is not None else await repo_metadata.aget_languages(repo_path))
+    except Exception as e:
+        return f"Error saat mengambil bahasa repositori: {e}"
 
 
-def _list_all_files(repo_path: str, path: str = "", depth: int = 0, max_depth: int = 2):
-    if depth > max_depth:
-        return []
-    api_url = f"https://api.github.com/repos/{repo_path}/contents/{path}"
-    r = requests.get(api_url, headers=_github_api_headers(), timeout=15)
-    if r.status_code != 200:
+def _render_structure(tree, path: str = "", max_depth: int = 2) -> List[str]:
+    if tree is None:
         return []
-    items = r.json()
-    structure = []
-    for item in items:
-        if item["type"] == "dir":
-            structure.append(f"{'  ' * depth}📁 {item['path']}/")
-            structure += _list_all_files(repo_path, item["path"], depth + 1)
-        else:
-            structure.append(f"{'  ' * depth}📄 {item['path']}")
-    return structure
+    return tree.render(
+        path,
+        max_depth=max_depth,
+        max_lines=STRUCTURE_MAX_LINES,
+        max_entries_per_dir=STRUCTURE_MAX_ENTRIES_PER_DIR,
+    )
 
 
-def analyze_repository_structure_with_explanation(repo_url: str, llm) -> str:
+def _list_all_files(repo_path: str, path: str = "", max_depth: int = 2, branch: Optional[str] = None):
+    return _render_structure(_tree(repo_path, resolve_ref(repo_path, branch)), path, max_depth)
+
+
+async def _alist_all_files(repo_path: str, path: str = "", max_depth: int = 2, branch: Optional[str] = None):
+    return _render_structure(await _atree(repo_path, await aresolve_ref(repo_path, branch)), path, max_depth)
+
+
+def _repo_digest(repo_path: str, ref: str) -> str:
     """
-    Ambil struktur repo lengkap dan jelaskan isi tiap file penting menggunakan LLM dari agent.py.
+    Digest repo (file terpenting + outline simbol) untuk prompt struktur. Memakai snapshot
+    lokal bila bisa dibuat; bila tidak, hanya beberapa file teratas yang diambil lewat API.
     """
     try:
+        snap = snapshots.get(repo_path, ref, force=True)
+        if snap is not None:
+            digest = get_digest(repo_path, ref, snap.tree(), snap.read_text)
+        else:
+            tree = get_repo_tree(repo_path, ref)
+            if tree is None:
+                return ""
+
+            def read(path: str) -> Optional[str]:
+                status, text = _fetch_file(repo_path, path, ref)
+                return text if status == 200 else None
+
+            digest = get_digest(repo_path, ref, tree, read, max_read=DIGEST_FETCH_FILES, source="api")
+        return render_digest(digest)
+    except Exception as e:  # digest hanya pelengkap; analisis struktur tetap jalan tanpanya
+        print(f"Gagal membuat digest {repo_path}: {e}")
+        return ""
+
+
+def _digest_section(digest_text: str) -> str:
+    return f"""
+        File terpenting (diurutkan dari entry point, manifest, ukuran, dan jumlah file yang mengimpornya)
+        beserta kelas/fungsi utamanya:
+
+        {digest_text}
+        """ if digest_text else ""
+
+
+def _manifest_sections(manifests: List[tuple]) -> str:
+    return "\n\n".join(
+        f"--- {path} ---\n```\n{content[:MANIFEST_PROMPT_MAX_CHARS]}\n```" for path, content in manifests
+    )
+
+
+def _format_structure_analysis(structure_text: str, explanation: str) -> str:
+    return f"{structure_text}\n\n{STRUCTURE_EXPLANATION_MARKER}\n{explanation}"
 
-        repo_path = _normalize_repo_url(repo_url)
-        structure_lines = _list_all_files(repo_path)
-        structure_text = "\n".join(structure_lines[:40])
 
-        prompt = f"""
+def _format_dependencies_analysis(manifests: List[tuple], explanation: str) -> str:
+    found_files = ", ".join(path for path, _ in manifests)
+    return f"📦 File dependensi terdeteksi: {found_files}\n\n🧩 Penjelasan:\n{explanation}"
+
+
+def _structure_prompt(repo_path: str, structure_text: str, digest_text: str = "") -> str:
+    digest_section = _digest_section(digest_text)
+    return f"""
         Berikut adalah struktur file dari repositori GitHub {repo_path}:
 
         {structure_text}
-
+        {digest_section}
         Jelaskan secara singkat:
         1. Tujuan utama proyek berdasarkan struktur ini.
         2. Fungsi umum tiap file/folder utama.
-        3. Komponen penting yang tampak dari struktur tersebut.
+        3. Komponen penting yang tampak dari struktur tersebut (sebutkan file dan kelas/fungsi kuncinya).
+        """
+
+
+def _dependencies_prompt(repo_path: str, manifests: List[tuple]) -> str:
+    sections = _manifest_sections(manifests)
+    return f"""
+        Berikut adalah isi file dependensi pada repo {repo_path}:
+
+        {sections}
+
+        Tolong jelaskan:
+        1. Fungsi dari setiap dependensi.
+        2. Teknologi utama yang digunakan proyek ini.
+        3. Hubungan antar-dependensi (jika relevan).
         """
-        explanation = llm.invoke(prompt).content
 
-        return f"{structure_text}\n\n🧠 Penjelasan Struktur:\n{explanation}"
+
+def analyze_repository_structure_with_explanation(repo_url: str, llm) -> str:
+    """
+    Ambil struktur repo lengkap dan jelaskan isi tiap file penting menggunakan LLM dari agent.py.
+    """
+    try:
+        repo_path = _normalize_repo_url(repo_url)
+        structure_text = "\n".join(_list_all_files(repo_path))
+        digest_text = _repo_digest(repo_path, resolve_ref(repo_path))
+        explanation = llm.invoke(_structure_prompt(repo_path, structure_text, digest_text)).content
+
+        return _format_structure_analysis(structure_text, explanation)
+    except Exception as e:
+        return f"Error saat analisis struktur: {e}"
+
+
+async def aanalyze_repository_structure_with_explanation(repo_url: str, llm) -> str:
+    """Versi async dari analyze_repository_structure_with_explanation (llm.ainvoke)."""
+    try:
+        repo_path = _normalize_repo_url(repo_url)
+        structure_text = "\n".join(await _alist_all_files(repo_path))
+        digest_text = await asyncio.to_thread(_repo_digest, repo_path, await aresolve_ref(repo_path))
+        explanation = (await llm.ainvoke(_structure_prompt(repo_path, structure_text, digest_text))).content
+
+        return _format_structure_analysis(structure_text, explanation)
     except Exception as e:
         return f"Error saat analisis struktur: {e}"
 
 
 def analyze_dependencies_with_explanation(repo_url: str, llm) -> str:
     """
-    Ambil file dependensi (requirements.txt, pyproject.toml, package.json)
+    Ambil file dependensi yang ada di repo (ditemukan dari pohon repo, di-fetch paralel)
     dan jelaskan fungsinya menggunakan LLM dari agent.py.
     """
     try:
         repo_path = _normalize_repo_url(repo_url)
-        candidates = ["requirements.txt", "pyproject.toml", "package.json"]
-        found_file, content = None, None
+        manifests = _collect_manifests(repo_path)
+        if not manifests:
+            return NO_MANIFEST_MESSAGE
 
-        for f in candidates:
-            c = _fetch_github_file(repo_path, f)
-            if c:
-                found_file, content = f, c
-                break
-
-        if not content:
-            return "Tidak ditemukan file dependensi umum (requirements.txt, package.json, pyproject.toml, dll.)"
-
-        prompt = f"""
-        Berikut adalah isi dari file {found_file} pada repo {repo_path}:
+        explanation = llm.invoke(_dependencies_prompt(repo_path, manifests)).content
+        return _format_dependencies_analysis(manifests, explanation)
+    except Exception as e:
+        return f"Error saat analisis dependensi: {e}"
 
-        ```
-        {content}
-        ```
 
-        Tolong jelaskan:
-        1. Fungsi dari setiap dependensi.
-        2. Teknologi utama yang digunakan proyek ini.
-        3. Hubungan antar-dependensi (jika relevan).
-        """
-        explanation = llm.invoke(prompt).content
+async def aanalyze_dependencies_with_explanation(repo_url: str, llm) -> str:
+    """Versi async dari analyze_dependencies_with_explanation (llm.ainvoke)."""
+    try:
+        repo_path = _normalize_repo_url(repo_url)
+        manifests = await _acollect_manifests(repo_path)
+        if not manifests:
+            return NO_MANIFEST_MESSAGE
 
-        return f"📦 File dependensi terdeteksi: {found_file}\n\n🧩 Penjelasan:\n{explanation}"
+        explanation = (await llm.ainvoke(_dependencies_prompt(repo_path, manifests))).content
+        return _format_dependencies_analysis(manifests, explanation)
     except Exception as e:
         return f"Error saat analisis dependensi: {e}"
 
 
+# -------------------------
+# Prefetch per permintaan (core.prefetch): data yang hampir selalu dibutuhkan agent
+# -------------------------
+async def _prefetch_tree(repo_path: str):
+    ref = await aresolve_ref(repo_path)
+    return ref, await aget_repo_tree(repo_path, ref)
+
+
+async def _prefetch_readme(repo_path: str):
+    return await _afetch_readme(repo_path, await aresolve_ref(repo_path))
+
+
+register_prefetcher("metadata", repo_metadata.aget)
+register_prefetcher("tree", _prefetch_tree)
+register_prefetcher("readme", _prefetch_readme)
+register_prefetcher("languages", repo_metadata.aget_languages)
+
+
 # -------------------------
 # Export list of tools for agent
 # -------------------------
@@ -339,5 +864,13 @@ ALL_GITHUB_TOOLS = [
     analyze_dependencies,
     list_files_in_directory,
     read_file_content,
+    read_file_lines,
+    read_file_head_tail,
+    grep_in_file,
+    search_code,
     get_repo_languages,
 ]
+
+# Setiap panggilan tool (dari agent maupun langsung) tercatat sebagai span 'tool'
+for _tool in ALL_GITHUB_TOOLS:
+    _tool.callbacks = [tracing_callback]
@@ -0,0 +1,95 @@
+import asyncio
+import threading
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class KeyedLocks:
+    """
+    threading.Lock per key untuk jalur sync. Lock hanya disimpan selama ada pemegang atau
+    penunggu, jadi jumlah key yang pernah dipakai tidak menumpuk di proses yang berjalan lama.
+
+        with fill_locks.hold(key):
+            ...
+    """
+
+    def __init__(self):
+        self._guard = threading.Lock()
+        self._locks: Dict[Hashable, list] = {}  # key -> [lock, jumlah pemegang + penunggu]
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    @contextmanager
+    def hold(self, key: Hashable):
+        with self._guard:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._guard:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    self._locks.pop(key, None)
+
+
+class AsyncKeyedLocks:
+    """
+    asyncio.Lock per key, dipisah per event loop (asyncio.Lock tidak boleh dipakai lintas loop,
+    sedangkan jalur sync membuat loop baru lewat asyncio.run). Seperti KeyedLocks, lock dibuang
+    begitu tidak ada lagi yang memegang atau menunggunya.
+
+        async with fill_locks.get(key):
+            ...
+    """
+
+    def __init__(self):
+        self._per_loop: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, list]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def __len__(self) -> int:
+        return sum(len(locks) for locks in list(self._per_loop.values()))
+
+    @asynccontextmanager
+    async def get(self, key: Hashable):
+        locks = self._per_loop.setdefault(asyncio.get_running_loop(), {})
+        entry = locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                locks.pop(key, None)
+
+
+class SingleFlight:
+    """
+    Deduplikasi komputasi async yang sedang berjalan: pemanggil pertama untuk sebuah key
+    menjalankan fn(), pemanggil konkuren dengan key sama menunggu hasil yang sama.
+    Komputasi berjalan sebagai task tersendiri (di-shield), sehingga pembatalan/timeout
+    satu pemanggil tidak membatalkannya untuk pemanggil lain.
+    """
+
+    def __init__(self):
+        self._per_loop: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, asyncio.Task]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self.stats = {"leaders": 0, "shared": 0}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        calls = self._per_loop.setdefault(asyncio.get_running_loop(), {})
+        task = calls.get(key)
+        if task is None:
+            self.stats["leaders"] += 1
+            task = asyncio.ensure_future(fn())
+            calls[key] = task
+            task.add_done_callback(lambda t: calls.pop(key) if calls.get(key) is t else None)
+        else:
+            self.stats["shared"] += 1
+        return await asyncio.shield(task)
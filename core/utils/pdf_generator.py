@@ -1,79 +1,129 @@
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Preformatted, Spacer
 from reportlab.lib.units import inch
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfbase import pdfmetrics
 from reportlab.lib.fonts import addMapping
 from datetime import datetime
+from functools import lru_cache
+from xml.sax.saxutils import escape
+import io
 import os
+import uuid
+
+from core.report import REPORT_TITLE, Report
+from core.telemetry import traced
+
+# Naikkan versi bila tata letak laporan berubah (dipakai sebagai bagian key cache artefak)
+REPORT_TEMPLATE_VERSION = "3"
+
+# Blok preformatted (pohon direktori) dipecah per sekian baris: flowable kecil jauh lebih cepat
+# di-layout dan bisa pindah halaman dengan rapi
+PREFORMATTED_CHUNK_LINES = 60
+# Paragraf yang lebih panjang dari ini dipecah per baris agar tidak menjadi satu flowable raksasa
+PARAGRAPH_MAX_CHARS = 3000
 
 pdfmetrics.registerFont(TTFont("DejaVuSans", "assets/fonts/DejaVuSans.ttf"))
 addMapping("DejaVuSans", 0, 0, "DejaVuSans")
 
 
-def generate_pdf_report(
-    repo_url: str ,
-    summary_text: str ,
-    structure_text: str = None,
-    dependencies_text: str = None
-):
+@lru_cache(maxsize=1)
+def _styles() -> dict:
+    """Style laporan, dibuat sekali per proses."""
+    return {
+        "title": ParagraphStyle(
+            name="Title",
+            fontName="DejaVuSans",
+            fontSize=18,
+            alignment=TA_CENTER,
+            spaceAfter=20,
+            leading=22,
+        ),
+        "body": ParagraphStyle(
+            name="Body",
+            fontName="DejaVuSans",
+            fontSize=11,
+            leading=14,
+            spaceAfter=6,
+        ),
+        "pre": ParagraphStyle(
+            name="Pre",
+            fontName="DejaVuSans",
+            fontSize=8,
+            leading=10,
+        ),
+        "header": getSampleStyleSheet()["Heading2"],
+    }
+
+
+def _paragraphs(text: str, style) -> list:
+    """Teks biasa -> Paragraph per paragraf (di-escape; baris baru dipertahankan)."""
+    flowables = []
+    for block in text.split("\n\n"):
+        block = block.strip("\n")
+        if not block:
+            continue
+        pieces = [block] if len(block) <= PARAGRAPH_MAX_CHARS else block.splitlines()
+        for piece in pieces:
+            flowables.append(Paragraph(escape(piece).replace("\n", "<br/>"), style))
+    return flowables
+
+
+def _preformatted(text: str, style) -> list:
+    lines = text.splitlines()
+    return [
+        Preformatted("\n".join(lines[i:i + PREFORMATTED_CHUNK_LINES]), style)
+        for i in range(0, len(lines), PREFORMATTED_CHUNK_LINES)
+    ]
+
+
+@traced("pdf", "render_pdf_report")
+def render_pdf_report(report: Report) -> bytes:
     """
-    Membuat laporan PDF hasil analisis repository GitHub.
+    Render laporan PDF ke memori dari dokumen laporan bersama (core.report.build_report),
+    sama dengan yang dipakai untuk teks di chat.
     """
-    # Nama file output
-    filename = f"GitCortex_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-    output_dir = "outputs"
-    os.makedirs(output_dir, exist_ok=True)
-    filepath = os.path.join(output_dir, filename)
-
-    # Setup dokumen
-    doc = SimpleDocTemplate(filepath, pagesize=A4)
-    styles = getSampleStyleSheet()
-    story = []
-
-    # Gaya khusus
-    body_style = ParagraphStyle(
-    name="Body",
-    fontName="DejaVuSans",
-    fontSize=11,
-    leading=14,
-)
-
-    title_style = ParagraphStyle(
-        name="Title",
-        fontName="DejaVuSans",
-        fontSize=18,
-        alignment=TA_CENTER,
-        spaceAfter=20,
-        leading=22,
-    )
-
-    header_style = styles["Heading2"]
-
-    # Tambahkan konten
-    story.append(Paragraph("Git-Cortex Repository Analysis Report", title_style))
-    story.append(Paragraph(f"Repository URL: {repo_url}", body_style))
-    story.append(Spacer(1, 0.3 * inch))
-
-    # Ringkasan umum
-    story.append(Paragraph("1. Repository Summary", header_style))
-    story.append(Paragraph(summary_text, body_style))
-    story.append(Spacer(1, 0.2 * inch))
-
-    # Struktur repo
-    if structure_text:
-        story.append(Paragraph("2. Repository Structure", header_style))
-        story.append(Paragraph(f"<pre>{structure_text}</pre>", body_style))
+    styles = _styles()
+    story = [
+        Paragraph(escape(REPORT_TITLE), styles["title"]),
+        Paragraph(f"Repository URL: {escape(report.repo_url)}", styles["body"]),
+        Spacer(1, 0.3 * inch),
+    ]
+
+    # Ringkasan, struktur, dependensi
+    for section in report.sections:
+        story.append(Paragraph(escape(section.title), styles["header"]))
+        if section.preformatted:
+            story.extend(_preformatted(section.preformatted, styles["pre"]))
+            story.append(Spacer(1, 0.1 * inch))
+        if section.body:
+            story.extend(_paragraphs(section.body, styles["body"]))
         story.append(Spacer(1, 0.2 * inch))
 
-    # Dependency analysis
-    if dependencies_text:
-        story.append(Paragraph("3. Dependencies Analysis", header_style))
-        story.append(Paragraph(dependencies_text, body_style))
+    buffer = io.BytesIO()
+    SimpleDocTemplate(buffer, pagesize=A4).build(story)
+    return buffer.getvalue()
+
 
-    # Buat PDF
-    doc.build(story)
+def report_filename() -> str:
+    """Nama file unik (timestamp + id acak): render konkuren tidak saling menimpa."""
+    return f"GitCortex_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}.pdf"
 
+
+def save_pdf_report(data: bytes, output_dir: str = "outputs") -> str:
+    """Simpan PDF yang sudah dirender ke output_dir dan kembalikan path-nya (dipakai jalur CLI/sync)."""
+    os.makedirs(output_dir, exist_ok=True)
+    filepath = os.path.join(output_dir, report_filename())
+    with open(filepath, "wb") as f:
+        f.write(data)
     return filepath
+
+
+@traced("pdf", "generate_pdf_report")
+def generate_pdf_report(report: Report, output_dir: str = "outputs") -> str:
+    """
+    Membuat laporan PDF hasil analisis repository GitHub dan menyimpannya di output_dir.
+    """
+    return save_pdf_report(render_pdf_report(report), output_dir)
@@ -0,0 +1,185 @@
+# integrations/delivery.py
+import asyncio
+import io
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple
+
+import discord
+
+from core.report import Report
+from core.utils.pdf_generator import report_filename
+
+DISCORD_MESSAGE_LIMIT = 2000
+# Jawaban lebih panjang dari ini dikirim sebagai lampiran markdown (plus cuplikan di chat)
+DELIVERY_ATTACH_THRESHOLD = int(os.getenv("DELIVERY_ATTACH_THRESHOLD", "6000"))
+# Discord membatasi ~5 pesan per 5 detik per channel: kirim per batch lalu jeda
+DELIVERY_BATCH_SIZE = 5
+DELIVERY_BATCH_INTERVAL = float(os.getenv("DELIVERY_BATCH_INTERVAL", "5"))
+
+_FENCE_RE = re.compile(r"^\s*(```|~~~)")
+_LIST_ITEM_RE = re.compile(r"^\s*([-*]|\d+\.)\s")
+
+
+def _markdown_blocks(text: str) -> List[str]:
+    """Pecah teks menjadi blok markdown: paragraf (dipisah baris kosong) dan code block utuh."""
+    blocks, current, fence = [], [], None
+    for line in text.splitlines():
+        m = _FENCE_RE.match(line)
+        if fence is None and m:
+            if current:
+                blocks.append("\n".join(current))
+            current, fence = [line], m.group(1)
+            continue
+        if fence is not None:
+            current.append(line)
+            if line.strip().startswith(fence) and len(current) > 1:
+                blocks.append("\n".join(current))
+                current, fence = [], None
+            continue
+        if not line.strip():
+            if current:
+                blocks.append("\n".join(current))
+                current = []
+            continue
+        # heading atau item daftar memulai blok baru agar potongan jatuh di batas yang wajar
+        starts_list = _LIST_ITEM_RE.match(line) and not _LIST_ITEM_RE.match(current[-1]) if current else False
+        if current and (line.startswith("#") or starts_list):
+            blocks.append("\n".join(current))
+            current = []
+        current.append(line)
+    if current:
+        if fence is not None:
+            current.append(fence)  # code block tidak ditutup di teks asli
+        blocks.append("\n".join(current))
+    return blocks
+
+
+def _split_long_line(line: str, limit: int) -> List[str]:
+    pieces = []
+    while len(line) > limit:
+        cut = line.rfind(" ", 0, limit)
+        cut = cut if cut > limit // 2 else limit
+        pieces.append(line[:cut])
+        line = line[cut:].lstrip(" ")
+    return pieces + [line] if line else pieces
+
+
+def _split_block(block: str, limit: int) -> List[str]:
+    """Blok yang lebih panjang dari limit dipecah per baris; code block dibuka-tutup ulang di tiap potongan."""
+    lines = block.splitlines()
+    opener = lines[0] if _FENCE_RE.match(lines[0]) else None
+    if opener:
+        closer = _FENCE_RE.match(opener).group(1)
+        lines = lines[1:-1] if len(lines) > 1 and lines[-1].strip().startswith(closer) else lines[1:]
+        limit -= len(opener) + len(closer) + 2
+    pieces, current = [], ""
+    for line in lines:
+        for part in _split_long_line(line, limit):
+            if current and len(current) + 1 + len(part) > limit:
+                pieces.append(current)
+                current = part
+            else:
+                current = f"{current}\n{part}" if current else part
+    if current:
+        pieces.append(current)
+    if opener:
+        pieces = [f"{opener}\n{p}\n{closer}" for p in pieces]
+    return pieces
+
+
+def split_message(text: str, limit: int = DISCORD_MESSAGE_LIMIT) -> List[str]:
+    """
+    Pecah teks menjadi pesan <= limit karakter di batas markdown (paragraf, heading, daftar),
+    tanpa memotong code block di tengah tanpa menutupnya.
+    """
+    text = text.strip()
+    if len(text) <= limit:
+        return [text] if text else []
+    chunks, current = [], ""
+    for block in _markdown_blocks(text):
+        pieces = [block] if len(block) <= limit else _split_block(block, limit)
+        for piece in pieces:
+            if current and len(current) + 2 + len(piece) > limit:
+                chunks.append(current)
+                current = piece
+            else:
+                current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+@dataclass
+class DeliveryPlan:
+    """Pesan teks yang akan dikirim berurutan, plus lampiran (markdown laporan dan/atau PDF)."""
+    messages: List[str]
+    attachment_text: Optional[str] = None
+    attachment_name: str = "analisis.md"
+    files: List[Tuple[str, bytes]] = field(default_factory=list)  # (nama file, isi), mis. PDF dari memori
+
+
+def plan_delivery(answer: str, report: Optional[Report] = None, pdf: Optional[bytes] = None,
+                  attach_threshold: int = DELIVERY_ATTACH_THRESHOLD) -> DeliveryPlan:
+    """
+    Jawaban pendek dikirim sebagai satu/lebih pesan; jawaban di atas attach_threshold dikirim
+    sebagai cuplikan (pesan pertama) + lampiran markdown dari dokumen laporan yang sama dengan PDF.
+    """
+    messages = split_message(answer) or ["Tidak ada hasil analisis yang ditemukan."]
+    plan = DeliveryPlan(messages=messages, files=[(report_filename(), pdf)] if pdf else [])
+    if len(answer) > attach_threshold:
+        note = "\n\n-# Jawaban lengkap ada di lampiran."
+        plan.messages = [split_message(answer, DISCORD_MESSAGE_LIMIT - len(note))[0] + note]
+        plan.attachment_text = report.to_markdown() if report is not None else answer
+    return plan
+
+
+async def _send(channel, content: str, make_files: Optional[Callable[[], list]] = None) -> bool:
+    """
+    Kirim satu pesan; gagal tidak pernah dilempar ke pemanggil (hasil analisis tidak dibuang).
+    Lampiran dibuat ulang per percobaan karena discord.File ditutup setelah dikirim.
+    """
+    for attempt in range(2):
+        try:
+            if make_files is not None:
+                await channel.send(content=content, files=make_files())
+            else:
+                await channel.send(content=content)
+            return True
+        except discord.HTTPException as e:
+            print(f"Gagal mengirim pesan (percobaan {attempt + 1}): {e}")
+            if attempt == 0:
+                await asyncio.sleep(getattr(e, "retry_after", None) or 1)
+    return False
+
+
+async def deliver(channel, plan: DeliveryPlan, skip_first: bool = False,
+                  batch_size: int = DELIVERY_BATCH_SIZE, batch_interval: float = DELIVERY_BATCH_INTERVAL):
+    """
+    Kirim rencana pengiriman: pesan teks per batch (jeda di antara batch agar tidak kena rate
+    limit), lalu satu pesan berisi semua lampiran. skip_first=True bila pesan pertama sudah
+    tampil (mis. pesan progres yang diedit menjadi jawaban). Kembalikan jumlah pesan yang gagal.
+    """
+    failed, sent = 0, 0
+    for text in plan.messages[1 if skip_first else 0:]:
+        if sent and sent % batch_size == 0:
+            await asyncio.sleep(batch_interval)
+        if not await _send(channel, content=text):
+            failed += 1
+        sent += 1
+
+    def make_files():
+        files = [discord.File(io.BytesIO(data), filename=name) for name, data in plan.files]
+        if plan.attachment_text is not None:
+            data = io.BytesIO(plan.attachment_text.encode("utf-8"))
+            files.append(discord.File(data, filename=plan.attachment_name))
+        return files
+
+    if plan.files or plan.attachment_text is not None:
+        if sent and sent % batch_size == 0:
+            await asyncio.sleep(batch_interval)
+        content = "📄 Laporan analisis otomatis telah dibuat:" if plan.files else "📎 Jawaban lengkap:"
+        if not await _send(channel, content, make_files):
+            failed += 1
+    return failed
@@ -1,18 +1,49 @@
+import asyncio
 import os
 import discord
 from dotenv import load_dotenv
 from core.agent import create_agent_executor
-# from langchain.memory import ConversationBufferWindowMemory
-from langchain.memory import ConversationSummaryMemory
-from core.agent import run_agent_and_generate_pdf
+from core.agent import arun_report_pipeline, format_agent_input
+from core.tools import _normalize_repo_url
+from core.response_cache import canonical_question, response_cache
+from core.semantic_cache import semantic_cache
+from core.prefetch import prefetch_stats, start_prefetch
+from core.progress import ProgressReporter
+from core.sessions import SessionStore
+from core.telemetry import debug, metrics, span, start_metrics_server, start_span
+from integrations.delivery import deliver, plan_delivery
+from integrations.progress_message import ProgressMessage
+from integrations.scheduler import JobScheduler, QueueFullError
 # from core.agent import create_planning_agent
 import re
 
 
 load_dotenv()
 DISCORD_TOKEN = os.getenv("DISCORD_BOT_TOKEN")
-
-conversations = {}
+# Tampilkan progres (stage, tool, token LLM) dengan mengedit satu pesan selama analisis berjalan
+STREAM_PROGRESS = os.getenv("STREAM_PROGRESS", "1") == "1"
+
+# Satu executor + LLM untuk semua channel; per channel hanya riwayatnya yang disimpan.
+agent_executor = None
+sessions = SessionStore()
+# job_key -> ProgressReporter milik peminta yang job-nya sedang antre/berjalan (untuk peminta yang digabung)
+_job_progress = {}
+
+
+def get_agent_executor():
+    global agent_executor
+    if agent_executor is None:
+        agent_executor, llm = create_agent_executor(None)
+        sessions.llm = llm
+    return agent_executor
+
+scheduler = JobScheduler(
+    max_concurrency=int(os.getenv("ANALYZE_MAX_CONCURRENCY", "3")),
+    max_queue=int(os.getenv("ANALYZE_MAX_QUEUE", "200")),
+    max_queued_per_user=int(os.getenv("ANALYZE_MAX_QUEUED_PER_USER", "3")),
+)
+metrics.register_collector("scheduler", scheduler.metrics)
+metrics.register_collector("sessions", sessions.stats)
 
 intents = discord.Intents.default()
 intents.message_content = True
@@ -22,11 +53,35 @@ client = discord.Client(intents=intents)
 async def on_ready():
     print(f'Bot {client.user} telah online dan siap menganalisis! 🚀')
     print('---------------------------------------------------------')
+    start_metrics_server()
 
 @client.event
 async def on_message(message):
     if message.author == client.user:
         return
+
+    if message.content.strip() == '!queue':
+        m = scheduler.metrics()
+        await message.channel.send(
+            f"📊 Antrean: {m['queue_depth']} menunggu, {m['running']}/{m['max_concurrency']} berjalan. "
+            f"Rata-rata tunggu {m['wait_avg_s']:.1f}s (p95 {m['wait_p95_s']:.1f}s). "
+            f"Sesi channel aktif: {sessions.stats()['sessions']}."
+        )
+        return
+
+    if message.content.strip() == '!cache':
+        c = response_cache.stats()
+        s = semantic_cache.stats()
+        p = prefetch_stats()
+        await message.channel.send(
+            f"💾 Cache jawaban: hit ratio {c['hit_ratio']:.0%} "
+            f"({c['memory_hits']} memori, {c['db_hits']} database, {c['misses']} miss), "
+            f"hemat ~{c['latency_saved_s']:.0f}s waktu agent. "
+            f"Cache semantik: hit ratio {s['hit_ratio']:.0%} ({s['entries']} pertanyaan, threshold {s['threshold']:.2f}). "
+            f"Prefetch: {p['use_ratio']:.0%} data terpakai ({p['hits']} dibaca tool, {p['waited']} masih berjalan saat dibaca, "
+            f"{p['cancelled']} dibatalkan)."
+        )
+        return
     
     if client.user.mentioned_in(message) or message.content.startswith('!analyze'):
         
@@ -42,56 +97,117 @@ async def on_message(message):
         match = re.match(r'(https?://github\.com/[^\s]+)\s*(.*)', question)
         if match:
             repo_url = match.group(1).strip()
-            print(f"Repo URL diterima: {repo_url}")
+            debug(f"Repo URL diterima: {repo_url}")
             question = match.group(2).strip() or "Jelaskan tentang repositori ini."
-            print(f"Pertanyaan diterima: {question}")   
+            debug(f"Pertanyaan diterima: {question}")
         else:
             await message.channel.send("⚠️ Format salah. Harap tulis seperti:\n`!analyze https://github.com/user/repo Apa yang dilakukan proyek ini?`")
             return
 
 
         channel_id = message.channel.id
+        executor = get_agent_executor()
+        chat_history = sessions.history(channel_id)
+
+        # Pertanyaan lanjutan bergantung pada riwayat channel: hanya digabung dengan channel yang sama
+        job_key = (_normalize_repo_url(repo_url), canonical_question(question), channel_id if chat_history else None)
+        # root trace permintaan: antrean, pipeline (stage, iterasi agent, tool, LLM, PDF), pengiriman
+        request_span = start_span("request", "on_message", repo=job_key[0], channel=channel_id)
+        # metadata, tree, README, dan bahasa diambil sekarang, paralel dengan antrean dan LLM pertama;
+        # permintaan yang akan digabung ke job yang sudah ada tidak butuh prefetch sendiri
+        prefetch = start_prefetch(job_key[0]) if scheduler.position(job_key) is None else None
+        queue_message = None
+        queue_lock = asyncio.Lock()
+        progress = ProgressReporter(f"Menganalisis {job_key[0]}") if STREAM_PROGRESS else None
+        stream = ProgressMessage(message.channel, progress) if progress else None
+
+        async def on_position(pos):
+            nonlocal queue_message
+            text = f"⏳ Permintaan Anda ada di antrean (posisi {pos}). Mohon tunggu..."
+            if progress is not None:
+                progress.set_status(text)
+                return
+            async with queue_lock:
+                try:
+                    if queue_message is None:
+                        queue_message = await message.channel.send(text)
+                    else:
+                        await queue_message.edit(content=text)
+                except discord.HTTPException:
+                    pass
+
+        async def run_job():
+            # job dijalankan di task milik scheduler: sambungkan ke trace permintaan secara eksplisit
+            with span("job", "analyze", parent=request_span):
+                return await arun_report_pipeline(
+                    executor, repo_url, question, chat_history=chat_history, progress=progress, prefetch=prefetch
+                )
 
-        if channel_id not in conversations:
-            print(f"Membuat percakapan baru untuk channel ID: {channel_id}")
-            # memory = ConversationBufferWindowMemory(
-            #     k=3, 
-            #     memory_key="chat_history", 
-            #     return_messages=True
-            # )
-            agent_executor, llm = create_agent_executor(None)
-
-            memory = ConversationSummaryMemory(
-                llm=llm,
-                memory_key="chat_history",
-                return_messages=True
-            )
-            conversations[channel_id] = agent_executor
-
-        agent_executor = conversations[channel_id]
-
-        async with message.channel.typing():
-            try:
+        error = None
+        try:
+            if stream is not None:
+                await stream.start()
+            async with message.channel.typing():
                 # response = await client.loop.run_in_executor(
                 #     None, agent_executor.invoke, {"input": question}
                 # )
                 # answer = response.get('output', "Maaf, saya tidak bisa menemukan jawaban.")
                 # await message.channel.send(answer)
-                answer, pdf_path = await client.loop.run_in_executor(
-                    None, run_agent_and_generate_pdf, agent_executor, repo_url, question
+                if progress is not None:
+                    leader = _job_progress.get(job_key) if scheduler.position(job_key) is not None else None
+                    if leader is not None:
+                        leader.add_follower(progress)
+                    else:
+                        _job_progress[job_key] = progress
+                result = await scheduler.submit(
+                    job_key,
+                    run_job,
+                    guild_id=message.guild.id if message.guild else None,
+                    user_id=message.author.id,
+                    on_position=on_position,
                 )
-                print(f"answer for pdf", answer)
-                await message.channel.send(answer)
-
-                if pdf_path:
-                    await message.channel.send(
-                        content="📄 Laporan analisis otomatis telah dibuat:",
-                        file=discord.File(pdf_path)
-                    )
-
-
-            except Exception as e:
-                await message.channel.send(f"**Terjadi Error!**\nMaaf, saya gagal memproses. Error: {e}")
+                async with queue_lock:
+                    if queue_message is not None:
+                        try:
+                            await queue_message.delete()
+                        except discord.HTTPException:
+                            pass
+                answer = result.answer
+                debug("answer for pdf", answer)
+                sessions.add_turn(channel_id, format_agent_input(repo_url, question), answer)
+
+                # Pengiriman tidak pernah menjalankan ulang agent: kegagalan kirim hanya dicatat
+                plan = plan_delivery(answer, result.report, result.pdf)
+                shown = False
+                if stream is not None:
+                    # pesan progres berubah menjadi potongan pertama jawaban; sisanya dan PDF menyusul
+                    progress.set_answer(plan.messages[0])
+                    shown = await stream.close()
+                with span("delivery", "discord", parent=request_span, messages=len(plan.messages)) as s:
+                    failed = await deliver(message.channel, plan, skip_first=shown)
+                    s.set(failed=failed)
+                if failed:
+                    print(f"⚠️ {failed} pesan jawaban gagal dikirim ke channel {channel_id}")
+
+        except QueueFullError as e:
+            request_span.set(rejected=True)
+            error = e
+            if prefetch is not None:
+                prefetch.cancel()
+            if stream is not None:
+                await stream.delete()
+            await message.channel.send("⚠️ Antrean analisis sedang penuh atau Anda sudah memiliki beberapa permintaan yang menunggu. Coba lagi sebentar lagi.")
+        except Exception as e:
+            error = e
+            if stream is not None:
+                await stream.delete()
+            await message.channel.send(f"**Terjadi Error!**\nMaaf, saya gagal memproses. Error: {e}")
+        finally:
+            if progress is not None and _job_progress.get(job_key) is progress:
+                del _job_progress[job_key]
+            if prefetch is not None:
+                prefetch.close()
+            request_span.finish(error)
 
 if __name__ == "__main__":
     if not DISCORD_TOKEN:
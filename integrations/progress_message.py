@@ -0,0 +1,80 @@
+# integrations/progress_message.py
+import asyncio
+import os
+from typing import Optional
+
+import discord
+
+from core.progress import ProgressReporter
+
+# Jeda minimal antar edit pesan progres (Discord membatasi ~5 edit per 5 detik per channel)
+STREAM_EDIT_INTERVAL = float(os.getenv("STREAM_EDIT_INTERVAL", "1.5"))
+DISCORD_MESSAGE_LIMIT = 2000
+
+
+def _clip(text: str) -> str:
+    if len(text) <= DISCORD_MESSAGE_LIMIT:
+        return text
+    return text[: DISCORD_MESSAGE_LIMIT - 4] + " ..."
+
+
+class ProgressMessage:
+    """
+    Satu pesan Discord yang terus diedit mengikuti ProgressReporter. Pembaruan yang datang
+    lebih cepat dari interval digabung: hanya status terbaru yang dikirim pada edit berikutnya.
+    """
+
+    def __init__(self, channel, reporter: ProgressReporter, interval: float = STREAM_EDIT_INTERVAL):
+        self.channel = channel
+        self.reporter = reporter
+        self.interval = interval
+        self.message: Optional[discord.Message] = None
+        self._task: Optional[asyncio.Task] = None
+        self._last = None
+
+    async def start(self):
+        """Kirim pesan awal segera, lalu edit di background setiap ada perubahan."""
+        self._last = _clip(self.reporter.render())
+        try:
+            self.message = await self.channel.send(self._last)
+        except discord.HTTPException as e:
+            print(f"Gagal mengirim pesan progres: {e}")
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await self.reporter.wait()
+            content = _clip(self.reporter.render())
+            if content != self._last:
+                try:
+                    await self.message.edit(content=content)
+                    self._last = content
+                except discord.HTTPException as e:
+                    print(f"Gagal mengedit pesan progres: {e}")
+            if self.reporter.done:
+                return
+            await asyncio.sleep(self.interval)
+
+    async def close(self) -> bool:
+        """
+        Tandai run selesai dan tunggu edit terakhir (isi akhir = jawaban).
+        Kembalikan True bila isi akhir benar-benar tampil di pesan.
+        """
+        self.reporter.finish()
+        if self._task is None:
+            return False
+        try:
+            await asyncio.wait_for(self._task, timeout=self.interval + 10)
+        except (asyncio.TimeoutError, discord.HTTPException):
+            self._task.cancel()
+        return self._last == _clip(self.reporter.render())
+
+    async def delete(self):
+        if self._task is not None:
+            self._task.cancel()
+        if self.message is not None:
+            try:
+                await self.message.delete()
+            except discord.HTTPException:
+                pass
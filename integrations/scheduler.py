@@ -0,0 +1,213 @@
+# integrations/scheduler.py
+import asyncio
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List, Optional, Set
+
+WAIT_SAMPLES = 500  # jumlah sampel waktu tunggu terakhir untuk metrik
+
+
+class QueueFullError(Exception):
+    """Dilempar saat antrean global atau kuota antrean per pengguna sudah penuh."""
+
+
+class JobCancelledError(Exception):
+    """Diterima semua peminta job bila task job dibatalkan sebelum selesai."""
+
+
+@dataclass
+class Job:
+    key: Hashable
+    guild_id: Optional[int]
+    user_id: Optional[int]
+    factory: Callable[[], Awaitable[Any]]
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+    started_at: Optional[float] = None
+    waiters: int = 1
+    position_callbacks: List[Callable[[int], Awaitable[None]]] = field(default_factory=list)
+    last_position: Optional[int] = None
+
+
+class JobScheduler:
+    """
+    Admission control untuk permintaan !analyze:
+    - batas konkurensi global (max_concurrency job berjalan bersamaan),
+    - antrean adil dua tingkat: round-robin antar guild, lalu antar user di dalam guild,
+    - job identik (key sama) yang masih antre/berjalan digabung (coalescing): semua peminta
+      menunggu satu hasil yang sama,
+    - callback posisi antrean dan metrik (kedalaman antrean, waktu tunggu).
+    """
+
+    def __init__(self, max_concurrency: int = 3, max_queue: int = 200, max_queued_per_user: int = 3):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_queued_per_user = max_queued_per_user
+
+        # guild -> user -> deque[Job]; urutan OrderedDict = giliran round-robin berikutnya
+        self._queues: "OrderedDict[Any, OrderedDict[Any, Deque[Job]]]" = OrderedDict()
+        self._inflight: Dict[Hashable, Job] = {}
+        self._running = 0
+        # referensi task latar (job, callback posisi) agar tidak di-GC saat masih berjalan
+        self._tasks: Set[asyncio.Task] = set()
+        self._wait_times: Deque[float] = deque(maxlen=WAIT_SAMPLES)
+        self._counters = {"submitted": 0, "coalesced": 0, "completed": 0, "failed": 0, "cancelled": 0, "rejected": 0}
+
+    # -------------------------
+    # Antrean
+    # -------------------------
+    def _queued_jobs(self) -> List[Job]:
+        """Urutan dispatch yang akan terjadi (simulasi round-robin tanpa mengubah antrean)."""
+        guilds = [[deque(q) for q in users.values()] for users in self._queues.values()]
+        order = []
+        while guilds:
+            next_round = []
+            for users in guilds:
+                job_q = users.pop(0)
+                order.append(job_q.popleft())
+                if job_q:
+                    users.append(job_q)
+                if users:
+                    next_round.append(users)
+            guilds = next_round
+        return order
+
+    def queue_depth(self) -> int:
+        return sum(len(q) for users in self._queues.values() for q in users.values())
+
+    def position(self, key: Hashable) -> Optional[int]:
+        """Posisi (1-based) job di antrean, 0 bila sedang berjalan, None bila tidak ada."""
+        job = self._inflight.get(key)
+        if job is None:
+            return None
+        if job.started_at is not None:
+            return 0
+        for i, queued in enumerate(self._queued_jobs(), start=1):
+            if queued is job:
+                return i
+        return None
+
+    def _pop_next(self) -> Optional[Job]:
+        if not self._queues:
+            return None
+        guild_id, users = next(iter(self._queues.items()))
+        user_id, job_q = next(iter(users.items()))
+        job = job_q.popleft()
+
+        # giliran berikutnya: user dan guild ini pindah ke belakang
+        users.pop(user_id)
+        if job_q:
+            users[user_id] = job_q
+        self._queues.pop(guild_id)
+        if users:
+            self._queues[guild_id] = users
+        return job
+
+    def _user_queued(self, guild_id, user_id) -> int:
+        return len(self._queues.get(guild_id, {}).get(user_id, ()))
+
+    # -------------------------
+    # Eksekusi
+    # -------------------------
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def _notify_positions(self):
+        for pos, job in enumerate(self._queued_jobs(), start=1):
+            if job.last_position != pos:
+                job.last_position = pos
+                for cb in job.position_callbacks:
+                    self._spawn(cb(pos))
+
+    def _pump(self):
+        while self._running < self.max_concurrency:
+            job = self._pop_next()
+            if job is None:
+                break
+            self._running += 1
+            job.started_at = time.monotonic()
+            self._wait_times.append(job.started_at - job.enqueued_at)
+            self._spawn(self._run(job))
+        self._notify_positions()
+
+    async def _run(self, job: Job):
+        try:
+            result = await job.factory()
+        except Exception as e:
+            self._counters["failed"] += 1
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            self._counters["completed"] += 1
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            # CancelledError tidak tertangkap di atas: peminta yang menunggu future tidak boleh menggantung
+            if not job.future.done():
+                self._counters["cancelled"] += 1
+                job.future.set_exception(JobCancelledError("Analisis dibatalkan sebelum selesai."))
+            self._running -= 1
+            self._inflight.pop(job.key, None)
+            self._pump()
+
+    async def submit(
+        self,
+        key: Hashable,
+        factory: Callable[[], Awaitable[Any]],
+        guild_id: Optional[int] = None,
+        user_id: Optional[int] = None,
+        on_position: Optional[Callable[[int], Awaitable[None]]] = None,
+    ) -> Any:
+        """
+        Masukkan job ke antrean dan tunggu hasilnya.
+        Bila job dengan key yang sama sudah antre/berjalan, tunggu hasil job itu saja.
+        on_position(pos) dipanggil setiap kali posisi antrean job berubah (pos >= 1).
+        """
+        self._counters["submitted"] += 1
+        job = self._inflight.get(key)
+        if job is not None:
+            self._counters["coalesced"] += 1
+            job.waiters += 1
+            if on_position is not None and job.started_at is None:
+                job.position_callbacks.append(on_position)
+                if job.last_position:
+                    self._spawn(on_position(job.last_position))
+            return await asyncio.shield(job.future)
+
+        if self.queue_depth() >= self.max_queue or self._user_queued(guild_id, user_id) >= self.max_queued_per_user:
+            self._counters["rejected"] += 1
+            raise QueueFullError("Antrean analisis sedang penuh.")
+
+        job = Job(key, guild_id, user_id, factory, asyncio.get_running_loop().create_future())
+        if on_position is not None:
+            job.position_callbacks.append(on_position)
+        self._inflight[key] = job
+        self._queues.setdefault(guild_id, OrderedDict()).setdefault(user_id, deque()).append(job)
+        self._pump()
+        return await asyncio.shield(job.future)
+
+    # -------------------------
+    # Metrik
+    # -------------------------
+    def metrics(self) -> dict:
+        waits = sorted(self._wait_times)
+
+        def pct(p):
+            if not waits:
+                return 0.0
+            return waits[min(len(waits) - 1, int(p * len(waits)))]
+
+        return {
+            "queue_depth": self.queue_depth(),
+            "running": self._running,
+            "max_concurrency": self.max_concurrency,
+            "wait_avg_s": sum(waits) / len(waits) if waits else 0.0,
+            "wait_p50_s": pct(0.50),
+            "wait_p95_s": pct(0.95),
+            "wait_max_s": waits[-1] if waits else 0.0,
+            **self._counters,
+        }
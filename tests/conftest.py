@@ -0,0 +1,6 @@
+# tests/conftest.py
+import os
+import sys
+
+# modul core/ dan integrations/ diimpor dari root repo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
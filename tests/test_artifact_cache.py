@@ -0,0 +1,82 @@
+# tests/test_artifact_cache.py
+import os
+
+import pytest
+
+from core import artifact_cache as ac
+from core.repo_meta import repo_metadata
+
+REPO = "owner/artifact-demo"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ac.ArtifactCache(root=str(tmp_path / "artifacts"))
+
+
+def _key(sha: str, kind: str = "structure") -> str:
+    return ac.artifact_key(REPO, sha, kind, "v1", "model-a")
+
+
+def test_key_changes_with_every_component():
+    base = ac.artifact_key(REPO, "sha1", "structure", "v1", "model-a")
+    assert base == _key("sha1")
+    variants = [
+        ac.artifact_key(REPO, "sha2", "structure", "v1", "model-a"),
+        ac.artifact_key(REPO, "sha1", "dependencies", "v1", "model-a"),
+        ac.artifact_key(REPO, "sha1", "structure", "v2", "model-a"),
+        ac.artifact_key(REPO, "sha1", "structure", "v1", "model-b"),
+    ]
+    assert base not in variants and len(set(variants)) == len(variants)
+
+
+def test_text_and_bytes_roundtrip_survive_restart(cache):
+    cache.put_text(_key("sha1"), "penjelasan struktur", REPO, "sha1")
+    cache.put_bytes(_key("sha1", "pdf"), b"%PDF-1.4 data", ".pdf", REPO, "sha1")
+
+    reopened = ac.ArtifactCache(root=cache.root)
+    assert reopened.get_text(_key("sha1")) == "penjelasan struktur"
+    assert reopened.get_bytes(_key("sha1", "pdf")) == b"%PDF-1.4 data"
+    assert reopened.get_text(_key("sha2")) is None
+    assert (reopened.stats()["hits"], reopened.stats()["misses"]) == (2, 1)
+
+
+def test_lru_eviction_by_entries_and_bytes(tmp_path):
+    cache = ac.ArtifactCache(root=str(tmp_path / "a"), max_entries=2)
+    for kind in ("a", "b"):
+        cache.put_text(_key("sha1", kind), kind, REPO, "sha1")
+    cache.get_text(_key("sha1", "a"))  # "a" jadi yang terbaru dipakai
+    cache.put_text(_key("sha1", "c"), "c", REPO, "sha1")
+
+    assert cache.get_text(_key("sha1", "b")) is None
+    assert cache.get_text(_key("sha1", "a")) == "a"
+    assert not os.path.exists(os.path.join(cache.root, f"{_key('sha1', 'b')}.txt"))
+
+    small = ac.ArtifactCache(root=str(tmp_path / "b"), max_bytes=10)
+    small.put_text(_key("sha1", "a"), "x" * 6, REPO, "sha1")
+    small.put_text(_key("sha1", "b"), "y" * 6, REPO, "sha1")
+    stats = small.stats()
+    assert (stats["entries"], stats["bytes"], stats["evictions"]) == (1, 6, 1)
+
+
+def test_file_removed_behind_the_cache_is_a_miss(cache):
+    cache.put_text(_key("sha1"), "teks", REPO, "sha1")
+    os.remove(os.path.join(cache.root, f"{_key('sha1')}.txt"))
+
+    assert cache.get_text(_key("sha1")) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_artifacts_of_old_sha_are_dropped_when_head_moves(cache, monkeypatch):
+    monkeypatch.setattr(ac, "artifact_cache", cache)
+    cache.put_text(_key("sha1"), "lama", REPO, "sha1")
+    cache.put_text(ac.artifact_key("owner/other", "sha1", "structure", "v1", "model-a"), "lain", "owner/other", "sha1")
+
+    first = repo_metadata._store(REPO, None, {"default_branch": "main", "pushed_at": "t1"}, "sha1")
+    try:
+        repo_metadata._store(REPO, first, {"default_branch": "main", "pushed_at": "t2"}, "sha2")
+    finally:
+        repo_metadata.invalidate(REPO)
+
+    assert cache.get_text(_key("sha1")) is None
+    assert cache.stats()["entries"] == 1  # repo lain tidak ikut dibuang
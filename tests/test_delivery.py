@@ -0,0 +1,75 @@
+# tests/test_delivery.py
+from integrations.delivery import plan_delivery, split_message
+
+LIMIT = 200
+
+
+def _fences_balanced(chunk: str) -> bool:
+    return sum(1 for line in chunk.splitlines() if line.strip().startswith("```")) % 2 == 0
+
+
+def test_short_text_is_one_message():
+    assert split_message("  halo  ") == ["halo"]
+    assert split_message("   ") == []
+
+
+def test_splits_on_paragraph_boundaries():
+    paragraphs = [f"Paragraf {i} " + "kata " * 15 for i in range(6)]
+    chunks = split_message("\n\n".join(paragraphs), LIMIT)
+
+    assert len(chunks) > 1
+    assert all(len(c) <= LIMIT for c in chunks)
+    # tidak ada paragraf yang terpotong di tengah
+    assert [p.strip() for c in chunks for p in c.split("\n\n")] == [p.strip() for p in paragraphs]
+
+
+def test_long_code_block_is_reopened_and_closed_in_every_chunk():
+    code = "\n".join(f"print('baris {i}')" for i in range(40))
+    text = f"Contoh:\n\n```python\n{code}\n```\n\nSelesai."
+    chunks = split_message(text, LIMIT)
+
+    assert all(len(c) <= LIMIT for c in chunks)
+    assert all(_fences_balanced(c) for c in chunks)
+    code_chunks = [c for c in chunks if "print(" in c]
+    assert len(code_chunks) > 1
+    for chunk in code_chunks:
+        block = chunk[chunk.index("```python"):]
+        assert block.startswith("```python\n") and block.endswith("\n```")
+    body = [line for c in code_chunks for line in c.splitlines() if line.startswith("print(")]
+    assert body == code.splitlines()
+
+
+def test_unclosed_code_block_is_closed():
+    chunks = split_message("Kode:\n\n```\n" + "x = 1\n" * 60, LIMIT)
+    assert all(_fences_balanced(c) for c in chunks)
+
+
+def test_over_long_line_is_cut_to_the_limit():
+    line = "a" * (LIMIT * 3 + 17)
+    chunks = split_message(line, LIMIT)
+    assert all(len(c) <= LIMIT for c in chunks)
+    assert "".join(chunks) == line
+
+    words = " ".join(["kata"] * 150)
+    chunks = split_message(words, LIMIT)
+    assert all(len(c) <= LIMIT for c in chunks)
+    assert " ".join(chunks).split() == words.split()  # dipotong di spasi, bukan di tengah kata
+
+
+def test_over_long_line_inside_code_block_stays_fenced():
+    chunks = split_message("```\n" + "y" * (LIMIT * 2) + "\n```", LIMIT)
+    assert len(chunks) > 1
+    assert all(len(c) <= LIMIT and c.startswith("```\n") and c.endswith("\n```") for c in chunks)
+
+
+def test_plan_attaches_pdf_and_long_answers():
+    plan = plan_delivery("jawaban singkat", pdf=b"%PDF-1.4")
+    assert plan.messages == ["jawaban singkat"]
+    assert plan.files and plan.files[0][0].endswith(".pdf") and plan.files[0][1] == b"%PDF-1.4"
+    assert plan.attachment_text is None
+
+    long_answer = "paragraf panjang. " * 500
+    plan = plan_delivery(long_answer, attach_threshold=1000)
+    assert len(plan.messages) == 1 and plan.messages[0].endswith("Jawaban lengkap ada di lampiran.")
+    assert plan.attachment_text == long_answer
+    assert plan.files == []
@@ -0,0 +1,137 @@
+# tests/test_github_client.py
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from core.github_client import AsyncGitHubClient, GitHubClient
+
+ETAG = '"v1"'
+BODY = b'{"name": "demo"}'
+
+
+class _StubServer(ThreadingHTTPServer):
+    """Server HTTP lokal yang mencatat jumlah koneksi TCP yang diterima dan request per path."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _StubHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = []
+        self.failures = {}  # path -> jumlah respons 503 sebelum 200
+
+    def get_request(self):
+        conn = super().get_request()
+        with self.lock:
+            self.connections += 1
+        return conn
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body: bytes = b"", headers: dict = None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, self.headers.get("If-None-Match")))
+            failures = server.failures.get(self.path, 0)
+            if failures:
+                server.failures[self.path] = failures - 1
+        if failures:
+            self._send(503)
+        elif self.headers.get("If-None-Match") == ETAG:
+            self._send(304, headers={"ETag": ETAG})
+        else:
+            self._send(200, BODY, {"ETag": ETAG, "Content-Type": "application/json"})
+
+
+@pytest.fixture
+def server():
+    srv = _StubServer()
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def _url(server, path: str) -> str:
+    return f"http://127.0.0.1:{server.server_address[1]}{path}"
+
+
+# -------------------------
+# Client sync
+# -------------------------
+def test_sync_client_reuses_connection(server):
+    client = GitHubClient()
+    for i in range(5):
+        assert client.get(_url(server, f"/repos/o/r/{i}")).status_code == 200
+    assert len(server.requests) == 5
+    assert server.connections == 1
+
+
+def test_sync_client_revalidates_with_etag(server):
+    client = GitHubClient()
+    first = client.get(_url(server, "/repos/o/r"))
+    second = client.get(_url(server, "/repos/o/r"))
+
+    assert [inm for _, inm in server.requests] == [None, ETAG]
+    assert first.status_code == second.status_code == 200
+    assert second.content == BODY and second.json() == {"name": "demo"}
+    assert second.revalidated is True
+    assert client.stats["revalidated"] == 1
+
+
+def test_sync_client_retries_server_errors(server):
+    server.failures["/flaky"] = 2
+    client = GitHubClient(backoff_base=0, backoff_cap=0)
+    r = client.get(_url(server, "/flaky"))
+
+    assert r.status_code == 200
+    assert client.stats["retries"] == 2
+    assert server.connections == 1
+
+
+# -------------------------
+# Client async
+# -------------------------
+def test_async_client_reuses_connection(server):
+    async def run():
+        client = AsyncGitHubClient()
+        try:
+            return [(await client.get(_url(server, f"/repos/o/r/{i}"))).status_code for i in range(5)]
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(run()) == [200] * 5
+    assert server.connections == 1
+
+
+def test_async_client_revalidates_with_etag(server):
+    async def run():
+        client = AsyncGitHubClient()
+        try:
+            return await client.get(_url(server, "/repos/o/r")), await client.get(_url(server, "/repos/o/r")), client
+        finally:
+            await client.aclose()
+
+    first, second, client = asyncio.run(run())
+    assert [inm for _, inm in server.requests] == [None, ETAG]
+    assert first.status_code == second.status_code == 200
+    assert second.json() == {"name": "demo"} and second.revalidated is True
+    assert client.stats["revalidated"] == 1
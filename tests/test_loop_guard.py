@@ -0,0 +1,99 @@
+# tests/test_loop_guard.py
+import asyncio
+
+from langchain.agents.output_parsers import ReActJsonSingleInputOutputParser
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda
+from langchain_core.tools import tool
+
+from core.loop_guard import GuardedAgentExecutor, RunGuard, action_key, current_run_guard
+
+CALLS = []
+
+
+@tool
+def lookup(name: str) -> str:
+    """Cari sesuatu berdasarkan nama."""
+    CALLS.append(name)
+    return f"hasil untuk {name}"
+
+
+def _action(name: str) -> str:
+    return (
+        "Thought: perlu data\nAction:\n```json\n"
+        f'{{"action": "lookup", "action_input": {{"name": "{name}"}}}}\n```'
+    )
+
+
+def _executor(replies):
+    CALLS.clear()
+    llm = GenericFakeChatModel(messages=iter([AIMessage(content=r) for r in replies]))
+    agent = (
+        RunnableLambda(lambda x: {"input": x["input"]})
+        | ChatPromptTemplate.from_messages([("user", "{input}")])
+        | llm
+        | ReActJsonSingleInputOutputParser()
+    )
+    return GuardedAgentExecutor(agent=agent, tools=[lookup], handle_parsing_errors=True, max_iterations=10)
+
+
+def _run(executor, use_async=False):
+    guard = RunGuard(max_wasted=2)
+
+    async def arun():
+        token = current_run_guard.set(guard)
+        try:
+            return await executor.ainvoke({"input": "apa ini"})
+        finally:
+            current_run_guard.reset(token)
+
+    if use_async:
+        return asyncio.run(arun())["output"], guard
+    token = current_run_guard.set(guard)
+    try:
+        return executor.invoke({"input": "apa ini"})["output"], guard
+    finally:
+        current_run_guard.reset(token)
+
+
+def test_action_key_normalizes_equivalent_arguments():
+    a = action_key("read_file_lines", {"repo_url": "https://github.com/O/R.git", "file_path": "./src//a.py",
+                                       "start_line": "10", "branch": None})
+    b = action_key("read_file_lines", {"repo_url": "o/r", "file_path": "src/a.py", "start_line": 10})
+    assert a == b
+    assert action_key("list_files_in_directory", {"repo_url": "o/r", "path": "/"}) == \
+        action_key("list_files_in_directory", {"repo_url": "o/r"})
+    assert a != action_key("read_file_lines", {"repo_url": "o/r", "file_path": "src/b.py", "start_line": 10})
+
+
+def test_repeated_action_is_served_from_memo():
+    executor = _executor([_action("x"), _action("x"), _action("y"), "Thought: cukup\nFinal Answer: selesai"])
+    output, guard = _run(executor)
+
+    assert output == "selesai"
+    assert CALLS == ["x", "y"]
+    assert guard.stats() == {
+        "iterations": 4, "memo_hits": 1, "wasted_iterations": 1, "wasted_tokens": 0, "forced_answer": False,
+    }
+
+
+def test_loop_is_broken_with_forced_answer():
+    replies = [_action("x")] * 3 + ["Thought: sudah cukup\nFinal Answer: jawaban paksa"]
+    output, guard = _run(_executor(replies), use_async=True)
+
+    assert output == "jawaban paksa"
+    assert CALLS == ["x"]
+    stats = guard.stats()
+    assert stats["forced_answer"] is True
+    assert (stats["iterations"], stats["wasted_iterations"], stats["memo_hits"]) == (4, 2, 2)
+
+
+def test_unparsable_forced_answer_falls_back_to_observations():
+    replies = [_action("x")] * 3 + ["masih tanpa format"]
+    output, guard = _run(_executor(replies))
+
+    assert output.startswith("Agent berhenti karena mengulang langkah yang sama.")
+    assert "hasil untuk x" in output and "[Catatan" not in output
+    assert guard.forced is True
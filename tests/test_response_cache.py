@@ -0,0 +1,82 @@
+# tests/test_response_cache.py
+import asyncio
+import json
+
+import pytest
+
+from core import agent, response_cache as rc
+from core.database import MemoryBackend, QueryCache, _hash_query
+from core.semantic_cache import SemanticCache
+
+REPO = "/tmp/repos/owner_demo"
+SHA = "a" * 40
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = QueryCache(MemoryBackend())
+    monkeypatch.setattr(rc, "query_cache", store)
+    return store
+
+
+def test_canonical_question_ignores_case_spacing_and_punctuation():
+    assert rc.canonical_question("  Apa  fungsi repo ini?? ") == "apa fungsi repo ini"
+
+
+def test_memory_then_db_hit(store):
+    rc.ResponseCache().put(REPO, SHA, "Apa fungsi repo ini?", "jawaban", elapsed=3.0)
+    fresh = rc.ResponseCache()  # memori kosong, seperti setelah restart
+
+    assert fresh.get(REPO, SHA, "apa fungsi repo ini") == "jawaban"
+    assert fresh.get(REPO, SHA, "apa fungsi repo ini") == "jawaban"
+    stats = fresh.stats()
+    assert (stats["db_hits"], stats["memory_hits"]) == (1, 1)
+
+
+def test_new_sha_misses(store):
+    cache = rc.ResponseCache()
+    cache.put(REPO, SHA, "apa fungsi repo ini", "jawaban")
+    assert cache.get(REPO, "b" * 40, "apa fungsi repo ini") is None
+    assert cache.get(REPO, None, "apa fungsi repo ini") is None
+
+
+def test_expired_db_row_is_ignored_before_sweep(store):
+    key = _hash_query(rc.response_query(REPO, SHA, "apa fungsi repo ini"))
+    old = {"answer": "basi", "elapsed": 1.0, "created_at": 0.0}
+    store.put(key, "q", json.dumps(old))
+    legacy = {"answer": "tanpa created_at"}
+    legacy_key = _hash_query(rc.response_query(REPO, SHA, "bahasa apa"))
+    store.put(legacy_key, "q", json.dumps(legacy))
+
+    cache = rc.ResponseCache(ttl=60)
+    assert cache.get(REPO, SHA, "apa fungsi repo ini") is None
+    assert cache.get(REPO, SHA, "bahasa apa") is None
+    assert cache.stats()["misses"] == 2
+
+
+class _FakeExecutor:
+    def __init__(self):
+        self.calls = []
+
+    async def ainvoke(self, inputs, config=None):
+        self.calls.append(inputs)
+        return {"output": f"jawaban #{len(self.calls)}"}
+
+
+def test_agent_skips_caches_with_chat_history(store, monkeypatch):
+    monkeypatch.setattr(agent, "response_cache", rc.ResponseCache())
+    monkeypatch.setattr(agent, "semantic_cache", SemanticCache())
+    executor = _FakeExecutor()
+
+    async def ask(history):
+        response = await agent._aagent_answer(executor, "input", (REPO, SHA), "jelaskan lebih detail", history)
+        return response["output"]
+
+    assert asyncio.run(ask(None)) == "jawaban #1"
+    assert asyncio.run(ask(None)) == "jawaban #1"  # dari cache
+    history = [("human", "apa fungsi repo ini"), ("ai", "...")]
+    assert asyncio.run(ask(history)) == "jawaban #2"
+    assert asyncio.run(ask(history)) == "jawaban #3"
+    # jawaban yang bergantung pada riwayat tidak ikut disimpan
+    assert asyncio.run(ask(None)) == "jawaban #1"
+    assert len(executor.calls) == 3
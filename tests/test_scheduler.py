@@ -0,0 +1,106 @@
+# tests/test_scheduler.py
+import asyncio
+
+import pytest
+
+from integrations.scheduler import JobCancelledError, JobScheduler, QueueFullError
+
+
+class _Jobs:
+    """Factory job yang mencatat urutan mulai dan bisa ditahan sampai release()."""
+
+    def __init__(self):
+        self.started = []
+        self.gate = asyncio.Event()
+
+    def factory(self, name):
+        async def run():
+            self.started.append(name)
+            await self.gate.wait()
+            return f"hasil {name}"
+        return run
+
+    def release(self):
+        self.gate.set()
+
+
+async def _submit(scheduler, jobs, name, guild, user, **kwargs):
+    task = asyncio.create_task(scheduler.submit(name, jobs.factory(name), guild, user, **kwargs))
+    await asyncio.sleep(0)  # biarkan submit masuk antrean sesuai urutan
+    return task
+
+
+def test_round_robin_across_guilds_then_users():
+    async def run():
+        scheduler, jobs = JobScheduler(max_concurrency=1), _Jobs()
+        tasks = [
+            await _submit(scheduler, jobs, "a1", "A", 1),
+            await _submit(scheduler, jobs, "a2", "A", 1),
+            await _submit(scheduler, jobs, "a3", "A", 1),
+            await _submit(scheduler, jobs, "b1", "A", 2),
+            await _submit(scheduler, jobs, "c1", "B", 3),
+        ]
+        positions = {name: scheduler.position(name) for name in ("a1", "a2", "c1", "b1", "a3")}
+        jobs.release()
+        results = await asyncio.gather(*tasks)
+        return jobs.started, positions, results
+
+    started, positions, results = asyncio.run(run())
+    assert started == ["a1", "a2", "c1", "b1", "a3"]
+    assert positions == {"a1": 0, "a2": 1, "c1": 2, "b1": 3, "a3": 4}
+    assert results == ["hasil a1", "hasil a2", "hasil a3", "hasil b1", "hasil c1"]
+
+
+def test_identical_jobs_are_coalesced():
+    async def run():
+        scheduler, jobs = JobScheduler(max_concurrency=1), _Jobs()
+        await _submit(scheduler, jobs, "blocker", "A", 1)
+        seen = []
+
+        async def on_position(pos):
+            seen.append(pos)
+
+        first = await _submit(scheduler, jobs, "same", "A", 2)
+        second = await _submit(scheduler, jobs, "same", "B", 3, on_position=on_position)
+        await asyncio.sleep(0)
+        jobs.release()
+        return await asyncio.gather(first, second), jobs.started, seen, scheduler.metrics()
+
+    results, started, seen, stats = asyncio.run(run())
+    assert results == ["hasil same", "hasil same"]
+    assert started == ["blocker", "same"]
+    assert seen == [1]  # penunggu langsung diberi posisi job yang sudah antre
+    assert stats["coalesced"] == 1 and stats["completed"] == 2
+
+
+def test_cancelled_job_fails_all_waiters_and_frees_the_slot():
+    async def run():
+        scheduler, jobs = JobScheduler(max_concurrency=1), _Jobs()
+        first = await _submit(scheduler, jobs, "x", "A", 1)
+        second = await _submit(scheduler, jobs, "x", "A", 2)
+        queued = await _submit(scheduler, jobs, "y", "B", 3)
+        for task in list(scheduler._tasks):
+            task.cancel()
+        outcomes = await asyncio.gather(first, second, return_exceptions=True)
+        position = scheduler.position("x")
+        jobs.release()
+        return outcomes, position, await queued, scheduler.metrics()
+
+    outcomes, position, queued_result, stats = asyncio.run(run())
+    assert all(isinstance(o, JobCancelledError) for o in outcomes)
+    assert position is None
+    assert queued_result == "hasil y"
+    assert stats["cancelled"] == 1 and stats["running"] == 0
+
+
+def test_per_user_queue_limit():
+    async def run():
+        scheduler, jobs = JobScheduler(max_concurrency=1, max_queued_per_user=1), _Jobs()
+        tasks = [await _submit(scheduler, jobs, "a1", "A", 1), await _submit(scheduler, jobs, "a2", "A", 1)]
+        with pytest.raises(QueueFullError):
+            await scheduler.submit("a3", jobs.factory("a3"), "A", 1)
+        jobs.release()
+        await asyncio.gather(*tasks)
+        return scheduler.metrics()
+
+    assert asyncio.run(run())["rejected"] == 1
@@ -0,0 +1,60 @@
+# tests/test_semantic_cache.py
+import pytest
+
+from core.semantic_cache import SemanticCache
+
+REPO = "/tmp/repos/owner_demo"
+SHA = "a" * 40
+
+
+@pytest.fixture
+def cache():
+    return SemanticCache(threshold=0.8)
+
+
+def test_paraphrase_hits(cache):
+    cache.add(REPO, SHA, "apa yang dilakukan proyek ini", "ringkasan")
+    hit = cache.lookup(REPO, SHA, "what does this repository do")
+
+    assert hit is not None and hit[0] == "ringkasan"
+    assert cache.stats()["hits"] == 1
+
+
+def test_unrelated_question_misses(cache):
+    cache.add(REPO, SHA, "bahasa apa yang dipakai", "Python")
+    assert cache.lookup(REPO, SHA, "bagaimana struktur folder tests") is None
+
+
+def test_sha_change_misses(cache):
+    cache.add(REPO, SHA, "dependensi apa saja", "numpy")
+    assert cache.lookup(REPO, "b" * 40, "dependensi apa saja") is None
+    assert cache.lookup(REPO, None, "dependensi apa saja") is None
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("bagaimana cara install", "bagaimana cara uninstall"),
+    ("how to deploy", "how to redeploy"),
+    ("is it thread safe", "is it not thread safe"),
+    ("apakah mendukung windows", "apakah tidak mendukung windows"),
+    ("dependencies apa saja", "dev dependencies apa saja"),
+    ("requires python 3.8", "requires python 3.12"),
+    ("list the tests", "list the tests in src"),
+])
+def test_near_misses_do_not_hit(cache, cached, asked):
+    cache.add(REPO, SHA, cached, "jawaban lama")
+    assert cache.lookup(REPO, SHA, asked) is None
+    # arah sebaliknya juga tidak boleh hit
+    cache.add(REPO, SHA, asked, "jawaban lain")
+    assert cache.lookup(REPO, SHA, cached)[0] == "jawaban lama"
+
+
+def test_lru_eviction_per_repo():
+    cache = SemanticCache(threshold=0.99, max_per_repo=2)
+    cache.add(REPO, SHA, "bahasa apa yang dipakai", "Python")
+    cache.add(REPO, SHA, "dependensi apa saja", "numpy")
+    cache.lookup(REPO, SHA, "bahasa apa yang dipakai")
+    cache.add(REPO, SHA, "bagaimana cara menjalankan", "make run")
+
+    assert cache.lookup(REPO, SHA, "dependensi apa saja") is None
+    assert cache.lookup(REPO, SHA, "bahasa apa yang dipakai")[0] == "Python"
+    assert cache.stats()["evictions"] == 1